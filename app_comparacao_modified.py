@@ -5,6 +5,7 @@ Versão que ignora deslocamentos e foca apenas em alterações reais de conteúd
 """
 
 import streamlit as st
+from paginacao import render_paginacao
 import fitz  # PyMuPDF
 import difflib
 import pandas as pd
@@ -623,19 +624,12 @@ class DocumentComparator:
         progress_bar.empty()
         return diferencas_simples, diferencas_detalhadas
 
-def exibir_diferencas_por_paragrafos(diferencas_detalhadas: List[Dict], tipos_filtro: List[str] = None, paginas_filtro: List[int] = None):
-    """Exibe as diferenças por parágrafos com filtros aplicados"""
-    if not diferencas_detalhadas:
-        st.success("✅ Nenhuma diferença de conteúdo encontrada!")
-        st.markdown("""
-        <div class="algoritmo-info">
-            🎯 <strong>Algoritmo Inteligente:</strong> Este comparador ignora mudanças de posicionamento e formatação, 
-            focando apenas em alterações reais de conteúdo. Parágrafos que apenas mudaram de posição não são considerados alterações.
-        </div>
-        """, unsafe_allow_html=True)
-        return
-    
-    # Aplicar filtros
+# Páginas/seções com diferenças exibidas por tela
+PAGINAS_POR_TELA = 10
+MAX_FILTROS_CACHEADOS = 16  # combinações de filtros guardadas por sessão
+
+def filtrar_diferencas(diferencas_detalhadas: List[Dict], tipos_filtro: List[str] = None, paginas_filtro: List[int] = None) -> List[Dict]:
+    """Aplica os filtros de tipo e página às diferenças detalhadas"""
     diferencas_filtradas = []
     
     for diff_detail in diferencas_detalhadas:
@@ -662,6 +656,41 @@ def exibir_diferencas_por_paragrafos(diferencas_detalhadas: List[Dict], tipos_fi
             diff_filtrada['total_alteracoes_filtradas'] = len([p for p in paragrafos_filtrados if p['tipo'] != 'normal'])
             diferencas_filtradas.append(diff_filtrada)
     
+    return diferencas_filtradas
+
+def filtrar_diferencas_cacheado(diferencas_detalhadas: List[Dict], tipos_filtro: List[str] = None, paginas_filtro: List[int] = None) -> List[Dict]:
+    """Filtra as diferenças reaproveitando o resultado já calculado para a mesma combinação de filtros"""
+    if 'cache_filtros_paragrafos' not in st.session_state:
+        st.session_state.cache_filtros_paragrafos = {}
+    cache = st.session_state.cache_filtros_paragrafos
+    
+    chave = (
+        id(diferencas_detalhadas),
+        tuple(sorted(tipos_filtro)) if tipos_filtro else (),
+        tuple(sorted(paginas_filtro)) if paginas_filtro else ()
+    )
+    # A lista de origem fica junto do resultado: um id() reaproveitado por outra lista não acerta o cache
+    if chave not in cache or cache[chave][0] is not diferencas_detalhadas:
+        while len(cache) >= MAX_FILTROS_CACHEADOS:
+            cache.pop(next(iter(cache)))  # descarta a combinação mais antiga
+        cache[chave] = (diferencas_detalhadas, filtrar_diferencas(diferencas_detalhadas, tipos_filtro, paginas_filtro))
+    return cache[chave][1]
+
+def exibir_diferencas_por_paragrafos(diferencas_detalhadas: List[Dict], tipos_filtro: List[str] = None, paginas_filtro: List[int] = None):
+    """Exibe as diferenças por parágrafos com filtros aplicados"""
+    if not diferencas_detalhadas:
+        st.success("✅ Nenhuma diferença de conteúdo encontrada!")
+        st.markdown("""
+        <div class="algoritmo-info">
+            🎯 <strong>Algoritmo Inteligente:</strong> Este comparador ignora mudanças de posicionamento e formatação, 
+            focando apenas em alterações reais de conteúdo. Parágrafos que apenas mudaram de posição não são considerados alterações.
+        </div>
+        """, unsafe_allow_html=True)
+        return
+    
+    # Aplicar filtros (resultado guardado por combinação de filtros)
+    diferencas_filtradas = filtrar_diferencas_cacheado(diferencas_detalhadas, tipos_filtro, paginas_filtro)
+    
     if not diferencas_filtradas:
         st.info("🔍 Nenhuma diferença encontrada com os filtros aplicados.")
         return
@@ -702,8 +731,14 @@ def exibir_diferencas_por_paragrafos(diferencas_detalhadas: List[Dict], tipos_fi
     
     st.divider()
     
+    # Paginação: só as páginas com diferenças do trecho atual são renderizadas
+    inicio, fim = render_paginacao(
+        len(diferencas_filtradas), 'pagina_resultado_paragrafos', itens_por_pagina=PAGINAS_POR_TELA,
+        rotulo="Página de resultados", descricao_itens=" páginas/seções com diferenças"
+    )
+    
     # Exibir cada página com diferenças
-    for diff_detail in diferencas_filtradas:
+    for diff_detail in diferencas_filtradas[inicio:fim]:
         st.markdown(f"""
         <div class="paragrafo-container">
             <div class="paragrafo-header">
@@ -856,6 +891,7 @@ def main():
                 # Armazenar resultados no session state
                 st.session_state.diferencas = diferencas_simples
                 st.session_state.diferencas_detalhadas = diferencas_detalhadas
+                st.session_state.cache_filtros_paragrafos = {}
                 st.session_state.arquivo_ref_nome = arquivo_ref.name
                 st.session_state.arquivo_novo_nome = arquivo_novo.name
                 st.session_state.tipo_ref = tipo_ref
@@ -5,6 +5,8 @@ Aplicação  que combina análise CVM e comparação visual de documentos
 """
 
 import streamlit as st
+import streamlit.components.v1 as components
+from paginacao import render_paginacao
 import pandas as pd
 import openai
 from io import BytesIO
@@ -19,16 +21,44 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 import json
 import time
 import re
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import base64
 import fitz  # PyMuPDF
 import difflib
-from typing import List, Tuple, Dict, Optional, Set
+import bisect
+from collections import deque, Counter, defaultdict
+from collections.abc import Mapping
+from functools import lru_cache
+import math
+import unicodedata
+from typing import List, Tuple, Dict, Optional, Set, Iterable, Iterator
 import logging
 from pathlib import Path
 import tempfile
 import os
 import html
+import hashlib
+import uuid
+import asyncio
+import threading
+import queue
+import random
+import sqlite3
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import OrderedDict
+from array import array
+
+try:
+    import tiktoken  # opcional: sem ele a contagem de tokens é estimada pelo número de caracteres
+except ImportError:
+    tiktoken = None
+
+try:
+    import httpx  # transporte do SDK da OpenAI (erros no meio de um stream chegam sem ser embrulhados)
+except ImportError:
+    import httpx2 as httpx  # SDKs mais novos trocaram o httpx pelo httpx2
 
 # Configuração da página com tema Solví - SIDEBAR SEMPRE EXPANDIDA
 st.set_page_config(
@@ -43,1256 +73,756 @@ st.set_page_config(
     }
 )
 
-# CSS  Masterpiece + VISUALIZAÇÃO AVANÇADA DE DIFERENÇAS
-st.markdown("""
-<style>
-    /* Importar fontes oficiais */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700;800;900&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=JetBrains+Mono:wght@300;400;500;600;700;800&display=swap');
-    
-    /* Reset completo e configurações globais */
-    * {
-        box-sizing: border-box;
-        margin: 0;
-        padding: 0;
-    }
-    
-    /* CORREÇÃO PARA HEADER PREENCHER TOPO COMPLETO */
-    .stApp {
-        margin-top: 0px !important;
-        padding-top: 0px !important;
-    }
-    
-    .stApp > header {
-        display: none !important;
-    }
-    
-    .main .block-container {
-        padding-top: 0rem !important;
-        padding-bottom: 3rem;
-        max-width: 1400px;
-        padding-left: 2rem;
-        padding-right: 2rem;
-        margin-top: 0rem !important;
-    }
-    
-    /* CORREÇÃO PARA SIDEBAR SEMPRE VISÍVEL */
-    section[data-testid="stSidebar"] {
-        width: 21rem !important;
-        min-width: 21rem !important;
-        display: block !important;
-        visibility: visible !important;
-        background: var(--solvi-gradient-surface) !important;
-        border-right: 3px solid var(--solvi-light-green) !important;
-    }
-    
-    section[data-testid="stSidebar"] > div {
-        width: 21rem !important;
-        min-width: 21rem !important;
-        background: var(--solvi-gradient-surface) !important;
-        padding: 2rem 1.5rem !important;
-    }
-    
-    .css-1d391kg {
-        width: 21rem !important;
-        min-width: 21rem !important;
-        background: var(--solvi-gradient-surface) !important;
-    }
-    
-    /* Ocultar botão de toggle da sidebar */
-    button[kind="header"] {
-        display: none !important;
-    }
-    
-    /* Ocultar elementos padrão do Streamlit */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    .stDeployButton {visibility: hidden;}
-    
-    /* Paleta de cores oficial Solví - Verde Escuro Dominante */
-    :root {
-        --solvi-dark-green: #0d4f1c;
-        --solvi-primary-green: #1b5e20;
-        --solvi-medium-green: #2e7d32;
-        --solvi-light-green: #388e3c;
-        --solvi-accent-green: #4caf50;
-        --solvi-bright-green: #66bb6a;
-        --solvi-surface: #f1f8e9;
-        --solvi-background: #e8f5e8;
-        --solvi-white: #ffffff;
-        --solvi-text-dark: #1b5e20;
-        --solvi-text-light: #ffffff;
-        --solvi-shadow: rgba(13, 79, 28, 0.15);
-        --solvi-shadow-strong: rgba(13, 79, 28, 0.25);
-        --solvi-gradient-primary: linear-gradient(135deg, var(--solvi-dark-green) 0%, var(--solvi-primary-green) 30%, var(--solvi-medium-green) 70%, var(--solvi-light-green) 100%);
-        --solvi-gradient-surface: linear-gradient(135deg, var(--solvi-white) 0%, var(--solvi-surface) 50%, var(--solvi-background) 100%);
-        
-        /* Cores para visualização de diferenças */
-        --diff-added: #d4edda;
-        --diff-added-border: #28a745;
-        --diff-added-text: #155724;
-        --diff-removed: #f8d7da;
-        --diff-removed-border: #dc3545;
-        --diff-removed-text: #721c24;
-        --diff-modified: #fff3cd;
-        --diff-modified-border: #ffc107;
-        --diff-modified-text: #856404;
-        --diff-unchanged: #f8f9fa;
-        --diff-unchanged-border: #dee2e6;
-        --diff-unchanged-text: #495057;
-    }
-    
-    /* Header Masterpiece - Largura total e impacto visual máximo */
-    .solvi-header {
-        background: var(--solvi-gradient-primary);
-        color: var(--solvi-text-light);
-        padding: 3rem 0;
-        border-radius: 0;
-        margin: -3rem calc(-50vw + 50%) 3rem calc(-50vw + 50%);
-        margin-top: -3rem !important;
-        box-shadow: 0 12px 40px var(--solvi-shadow-strong);
-        position: relative;
-        overflow: hidden;
-        min-height: 200px;
-        width: 100vw;
-        z-index: 10;
-    }
-    
-    .solvi-header::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background-image: url('https://images.unsplash.com/photo-1441974231531-c6227db76b6e?ixlib=rb-4.0.3&auto=format&fit=crop&w=1920&q=80');
-        background-size: cover;
-        background-position: center;
-        opacity: 0.08;
-        z-index: 0;
-    }
-    
-    .solvi-header::after {
-        content: '';
-        position: absolute;
-        bottom: 0;
-        left: 0;
-        right: 0;
-        height: 8px;
-        background: linear-gradient(90deg, 
-            var(--solvi-bright-green) 0%, 
-            var(--solvi-accent-green) 25%, 
-            var(--solvi-light-green) 50%, 
-            var(--solvi-medium-green) 75%, 
-            var(--solvi-primary-green) 100%);
-        z-index: 1;
-    }
-    
-    .solvi-header-content {
-        position: relative;
-        z-index: 2;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        flex-wrap: wrap;
-        gap: 2.5rem;
-        max-width: 1400px;
-        margin: 0 auto;
-        padding: 0 3rem;
-    }
-    
-    .solvi-logo-section {
-        display: flex;
-        align-items: center;
-        gap: 2.5rem;
-        flex: 1;
-    }
-    
-    /* Logo  com Background Verde Escuro */
-    .solvi-logo {
-        height: 80px;
-        width: auto;
-        background: var(--solvi-dark-green);
-        padding: 15px 25px;
-        border-radius: 16px;
-        box-shadow: 0 8px 30px rgba(0,0,0,0.2);
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        border: 4px solid var(--solvi-primary-green);
-        filter: brightness(1.1);
-    }
-    
-    .solvi-logo:hover {
-        transform: scale(1.08) rotate(2deg);
-        box-shadow: 0 12px 40px rgba(0,0,0,0.3);
-        background: var(--solvi-primary-green);
-        border-color: var(--solvi-medium-green);
-        filter: brightness(1.2);
-    }
-    
-    .solvi-title-section {
-        flex: 2;
-    }
-    
-    .solvi-title {
-        font-size: 3.5rem;
-        font-weight: 900;
-        font-family: 'Poppins', sans-serif;
-        margin: 0;
-        text-shadow: 3px 3px 12px rgba(0,0,0,0.4);
-        letter-spacing: -2px;
-        line-height: 1;
-        background: linear-gradient(45deg, #ffffff 0%, #f0f8ff 50%, #ffffff 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-    
-    .solvi-subtitle {
-        font-size: 1.4rem;
-        opacity: 0.95;
-        margin-top: 0.8rem;
-        font-weight: 600;
-        letter-spacing: 0.8px;
-        text-shadow: 2px 2px 6px rgba(0,0,0,0.3);
-        font-family: 'Inter', sans-serif;
-    }
-    
-    .solvi-badge {
-        background: rgba(255,255,255,0.15);
-        padding: 1.5rem 3rem;
-        border-radius: 50px;
-        font-size: 1.2rem;
-        font-weight: 800;
-        backdrop-filter: blur(20px);
-        border: 3px solid rgba(255,255,255,0.25);
-        text-transform: uppercase;
-        letter-spacing: 2px;
-        box-shadow: 0 6px 25px rgba(0,0,0,0.15);
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        font-family: 'Poppins', sans-serif;
-        white-space: nowrap;
-    }
-    
-    .solvi-badge:hover {
-        background: rgba(255,255,255,0.25);
-        transform: translateY(-3px) scale(1.05);
-        box-shadow: 0 10px 35px rgba(0,0,0,0.2);
-        border-color: rgba(255,255,255,0.4);
-    }
-    
-    /* VISUALIZAÇÃO AVANÇADA DE DIFERENÇAS -  */
-    .diff-viewer {
-        background: var(--solvi-white);
-        border-radius: 20px;
-        border: 3px solid var(--solvi-background);
-        box-shadow: 0 15px 50px var(--solvi-shadow);
-        margin: 3rem 0;
-        overflow: hidden;
-        position: relative;
-    }
-    
-    .diff-viewer::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 6px;
-        background: var(--solvi-gradient-primary);
-        z-index: 1;
-    }
-    
-    .diff-header {
-        background: var(--solvi-gradient-surface);
-        padding: 2rem 3rem;
-        border-bottom: 3px solid var(--solvi-background);
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        flex-wrap: wrap;
-        gap: 2rem;
-    }
-    
-    .diff-title {
-        font-size: 1.8rem;
-        font-weight: 800;
-        color: var(--solvi-text-dark);
-        font-family: 'Poppins', sans-serif;
-        margin: 0;
-    }
-    
-    .diff-stats {
-        display: flex;
-        gap: 2rem;
-        flex-wrap: wrap;
-    }
-    
-    .diff-stat {
-        display: flex;
-        align-items: center;
-        gap: 0.8rem;
-        padding: 0.8rem 1.5rem;
-        border-radius: 12px;
-        font-weight: 700;
-        font-family: 'Inter', sans-serif;
-        font-size: 1rem;
-        border: 2px solid;
-        transition: all 0.3s ease;
-    }
-    
-    .diff-stat:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-    }
-    
-    .diff-stat.added {
-        background: var(--diff-added);
-        border-color: var(--diff-added-border);
-        color: var(--diff-added-text);
-    }
-    
-    .diff-stat.removed {
-        background: var(--diff-removed);
-        border-color: var(--diff-removed-border);
-        color: var(--diff-removed-text);
-    }
-    
-    .diff-stat.modified {
-        background: var(--diff-modified);
-        border-color: var(--diff-modified-border);
-        color: var(--diff-modified-text);
-    }
-    
-    .diff-content {
-        max-height: 600px;
-        overflow-y: auto;
-        padding: 0;
-    }
-    
-    .diff-line {
-        display: flex;
-        font-family: 'JetBrains Mono', monospace;
-        font-size: 0.95rem;
-        line-height: 1.6;
-        border-bottom: 1px solid #f0f0f0;
-        transition: all 0.2s ease;
-        position: relative;
-    }
-    
-    .diff-line:hover {
-        background: rgba(0,0,0,0.02);
-    }
-    
-    .diff-line-number {
-        width: 80px;
-        padding: 0.8rem 1rem;
-        background: #f8f9fa;
-        border-right: 2px solid #dee2e6;
-        text-align: center;
-        font-weight: 600;
-        color: #6c757d;
-        user-select: none;
-        flex-shrink: 0;
-    }
-    
-    .diff-line-content {
-        flex: 1;
-        padding: 0.8rem 1.5rem;
-        white-space: pre-wrap;
-        word-wrap: break-word;
-        position: relative;
-    }
-    
-    /* Tipos de diferenças */
-    .diff-line.added {
-        background: var(--diff-added);
-        border-left: 4px solid var(--diff-added-border);
-    }
-    
-    .diff-line.added .diff-line-number {
-        background: var(--diff-added);
-        color: var(--diff-added-text);
-        font-weight: 800;
-    }
-    
-    .diff-line.added .diff-line-content {
-        color: var(--diff-added-text);
-        font-weight: 600;
-    }
-    
-    .diff-line.added::before {
-        content: '+';
-        position: absolute;
-        left: 85px;
-        top: 50%;
-        transform: translateY(-50%);
-        color: var(--diff-added-border);
-        font-weight: 900;
-        font-size: 1.2rem;
-        z-index: 1;
-    }
-    
-    .diff-line.removed {
-        background: var(--diff-removed);
-        border-left: 4px solid var(--diff-removed-border);
-    }
-    
-    .diff-line.removed .diff-line-number {
-        background: var(--diff-removed);
-        color: var(--diff-removed-text);
-        font-weight: 800;
-    }
-    
-    .diff-line.removed .diff-line-content {
-        color: var(--diff-removed-text);
-        font-weight: 600;
-        text-decoration: line-through;
-        opacity: 0.8;
-    }
-    
-    .diff-line.removed::before {
-        content: '-';
-        position: absolute;
-        left: 85px;
-        top: 50%;
-        transform: translateY(-50%);
-        color: var(--diff-removed-border);
-        font-weight: 900;
-        font-size: 1.2rem;
-        z-index: 1;
-    }
-    
-    .diff-line.modified {
-        background: var(--diff-modified);
-        border-left: 4px solid var(--diff-modified-border);
-    }
-    
-    .diff-line.modified .diff-line-number {
-        background: var(--diff-modified);
-        color: var(--diff-modified-text);
-        font-weight: 800;
-    }
-    
-    .diff-line.modified .diff-line-content {
-        color: var(--diff-modified-text);
-        font-weight: 600;
-    }
-    
-    .diff-line.modified::before {
-        content: '~';
-        position: absolute;
-        left: 85px;
-        top: 50%;
-        transform: translateY(-50%);
-        color: var(--diff-modified-border);
-        font-weight: 900;
-        font-size: 1.2rem;
-        z-index: 1;
-    }
-    
-    .diff-line.unchanged {
-        background: var(--diff-unchanged);
-    }
-    
-    .diff-line.unchanged .diff-line-number {
-        background: var(--diff-unchanged);
-        color: var(--diff-unchanged-text);
-    }
-    
-    .diff-line.unchanged .diff-line-content {
-        color: var(--diff-unchanged-text);
-        opacity: 0.7;
-    }
-    
-    /* Highlights dentro do texto */
-    .diff-highlight {
-        padding: 0.2rem 0.4rem;
-        border-radius: 4px;
-        font-weight: 700;
-        position: relative;
-    }
-    
-    .diff-highlight.added {
-        background: #28a745;
-        color: white;
-    }
-    
-    .diff-highlight.removed {
-        background: #dc3545;
-        color: white;
-        text-decoration: line-through;
-    }
-    
-    .diff-highlight.modified {
-        background: #ffc107;
-        color: #856404;
-    }
-    
-    /* Seção de resumo visual */
-    .diff-summary {
-        background: var(--solvi-gradient-surface);
-        padding: 3rem;
-        border-top: 3px solid var(--solvi-background);
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-        gap: 2rem;
-    }
-    
-    .diff-summary-item {
-        background: var(--solvi-white);
-        padding: 2rem;
-        border-radius: 16px;
-        border: 2px solid var(--solvi-background);
-        text-align: center;
-        transition: all 0.3s ease;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.05);
-    }
-    
-    .diff-summary-item:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-        border-color: var(--solvi-light-green);
-    }
-    
-    .diff-summary-icon {
-        font-size: 3rem;
-        margin-bottom: 1rem;
-        display: block;
-    }
-    
-    .diff-summary-value {
-        font-size: 2.5rem;
-        font-weight: 900;
-        font-family: 'Poppins', sans-serif;
-        margin-bottom: 0.5rem;
-        background: var(--solvi-gradient-primary);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-    
-    .diff-summary-label {
-        font-size: 1.1rem;
-        font-weight: 600;
-        color: #666;
-        font-family: 'Inter', sans-serif;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
-    
-    /* Controles de visualização */
-    .diff-controls {
-        background: var(--solvi-gradient-surface);
-        padding: 2rem 3rem;
-        border-bottom: 3px solid var(--solvi-background);
-        display: flex;
-        gap: 1.5rem;
-        flex-wrap: wrap;
-        align-items: center;
-    }
-    
-    .diff-control-group {
-        display: flex;
-        align-items: center;
-        gap: 1rem;
-    }
-    
-    .diff-control-label {
-        font-weight: 600;
-        color: var(--solvi-text-dark);
-        font-family: 'Inter', sans-serif;
-        font-size: 0.95rem;
-    }
-    
-    .diff-toggle {
-        display: flex;
-        background: var(--solvi-white);
-        border-radius: 8px;
-        border: 2px solid var(--solvi-background);
-        overflow: hidden;
-    }
-    
-    .diff-toggle-btn {
-        padding: 0.6rem 1.2rem;
-        border: none;
-        background: transparent;
-        font-weight: 600;
-        font-family: 'Inter', sans-serif;
-        font-size: 0.9rem;
-        cursor: pointer;
-        transition: all 0.2s ease;
-        color: #666;
-    }
-    
-    .diff-toggle-btn.active {
-        background: var(--solvi-primary-green);
-        color: white;
-    }
-    
-    .diff-toggle-btn:hover:not(.active) {
-        background: var(--solvi-surface);
-    }
-    
-    /* Seção de imagens inspiracionais  */
-    .solvi-inspiration {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-        gap: 2.5rem;
-        margin: 4rem 0;
-        padding: 3rem;
-        background: var(--solvi-gradient-surface);
-        border-radius: 28px;
-        border: 3px solid var(--solvi-light-green);
-        box-shadow: 0 12px 40px var(--solvi-shadow);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .solvi-inspiration::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 6px;
-        background: var(--solvi-gradient-primary);
-        z-index: 1;
-    }
-    
-    .solvi-inspiration-item {
-        position: relative;
-        border-radius: 20px;
-        overflow: hidden;
-        box-shadow: 0 10px 35px var(--solvi-shadow);
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        background: var(--solvi-white);
-        border: 3px solid var(--solvi-background);
-        transform-origin: center;
-    }
-    
-    .solvi-inspiration-item:hover {
-        transform: translateY(-12px) scale(1.02);
-        box-shadow: 0 20px 60px var(--solvi-shadow-strong);
-        border-color: var(--solvi-light-green);
-    }
-    
-    .solvi-inspiration-image {
-        width: 100%;
-        height: 200px;
-        object-fit: cover;
-        border-radius: 20px 20px 0 0;
-        transition: all 0.4s ease;
-    }
-    
-    .solvi-inspiration-item:hover .solvi-inspiration-image {
-        transform: scale(1.05);
-        filter: brightness(1.1) saturate(1.2);
-    }
-    
-    .solvi-inspiration-content {
-        padding: 2.5rem;
-        background: var(--solvi-gradient-surface);
-        position: relative;
-    }
-    
-    .solvi-inspiration-title {
-        font-size: 1.4rem;
-        font-weight: 800;
-        color: var(--solvi-text-dark);
-        margin: 0 0 1.2rem 0;
-        font-family: 'Poppins', sans-serif;
-        letter-spacing: -0.5px;
-    }
-    
-    .solvi-inspiration-desc {
-        font-size: 1.05rem;
-        color: #555;
-        line-height: 1.7;
-        margin: 0;
-        font-weight: 500;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Navegação  estilo Solví */
-    .solvi-navigation {
-        background: var(--solvi-gradient-surface);
-        border-radius: 24px;
-        padding: 2rem;
-        margin: 4rem 0;
-        box-shadow: 0 12px 45px var(--solvi-shadow);
-        border: 3px solid var(--solvi-background);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .solvi-navigation::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 6px;
-        background: var(--solvi-gradient-primary);
-        z-index: 1;
-    }
-    
-    /* Cards  estilo Solví */
-    .solvi-card {
-        background: var(--solvi-gradient-surface);
-        border-radius: 28px;
-        padding: 3.5rem;
-        margin: 3rem 0;
-        box-shadow: 0 20px 60px var(--solvi-shadow);
-        border: 3px solid var(--solvi-background);
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .solvi-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 8px;
-        background: var(--solvi-gradient-primary);
-        z-index: 1;
-    }
-    
-    .solvi-card:hover {
-        transform: translateY(-10px);
-        box-shadow: 0 30px 80px var(--solvi-shadow-strong);
-        border-color: var(--solvi-light-green);
-    }
-    
-    .solvi-card-header {
-        display: flex;
-        align-items: center;
-        margin-bottom: 3rem;
-        padding-bottom: 2.5rem;
-        border-bottom: 4px solid var(--solvi-background);
-        position: relative;
-    }
-    
-    .solvi-card-icon {
-        width: 80px;
-        height: 80px;
-        background: var(--solvi-gradient-primary);
-        border-radius: 24px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        margin-right: 2.5rem;
-        font-size: 2.5rem;
-        box-shadow: 0 10px 30px var(--solvi-shadow);
-        border: 4px solid var(--solvi-white);
-        transition: all 0.3s ease;
-    }
-    
-    .solvi-card-icon:hover {
-        transform: scale(1.1) rotate(5deg);
-        box-shadow: 0 15px 40px var(--solvi-shadow-strong);
-    }
-    
-    .solvi-card-title {
-        font-size: 2.2rem;
-        font-weight: 900;
-        color: var(--solvi-text-dark);
-        margin: 0;
-        font-family: 'Poppins', sans-serif;
-        letter-spacing: -1px;
-        line-height: 1.2;
-    }
-    
-    /* Métricas  estilo Solví */
-    .solvi-metrics {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(260px, 1fr));
-        gap: 3rem;
-        margin: 4rem 0;
-    }
-    
-    .solvi-metric {
-        background: var(--solvi-gradient-surface);
-        border-radius: 28px;
-        padding: 3.5rem;
-        text-align: center;
-        border: 3px solid var(--solvi-background);
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        position: relative;
-        overflow: hidden;
-        box-shadow: 0 15px 50px var(--solvi-shadow);
-    }
-    
-    .solvi-metric::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 8px;
-        background: var(--solvi-gradient-primary);
-        z-index: 1;
-    }
-    
-    .solvi-metric:hover {
-        transform: translateY(-12px) scale(1.02);
-        box-shadow: 0 25px 70px var(--solvi-shadow-strong);
-        border-color: var(--solvi-light-green);
-    }
-    
-    .solvi-metric-value {
-        font-size: 4.5rem;
-        font-weight: 900;
-        color: var(--solvi-primary-green);
-        margin-bottom: 1.5rem;
-        font-family: 'Poppins', sans-serif;
-        line-height: 1;
-        text-shadow: 3px 3px 6px rgba(0,0,0,0.1);
-        background: var(--solvi-gradient-primary);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-    
-    .solvi-metric-label {
-        color: #555;
-        font-size: 1.2rem;
-        font-weight: 800;
-        text-transform: uppercase;
-        letter-spacing: 2px;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Botões  estilo Solví */
-    .stButton > button {
-        background: var(--solvi-gradient-primary);
-        color: var(--solvi-text-light);
-        border: none;
-        border-radius: 24px;
-        padding: 1.8rem 4rem;
-        font-weight: 800;
-        font-size: 1.3rem;
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        box-shadow: 0 10px 30px var(--solvi-shadow);
-        font-family: 'Poppins', sans-serif;
-        letter-spacing: 1.5px;
-        text-transform: uppercase;
-        border: 4px solid transparent;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .stButton > button::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: -100%;
-        width: 100%;
-        height: 100%;
-        background: linear-gradient(90deg, transparent, rgba(255,255,255,0.2), transparent);
-        transition: left 0.5s;
-    }
-    
-    .stButton > button:hover::before {
-        left: 100%;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-6px) scale(1.02);
-        box-shadow: 0 15px 50px var(--solvi-shadow-strong);
-        background: linear-gradient(135deg, var(--solvi-dark-green) 0%, var(--solvi-primary-green) 50%, var(--solvi-medium-green) 100%);
-        border-color: var(--solvi-white);
-    }
-    
-    /* Alertas  estilo Solví */
-    .solvi-alert {
-        border-radius: 24px;
-        padding: 3rem 3.5rem;
-        margin: 3rem 0;
-        border-left: 10px solid;
-        font-weight: 600;
-        font-family: 'Inter', sans-serif;
-        position: relative;
-        overflow: hidden;
-        box-shadow: 0 12px 40px rgba(0,0,0,0.1);
-        font-size: 1.15rem;
-        line-height: 1.6;
-    }
-    
-    .solvi-alert.success {
-        background: var(--solvi-gradient-surface);
-        border-color: var(--solvi-accent-green);
-        color: var(--solvi-text-dark);
-    }
-    
-    .solvi-alert.warning {
-        background: linear-gradient(135deg, #fff8e1 0%, #fffde7 50%, #f9fbe7 100%);
-        border-color: #ff9800;
-        color: #e65100;
-    }
-    
-    .solvi-alert.error {
-        background: linear-gradient(135deg, #ffebee 0%, #fce4ec 50%, #f3e5f5 100%);
-        border-color: #f44336;
-        color: #c62828;
-    }
-    
-    .solvi-alert.info {
-        background: linear-gradient(135deg, #e3f2fd 0%, #e1f5fe 50%, #e0f2f1 100%);
-        border-color: #2196f3;
-        color: #0d47a1;
-    }
-    
-    /* Upload areas  com pontilhado contínuo */
-    .solvi-upload {
-        border: 5px dashed var(--solvi-light-green);
-        border-radius: 28px;
-        padding: 5rem 4rem;
-        text-align: center;
-        background: var(--solvi-gradient-surface);
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        margin: 3rem 0;
-        box-shadow: 0 15px 50px var(--solvi-shadow);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    /* Pontilhado contínuo animado  */
-    .solvi-upload::before {
-        content: '';
-        position: absolute;
-        top: -3px;
-        left: -3px;
-        right: -3px;
-        bottom: -3px;
-        border: 5px dashed var(--solvi-primary-green);
-        border-radius: 28px;
-        animation: dash 25s linear infinite;
-        opacity: 0.7;
-        z-index: 0;
-    }
-    
-    @keyframes dash {
-        0% {
-            stroke-dashoffset: 0;
-            transform: rotate(0deg);
-        }
-        100% {
-            stroke-dashoffset: 50px;
-            transform: rotate(360deg);
-        }
-    }
-    
-    .solvi-upload:hover {
-        border-color: var(--solvi-primary-green);
-        background: linear-gradient(135deg, var(--solvi-surface) 0%, var(--solvi-background) 50%, #dcedc8 100%);
-        transform: translateY(-8px) scale(1.01);
-        box-shadow: 0 20px 70px var(--solvi-shadow-strong);
-    }
-    
-    .solvi-upload:hover::before {
-        border-color: var(--solvi-dark-green);
-        opacity: 0.9;
-        animation-duration: 15s;
-    }
-    
-    .solvi-upload-icon {
-        font-size: 5rem;
-        color: var(--solvi-light-green);
-        margin-bottom: 2.5rem;
-        text-shadow: 3px 3px 6px rgba(0,0,0,0.1);
-        position: relative;
-        z-index: 1;
-        transition: all 0.3s ease;
-    }
-    
-    .solvi-upload:hover .solvi-upload-icon {
-        transform: scale(1.1) rotate(5deg);
-        color: var(--solvi-primary-green);
-    }
-    
-    .solvi-upload-text {
-        font-size: 1.8rem;
-        font-weight: 800;
-        color: var(--solvi-text-dark);
-        margin-bottom: 1.5rem;
-        font-family: 'Poppins', sans-serif;
-        position: relative;
-        z-index: 1;
-        letter-spacing: -0.5px;
-    }
-    
-    .solvi-upload-subtext {
-        font-size: 1.2rem;
-        color: #666;
-        line-height: 1.8;
-        font-weight: 500;
-        position: relative;
-        z-index: 1;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Footer  */
-    .solvi-footer {
-        background: var(--solvi-gradient-primary);
-        color: var(--solvi-text-light);
-        padding: 5rem 3rem;
-        border-radius: 28px;
-        margin: 5rem 0 3rem 0;
-        text-align: center;
-        box-shadow: 0 20px 60px var(--solvi-shadow-strong);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .solvi-footer::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background-image: url('https://images.unsplash.com/photo-1542601906990-b4d3fb778b09?ixlib=rb-4.0.3&auto=format&fit=crop&w=1920&q=80');
-        background-size: cover;
-        background-position: center;
-        opacity: 0.06;
-        z-index: 0;
-    }
-    
-    .solvi-footer-content {
-        position: relative;
-        z-index: 1;
-    }
-    
-    .solvi-footer-logo {
-        height: 70px;
-        margin-bottom: 2.5rem;
-        background: var(--solvi-dark-green);
-        padding: 15px 25px;
-        border-radius: 16px;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.3);
-        border: 4px solid var(--solvi-primary-green);
-        transition: all 0.3s ease;
-    }
-    
-    .solvi-footer-logo:hover {
-        transform: scale(1.05);
-        box-shadow: 0 12px 35px rgba(0,0,0,0.4);
-    }
+# Assets estáticos locais (fontes, imagens e CSS), gerados/atualizados com vendor_assets.py e
+# servidos de static/ com server.enableStaticServing. O app nunca busca assets remotos: fonte não
+# vendorizada cai na pilha de fontes do sistema declarada no CSS e imagem ausente vira um bloco local.
+STATIC_DIR = Path(__file__).parent / "static"
+STATIC_URL = "app/static"
+IMAGENS_ESTATICAS = {
+    'logo': 'solvi-logo.png',
+    'tecnologia': 'tecnologia-sustentavel.jpg',
+    'ambiental': 'protecao-ambiental.jpg',
+    'residuos': 'gestao-residuos.jpg',
+    'inovacao': 'inovacao-verde.png',
+}
+
+@st.cache_resource
+def localizar_assets_estaticos() -> Dict:
+    """Localiza os assets uma vez por processo: folhas de estilo e arquivos locais com URL versionada"""
+    def url_versionada(relativo: str) -> Optional[str]:
+        caminho = STATIC_DIR / relativo
+        if not caminho.exists():
+            return None
+        versao = hashlib.md5(caminho.read_bytes()).hexdigest()[:10]
+        return f"{STATIC_URL}/{relativo}?v={versao}"
     
-    /* SIDEBAR  STYLING */
-    .sidebar-content {
-        background: var(--solvi-gradient-surface);
-        border-radius: 20px;
-        padding: 2rem;
-        margin-bottom: 2rem;
-        border: 3px solid var(--solvi-background);
-        box-shadow: 0 10px 30px var(--solvi-shadow);
-    }
+    folhas = [url_versionada("css/fonts.css"), url_versionada("css/solvi.min.css") or url_versionada("css/solvi.css")]
+    # Tudo o que o CSS referencia com url('../img/...') ou url('../fonts/...') e existe em static/
+    arquivos = {f"{pasta}/{caminho.name}": url_versionada(f"{pasta}/{caminho.name}")
+                for pasta in ("img", "fonts") for caminho in sorted((STATIC_DIR / pasta).glob("*"))
+                if caminho.is_file()}
     
-    .sidebar-title {
-        color: var(--solvi-primary-green);
-        font-family: 'Poppins', sans-serif;
-        font-weight: 800;
-        font-size: 1.4rem;
-        margin-bottom: 1.5rem;
-        text-align: center;
-        border-bottom: 3px solid var(--solvi-light-green);
-        padding-bottom: 1rem;
+    return {
+        'folhas': [folha for folha in folhas if folha],
+        'arquivos': arquivos,
+        'imagens': {nome: url_versionada(f"img/{arquivo}") for nome, arquivo in IMAGENS_ESTATICAS.items()}
     }
-    
-    /* Responsividade  */
-    @media (max-width: 768px) {
-        .solvi-header {
-            padding: 2.5rem 0;
-            min-height: 180px;
-        }
-        
-        .solvi-header-content {
-            flex-direction: column;
-            text-align: center;
-            gap: 2rem;
-            padding: 0 1.5rem;
-        }
-        
-        .solvi-title {
-            font-size: 2.5rem;
-        }
-        
-        .solvi-subtitle {
-            font-size: 1.2rem;
-        }
-        
-        .solvi-logo {
-            height: 70px;
-        }
-        
-        .solvi-inspiration {
-            grid-template-columns: 1fr;
-            padding: 2.5rem;
-        }
+
+# Componente sem build (HTML estático) que carrega as folhas de estilo no <head> e confirma a carga
+injetor_css = components.declare_component("injetor_css", path=str(STATIC_DIR / "componentes" / "injetor_css"))
+
+def injetar_assets_estaticos():
+    """Liga as folhas de estilo de static/ ao <head> da página uma vez por sessão
+    
+    A sessão só envia as URLs versionadas (e as dos arquivos locais que o CSS referencia); o
+    navegador baixa cada folha do servidor estático uma vez e a reaproveita do cache HTTP. O
+    componente anexa os <link> ao documento do app, fora da árvore de elementos do Streamlit,
+    onde persistem entre reruns; nas versões do Streamlit que entregam .css como text/plain com
+    nosniff o navegador recusa o <link> e o componente embute o mesmo arquivo como <style>. Só
+    quando o componente devolve True a sessão deixa de renderizá-lo.
+    """
+    if st.session_state.get('css_injetado'):
+        return
+    assets = localizar_assets_estaticos()
+    if injetor_css(folhas=assets['folhas'], arquivos=assets['arquivos'], key="injetor_css", default=False):
+        st.session_state.css_injetado = True
+
+# CSS  Masterpiece + VISUALIZAÇÃO AVANÇADA DE DIFERENÇAS
+injetar_assets_estaticos()
+
+# Inicializar session state
+def init_session_state():
+    """Inicializa o estado da sessão com configurações """
+    if 'current_tab' not in st.session_state:
+        st.session_state.current_tab = 'comparison'  # Inicia com comparação para mostrar a nova funcionalidade
+    if 'analysis_results' not in st.session_state:
+        st.session_state.analysis_results = None
+    if 'comparison_results' not in st.session_state:
+        st.session_state.comparison_results = None
+    if 'visual_diff_data' not in st.session_state:
+        st.session_state.visual_diff_data = None
+    if 'latencias_rerun' not in st.session_state:
+        st.session_state.latencias_rerun = {}
+    if 'analise_exportada' not in st.session_state:
+        st.session_state.analise_exportada = None  # achados da última análise CVM, para a reanálise incremental
+    if 'fre_sections_anteriores' not in st.session_state:
+        st.session_state.fre_sections_anteriores = None
+
+CARACTERES_POR_TOKEN = 3.5  # média aproximada do tokenizador do GPT-4 para português
+
+@lru_cache(maxsize=1)
+def _codificador_tokens():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Sem o arquivo BPE (ex.: máquina sem rede) vale a estimativa por caracteres
+        return None
+
+def contar_tokens(texto: str) -> int:
+    """Número de tokens do texto no tokenizador do modelo (estimado se tiktoken não estiver disponível)"""
+    codificador = _codificador_tokens()
+    if codificador is not None:
+        return len(codificador.encode(texto, disallowed_special=()))
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+def dividir_em_janelas(texto: str, max_tokens: int, sobreposicao_tokens: int = 0) -> List[str]:
+    """Divide o texto em janelas de até max_tokens cortando em fins de linha (palavras, se uma linha
+    sozinha não couber); o fim de cada janela, até sobreposicao_tokens, se repete no início da seguinte"""
+    # Linhas longas viram grupos de palavras do tamanho da sobreposição, para que ela ainda seja possível
+    tamanho_grupo = min(sobreposicao_tokens or max_tokens, max_tokens)
+    
+    unidades = []
+    for linha in texto.split('\n'):
+        tokens = contar_tokens(linha)
+        if tokens <= max_tokens:
+            unidades.append((linha, tokens))
+            continue
         
-        .solvi-metrics {
-            grid-template-columns: 1fr;
-        }
+        atual, tokens_atual = [], 0
+        for palavra in linha.split(' '):
+            tokens_palavra = contar_tokens(palavra) + 1
+            if atual and tokens_atual + tokens_palavra > tamanho_grupo:
+                grupo = ' '.join(atual)
+                unidades.append((grupo, contar_tokens(grupo)))
+                atual, tokens_atual = [], 0
+            atual.append(palavra)
+            tokens_atual += tokens_palavra
+        if atual:
+            grupo = ' '.join(atual)
+            unidades.append((grupo, contar_tokens(grupo)))
+    
+    janelas = []
+    atual, tokens_atual = [], 0
+    for unidade, tokens in unidades:
+        if atual and tokens_atual + tokens > max_tokens:
+            janelas.append('\n'.join(u for u, _ in atual))
+            
+            mantidas, soma = [], 0
+            for u, t in reversed(atual):
+                if soma + t > sobreposicao_tokens:
+                    break
+                mantidas.append((u, t))
+                soma += t
+            atual, tokens_atual = mantidas[::-1], soma
+            if tokens_atual + tokens > max_tokens:
+                atual, tokens_atual = [], 0
         
-        .solvi-metric-value {
-            font-size: 4rem;
-        }
+        atual.append((unidade, tokens))
+        tokens_atual += tokens
+    
+    if atual:
+        janelas.append('\n'.join(u for u, _ in atual))
+    
+    return [janela for janela in janelas if janela.strip()]
+
+class IndiceBM25:
+    """Índice lexical BM25 sobre os artigos dos documentos CVM, para levar ao prompt só
+    os trechos relevantes a cada seção do FRE"""
+    
+    K1 = 1.5
+    B = 0.75
+    MAX_TOKENS_TRECHO = 400
+    PADRAO_ARTIGO = re.compile(r'^[ \t]*(?:Art\.|Artigo)\s*\d+', re.IGNORECASE | re.MULTILINE)
+    PADRAO_TERMO = re.compile(r'\w{2,}')
+    STOPWORDS = frozenset("""
+        ao aos as com como da das de do dos e em entre esta este foi ha isso mais na nas nao no nos
+        o os ou para pela pelas pelo pelos por que se sem ser seu seus sua suas sao um uma umas uns
+    """.split())
+    
+    def __init__(self, texto: str):
+        self.trechos = self.dividir_em_artigos(texto)
+        self.tokens_trechos = [contar_tokens(trecho) for trecho in self.trechos]
         
-        .solvi-card {
-            padding: 3rem;
-        }
+        frequencias = [Counter(self.termos(trecho)) for trecho in self.trechos]
+        self.tamanhos = [sum(f.values()) for f in frequencias]
+        self.tamanho_medio = (sum(self.tamanhos) / len(self.tamanhos)) if self.tamanhos else 1.0
         
-        .solvi-upload {
-            padding: 4rem 2.5rem;
-        }
+        # Índice invertido: termo -> [(trecho, frequência no trecho)]
+        self.postings = defaultdict(list)
+        for i, frequencia in enumerate(frequencias):
+            for termo, tf in frequencia.items():
+                self.postings[termo].append((i, tf))
         
-        .solvi-badge {
-            padding: 1.2rem 2.5rem;
-            font-size: 1rem;
+        total = len(self.trechos)
+        self.idf = {
+            termo: math.log(1 + (total - len(ocorrencias) + 0.5) / (len(ocorrencias) + 0.5))
+            for termo, ocorrencias in self.postings.items()
         }
+    
+    @classmethod
+    def termos(cls, texto: str) -> List[str]:
+        """Termos normalizados (minúsculos, sem acentos, sem stopwords)"""
+        sem_acentos = unicodedata.normalize('NFKD', texto.lower()).encode('ascii', 'ignore').decode('ascii')
+        return [termo for termo in cls.PADRAO_TERMO.findall(sem_acentos) if termo not in cls.STOPWORDS]
+    
+    @classmethod
+    def dividir_em_artigos(cls, texto: str) -> List[str]:
+        """Um trecho por artigo ("Art. N"); artigos longos e textos sem artigos viram janelas de MAX_TOKENS_TRECHO"""
+        inicios = [m.start() for m in cls.PADRAO_ARTIGO.finditer(texto)]
+        if not inicios or inicios[0] > 0:
+            inicios.insert(0, 0)
         
-        /* Sidebar responsiva */
-        section[data-testid="stSidebar"] {
-            width: 18rem !important;
-            min-width: 18rem !important;
-        }
+        trechos = []
+        for inicio, fim in zip(inicios, inicios[1:] + [len(texto)]):
+            artigo = texto[inicio:fim].strip()
+            if artigo:
+                trechos.extend(dividir_em_janelas(artigo, cls.MAX_TOKENS_TRECHO))
+        return trechos
+    
+    def pontuar(self, consulta: str) -> Dict[int, float]:
+        pontuacoes = defaultdict(float)
+        for termo in set(self.termos(consulta)):
+            idf = self.idf.get(termo)
+            if idf is None:
+                continue
+            for i, tf in self.postings[termo]:
+                normalizacao = self.K1 * (1 - self.B + self.B * self.tamanhos[i] / self.tamanho_medio)
+                pontuacoes[i] += idf * tf * (self.K1 + 1) / (tf + normalizacao)
+        return pontuacoes
+    
+    def selecionar(self, consulta: str, orcamento_tokens: int, top_k: int) -> List[str]:
+        """Os top_k trechos mais relevantes que cabem no orçamento, na ordem original dos documentos"""
+        pontuacoes = self.pontuar(consulta)
+        ranking = sorted(pontuacoes, key=pontuacoes.get, reverse=True) or range(len(self.trechos))
         
-        section[data-testid="stSidebar"] > div {
-            width: 18rem !important;
-            min-width: 18rem !important;
-            padding: 1.5rem 1rem !important;
-        }
+        escolhidos, usados = [], 0
+        for i in ranking:
+            if len(escolhidos) >= top_k:
+                break
+            if usados + self.tokens_trechos[i] > orcamento_tokens:
+                continue
+            escolhidos.append(i)
+            usados += self.tokens_trechos[i]
         
-        /* Diff viewer responsivo */
-        .diff-line-number {
-            width: 60px;
-            font-size: 0.8rem;
-        }
+        return [self.trechos[i] for i in sorted(escolhidos)]
+
+class CircuitoAbertoError(Exception):
+    """A API falhou seguidamente e o circuito está aberto: a chamada nem foi enviada"""
+
+class DisjuntorCircuito:
+    """Circuit breaker: após LIMIAR_FALHAS falhas seguidas recusa chamadas por TEMPO_ABERTO segundos;
+    depois deixa passar uma única sonda, que fecha o circuito se tiver sucesso ou o reabre se falhar"""
+    
+    LIMIAR_FALHAS = 5
+    TEMPO_ABERTO = 30.0  # segundos
+    
+    def __init__(self, limiar_falhas: int = LIMIAR_FALHAS, tempo_aberto: float = TEMPO_ABERTO):
+        self.limiar_falhas = limiar_falhas
+        self.tempo_aberto = tempo_aberto
+        self.falhas_seguidas = 0
+        self.aberto_ate = None  # time.monotonic() até quando o circuito recusa chamadas
+        self.sonda_em_voo = False
+    
+    def verificar(self) -> bool:
+        """Libera a chamada ou levanta CircuitoAbertoError; True quando a chamada liberada é a sonda"""
+        if self.aberto_ate is None:
+            return False
+        if time.monotonic() < self.aberto_ate or self.sonda_em_voo:
+            raise CircuitoAbertoError(
+                f"API indisponível após {self.falhas_seguidas} falhas seguidas; novas chamadas suspensas"
+            )
+        self.sonda_em_voo = True  # meio aberto
+        return True
+    
+    def registrar_sucesso(self):
+        self.falhas_seguidas = 0
+        self.aberto_ate = None
+        self.sonda_em_voo = False
+    
+    def registrar_falha(self):
+        self.falhas_seguidas += 1
+        if self.sonda_em_voo or self.falhas_seguidas >= self.limiar_falhas:
+            self.aberto_ate = time.monotonic() + self.tempo_aberto
+            self.sonda_em_voo = False
+    
+    def registrar_inconclusivo(self):
+        """Resposta que não diz nada sobre a saúde da API (ex.: rate limit): a sonda pode ser refeita"""
+        self.sonda_em_voo = False
+
+# Falhas em que vale tentar de novo: rede, timeout e erros 5xx; no meio de um stream o SDK não
+# embrulha a queda da conexão (erro do httpx) e um evento de erro chega como openai.APIError
+ERROS_TRANSITORIOS = (openai.APIConnectionError, openai.InternalServerError, httpx.TransportError)
+
+class AgendadorRateLimit:
+    """Agendador das requisições concorrentes à API: limita quantas ficam em voo, pausa
+    todas quando a API sinaliza rate limit (retry-after ou cota da janela esgotada), repete
+    falhas transitórias com backoff exponencial com jitter e corta chamadas com o circuito aberto"""
+    
+    MAX_TENTATIVAS = 5
+    ESPERA_PADRAO = 2.0  # segundos, base do backoff quando a API não informa retry-after
+    ESPERA_MAXIMA = 30.0
+    PADRAO_DURACAO = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+    UNIDADES_DURACAO = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+    
+    def __init__(self, max_concorrencia: int = 4):
+        # Criado dentro do event loop que vai usá-lo
+        self.semaforo = asyncio.Semaphore(max(1, max_concorrencia))
+        self.liberado_em = 0.0  # time.monotonic() a partir do qual novas requisições podem sair
+        self.disjuntor = DisjuntorCircuito()
+    
+    def pausar(self, segundos: float):
+        """Suspende o envio de novas requisições por todos os workers"""
+        self.liberado_em = max(self.liberado_em, time.monotonic() + segundos)
+    
+    async def aguardar_liberacao(self):
+        espera = self.liberado_em - time.monotonic()
+        while espera > 0:
+            await asyncio.sleep(espera)
+            espera = self.liberado_em - time.monotonic()
+    
+    @classmethod
+    def ler_retry_after(cls, headers) -> Optional[float]:
+        """Segundos de espera pedidos pela API (retry-after-ms, retry-after em segundos ou data HTTP)"""
+        if not headers:
+            return None
         
-        .diff-line-content {
-            font-size: 0.85rem;
-            padding: 0.6rem 1rem;
-        }
+        valor_ms = headers.get('retry-after-ms')
+        if valor_ms:
+            try:
+                return max(0.0, float(valor_ms) / 1000)
+            except ValueError:
+                pass
         
-        .diff-stats {
-            flex-direction: column;
-            gap: 1rem;
-        }
+        valor = headers.get('retry-after')
+        if not valor:
+            return None
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            try:
+                return max(0.0, (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                return None
+    
+    @classmethod
+    def ler_duracao(cls, valor: Optional[str]) -> Optional[float]:
+        """Converte durações no formato dos cabeçalhos x-ratelimit-reset-* ("1s", "6m0s", "20ms")"""
+        if not valor:
+            return None
+        partes = cls.PADRAO_DURACAO.findall(valor)
+        if not partes:
+            return None
+        return sum(float(numero) * cls.UNIDADES_DURACAO[unidade] for numero, unidade in partes)
+    
+    def registrar_cabecalhos(self, headers):
+        """Pausa preventivamente quando a cota de requisições ou tokens da janela se esgotou"""
+        if not headers:
+            return
+        for recurso in ('requests', 'tokens'):
+            restantes = headers.get(f'x-ratelimit-remaining-{recurso}')
+            if restantes is not None and restantes.strip() == '0':
+                reset = self.ler_duracao(headers.get(f'x-ratelimit-reset-{recurso}'))
+                if reset:
+                    self.pausar(reset)
+    
+    def espera_com_jitter(self, tentativa: int) -> float:
+        """Backoff exponencial com jitter completo: evita que os workers repitam em sincronia"""
+        return random.uniform(0, min(self.ESPERA_MAXIMA, self.ESPERA_PADRAO * 2 ** tentativa))
+    
+    async def executar(self, fabrica_requisicao, consumir=None):
+        """Executa a requisição (fábrica de coroutine com resposta bruta) respeitando a
+        concorrência máxima, os sinais de rate limit e o circuito; devolve a resposta já interpretada
+        (ou o retorno de consumir(resposta), que roda ainda dentro da vaga, ex.: leitura de um stream)"""
+        for tentativa in range(self.MAX_TENTATIVAS):
+            ultima = tentativa == self.MAX_TENTATIVAS - 1
+            
+            async with self.semaforo:
+                await self.aguardar_liberacao()
+                sonda = self.disjuntor.verificar()
+                try:
+                    resposta = await fabrica_requisicao()
+                    self.registrar_cabecalhos(resposta.headers)
+                    resultado = resposta.parse()
+                    # O stream faz parte da chamada: uma falha no meio dele é repetida como as demais
+                    if consumir is not None:
+                        resultado = await consumir(resultado)
+                except openai.RateLimitError as e:
+                    self.disjuntor.registrar_inconclusivo()
+                    if ultima:
+                        raise
+                    espera = self.ler_retry_after(e.response.headers)
+                    self.pausar(espera if espera is not None else self.espera_com_jitter(tentativa))
+                    continue
+                except ERROS_TRANSITORIOS:
+                    self.disjuntor.registrar_falha()
+                    if ultima:
+                        raise
+                    espera = self.espera_com_jitter(tentativa)
+                except openai.APIStatusError:
+                    # Erro do pedido (4xx), não da API: não adianta repetir nem conta contra o circuito, mas
+                    # também não prova que a API se recuperou (não fecha um circuito meio aberto)
+                    self.disjuntor.registrar_inconclusivo()
+                    raise
+                except openai.APIError as e:
+                    # Evento de erro no meio do stream, depois do 200: rate limit ou falha da API
+                    if e.code == 'rate_limit_exceeded':
+                        self.disjuntor.registrar_inconclusivo()
+                        if ultima:
+                            raise
+                        self.pausar(self.espera_com_jitter(tentativa))
+                        continue
+                    self.disjuntor.registrar_falha()
+                    if ultima:
+                        raise
+                    espera = self.espera_com_jitter(tentativa)
+                else:
+                    # Sucesso só com a resposta inteira lida: a sonda de um circuito meio aberto pode falhar no stream
+                    self.disjuntor.registrar_sucesso()
+                    return resultado
+                finally:
+                    # Sonda encerrada sem veredito (exceção fora da API, cancelamento): outra pode ser enviada
+                    if sonda:
+                        self.disjuntor.registrar_inconclusivo()
+            
+            # Espera fora do semáforo, liberando a vaga para as outras seções
+            await asyncio.sleep(espera)
+
+def diretorio_cache() -> Path:
+    """Diretório dos dados persistentes da análise (cache de respostas e checkpoints)"""
+    return Path(os.environ.get('SOLVI_CACHE_DIR', Path.home() / '.cache' / 'solvi'))
+
+class CacheRespostasLLM:
+    """Cache persistente (SQLite) das análises do modelo, compartilhado entre sessões e processos.
+    Entradas expiram por TTL; acima do tamanho máximo saem as usadas há mais tempo"""
+    
+    TTL_PADRAO = 7 * 24 * 3600  # segundos
+    MAX_BYTES_PADRAO = 64 * 1024 * 1024
+    
+    def __init__(self, caminho: Optional[Path] = None, ttl: float = TTL_PADRAO, max_bytes: int = MAX_BYTES_PADRAO):
+        if caminho is None:
+            caminho = diretorio_cache() / 'respostas_llm.sqlite3'
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
         
-        .diff-controls {
-            flex-direction: column;
-            gap: 1rem;
-        }
-    }
-    
-    /* Animações  */
-    @keyframes fadeInUp {
-        from {
-            opacity: 0;
-            transform: translateY(60px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    @keyframes pulse {
-        0%, 100% {
-            transform: scale(1);
-        }
-        50% {
-            transform: scale(1.03);
-        }
-    }
-    
-    @keyframes float {
-        0%, 100% {
-            transform: translateY(0px);
-        }
-        50% {
-            transform: translateY(-10px);
-        }
-    }
-    
-    .solvi-card, .solvi-metric, .solvi-inspiration-item, .diff-viewer {
-        animation: fadeInUp 0.8s ease-out;
-    }
-    
-    .solvi-logo {
-        animation: pulse 5s ease-in-out infinite;
-    }
-    
-    .solvi-badge {
-        animation: float 6s ease-in-out infinite;
-    }
-    
-    /* Scrollbar  personalizada */
-    ::-webkit-scrollbar {
-        width: 14px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: var(--solvi-surface);
-        border-radius: 14px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--solvi-gradient-primary);
-        border-radius: 14px;
-        border: 3px solid var(--solvi-surface);
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: linear-gradient(135deg, var(--solvi-dark-green) 0%, var(--solvi-primary-green) 100%);
-    }
-    
-    /* Efeitos especiais  */
-    .solvi-glow {
-        box-shadow: 0 0 20px var(--solvi-accent-green);
-    }
-    
-    .solvi-shimmer {
-        background: linear-gradient(45deg, transparent 30%, rgba(255,255,255,0.5) 50%, transparent 70%);
-        background-size: 200% 200%;
-        animation: shimmer 3s ease-in-out infinite;
-    }
+        with self._conexao() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS respostas (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL,
+                    criado_em REAL NOT NULL,
+                    acessado_em REAL NOT NULL,
+                    tamanho INTEGER NOT NULL
+                )
+            """)
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (acessado_em)")
+    
+    @contextmanager
+    def _conexao(self):
+        """Conexão curta por operação (segura entre threads); WAL permite leitores concorrentes"""
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+    
+    @staticmethod
+    def gerar_chave(*partes: str) -> str:
+        """Hash SHA-256 das partes, com prefixo de tamanho para que fronteiras diferentes não colidam"""
+        resumo = hashlib.sha256()
+        for parte in partes:
+            dados = str(parte).encode('utf-8')
+            resumo.update(len(dados).to_bytes(8, 'big'))
+            resumo.update(dados)
+        return resumo.hexdigest()
+    
+    def obter(self, chave: str) -> Optional[Dict]:
+        """Resposta armazenada, ou None se ausente ou expirada"""
+        agora = time.time()
+        with self._conexao() as conexao:
+            linha = conexao.execute(
+                "SELECT valor, criado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                return None
+            if agora - linha[1] > self.ttl:
+                conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                return None
+            conexao.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+        return json.loads(linha[0])
+    
+    def gravar(self, chave: str, valor: Dict):
+        """Armazena a resposta e aplica as políticas de expiração e tamanho"""
+        dados = json.dumps(valor, ensure_ascii=False)
+        agora = time.time()
+        with self._conexao() as conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO respostas (chave, valor, criado_em, acessado_em, tamanho) VALUES (?, ?, ?, ?, ?)",
+                (chave, dados, agora, agora, len(dados.encode('utf-8')))
+            )
+            self._despejar(conexao, agora)
     
-    @keyframes shimmer {
-        0% {
-            background-position: -200% -200%;
-        }
-        100% {
-            background-position: 200% 200%;
-        }
+    def _despejar(self, conexao, agora: float):
+        conexao.execute("DELETE FROM respostas WHERE criado_em < ?", (agora - self.ttl,))
+        
+        total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        for chave, tamanho in conexao.execute("SELECT chave, tamanho FROM respostas ORDER BY acessado_em").fetchall():
+            if total <= self.max_bytes:
+                break
+            conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            total -= tamanho
+    
+    def limpar(self):
+        with self._conexao() as conexao:
+            conexao.execute("DELETE FROM respostas")
+
+class CheckpointAnalise:
+    """Resultados por seção de uma execução, gravados em JSON Lines à medida que concluem,
+    para que uma análise interrompida retome de onde parou"""
+    
+    def __init__(self, identificador: str, diretorio: Optional[Path] = None):
+        diretorio = Path(diretorio) if diretorio else diretorio_cache() / 'checkpoints'
+        diretorio.mkdir(parents=True, exist_ok=True)
+        self.caminho = diretorio / f"{identificador}.jsonl"
+        self._trava = threading.Lock()
+    
+    def carregar(self) -> Dict[str, Dict]:
+        """Seções já concluídas; uma última linha truncada (queda no meio da escrita) é ignorada"""
+        concluidas = {}
+        if not self.caminho.exists():
+            return concluidas
+        with open(self.caminho, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue
+                concluidas[registro['secao']] = registro['resultado']
+        return concluidas
+    
+    def registrar(self, section_name: str, resultado: Dict):
+        linha = json.dumps({'secao': section_name, 'resultado': resultado}, ensure_ascii=False)
+        with self._trava, open(self.caminho, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(linha + '\n')
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+    
+    def concluir(self):
+        """Execução completa: o checkpoint não é mais necessário"""
+        self.caminho.unlink(missing_ok=True)
+
+@st.cache_resource
+def obter_cache_respostas() -> CacheRespostasLLM:
+    """Instância única do cache de respostas por processo (compartilhada entre sessões)"""
+    return CacheRespostasLLM()
+
+@lru_cache(maxsize=1)
+def estilos_relatorio_pdf() -> Dict:
+    """Estilos do relatório PDF, criados uma vez por processo (somente leitura depois de prontos)"""
+    styles = getSampleStyleSheet()
+    return {
+        'titulo': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#1f2937')
+        ),
+        'secao': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=16,
+            spaceAfter=12,
+            textColor=colors.HexColor('#374151')
+        ),
+        'normal': ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=11,
+            spaceAfter=6,
+            alignment=TA_JUSTIFY
+        ),
+        'tabela_metricas': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]),
     }
-</style>
-""", unsafe_allow_html=True)
 
-# Inicializar session state
-def init_session_state():
-    """Inicializa o estado da sessão com configurações """
-    if 'current_tab' not in st.session_state:
-        st.session_state.current_tab = 'comparison'  # Inicia com comparação para mostrar a nova funcionalidade
-    if 'analysis_results' not in st.session_state:
-        st.session_state.analysis_results = None
-    if 'comparison_results' not in st.session_state:
-        st.session_state.comparison_results = None
-    if 'visual_diff_data' not in st.session_state:
-        st.session_state.visual_diff_data = None
+class GeradorRelatoriosPDF:
+    """Gera relatórios PDF numa thread de fundo, com cache pelo hash dos resultados
+    
+    solicitar() devolve imediatamente um Future; pedidos repetidos com os mesmos resultados
+    reaproveitam o mesmo Future (em andamento ou concluído).
+    """
+    
+    MAX_RELATORIOS = 16
+    
+    def __init__(self, max_workers: int = 2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="relatorio-pdf")
+        self.relatorios: "OrderedDict[str, Future]" = OrderedDict()
+        self.trava = threading.Lock()
+    
+    @staticmethod
+    def chave(analysis_results: List[Dict], fre_filename: str) -> str:
+        dados = json.dumps([fre_filename, analysis_results], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(dados.encode('utf-8')).hexdigest()
+    
+    def solicitar(self, analysis_results: List[Dict], fre_filename: str) -> Future:
+        chave = self.chave(analysis_results, fre_filename)
+        with self.trava:
+            tarefa = self.relatorios.get(chave)
+            if tarefa is None or (tarefa.done() and tarefa.exception() is not None):
+                # Cópia rasa: a sessão pode continuar alterando a lista enquanto o PDF é montado
+                tarefa = self.executor.submit(
+                    lambda resultados: FREAnalyzer.generate_pdf_report(resultados, fre_filename).getvalue(),
+                    list(analysis_results)
+                )
+                self.relatorios[chave] = tarefa
+            self.relatorios.move_to_end(chave)
+            while len(self.relatorios) > self.MAX_RELATORIOS:
+                self.relatorios.popitem(last=False)
+            return tarefa
+
+@st.cache_resource
+def obter_gerador_relatorios() -> GeradorRelatoriosPDF:
+    """Gerador de relatórios único por processo (compartilhado entre sessões)"""
+    return GeradorRelatoriosPDF()
+
+CONFORMIDADES = ('CONFORME', 'NAO_CONFORME', 'PARCIALMENTE_CONFORME')
+CRITICIDADES = ('CRITICO', 'ATENCAO', 'SUGESTAO')
+CAMPOS_PONTO_ATENCAO = ('problema', 'criticidade', 'artigo_cvm', 'sugestao')
+
+# Esquema da resposta de análise de seção (formato aceito pelo response_format json_schema estrito)
+ESQUEMA_ANALISE_SECAO = {
+    "type": "object",
+    "properties": {
+        "secao": {"type": "string"},
+        "conformidade": {"type": "string", "enum": list(CONFORMIDADES)},
+        "criticidade": {"type": "string", "enum": list(CRITICIDADES)},
+        "pontos_atencao": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "problema": {"type": "string"},
+                    "criticidade": {"type": "string", "enum": list(CRITICIDADES)},
+                    "artigo_cvm": {"type": "string"},
+                    "sugestao": {"type": "string"}
+                },
+                "required": list(CAMPOS_PONTO_ATENCAO),
+                "additionalProperties": False
+            }
+        },
+        "resumo": {"type": "string"}
+    },
+    "required": ["secao", "conformidade", "criticidade", "pontos_atencao", "resumo"],
+    "additionalProperties": False
+}
+
+def normalizar_enum(valor):
+    """"Não conforme", "CRÍTICO", "parcialmente-conforme" -> NAO_CONFORME, CRITICO, PARCIALMENTE_CONFORME"""
+    if not isinstance(valor, str):
+        return valor
+    sem_acentos = unicodedata.normalize('NFKD', valor).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[\s\-]+', '_', sem_acentos.strip().upper())
+
+def validar_analise_secao(dados) -> List[str]:
+    """Valida (e normaliza no lugar os enums de) uma análise de seção; devolve a lista de erros"""
+    if not isinstance(dados, dict):
+        return ["a resposta deve ser um objeto JSON"]
+    
+    erros = []
+    for campo, valores in (('conformidade', CONFORMIDADES), ('criticidade', CRITICIDADES)):
+        dados[campo] = normalizar_enum(dados.get(campo))
+        if dados[campo] not in valores:
+            erros.append(f"'{campo}' deve ser um de {', '.join(valores)} (recebido: {dados.get(campo)!r})")
+    
+    if not isinstance(dados.get('resumo'), str) or not dados['resumo'].strip():
+        erros.append("'resumo' deve ser um texto não vazio")
+    
+    pontos = dados.get('pontos_atencao')
+    if not isinstance(pontos, list):
+        erros.append("'pontos_atencao' deve ser uma lista")
+        return erros
+    
+    for i, ponto in enumerate(pontos, 1):
+        if not isinstance(ponto, dict):
+            erros.append(f"pontos_atencao[{i}] deve ser um objeto")
+            continue
+        for campo in CAMPOS_PONTO_ATENCAO:
+            if not isinstance(ponto.get(campo), str) or not ponto[campo].strip():
+                erros.append(f"pontos_atencao[{i}].{campo} deve ser um texto não vazio")
+        ponto['criticidade'] = normalizar_enum(ponto.get('criticidade'))
+        if ponto['criticidade'] not in CRITICIDADES:
+            erros.append(f"pontos_atencao[{i}].criticidade deve ser um de {', '.join(CRITICIDADES)}")
+    
+    return erros
+
+# Marca, na fila de eventos da análise, um pedaço de texto transmitido pelo modelo:
+# (TEXTO_PARCIAL, (seção, parte, total de partes), pedaço), com pedaço None no início de cada resposta
+TEXTO_PARCIAL = object()
 
 class FREAnalyzer:
     """Classe  para análise de FRE vs Normas CVM"""
     
-    def __init__(self, api_key):
+    MODELO = "gpt-4"
+    VERSAO_PROMPT = 4  # incrementar sempre que montar_prompt_secao mudar (invalida o cache de respostas)
+    MAX_CONCORRENCIA_PADRAO = 4
+    ORCAMENTO_TOKENS_REFERENCIAS = 1500
+    TOP_K_REFERENCIAS = 8
+    MAX_REPAROS = 2  # novas tentativas de uma resposta fora do esquema, com os erros apontados ao modelo
+    MAX_TOKENS_TRECHO_SECAO = 1200
+    SOBREPOSICAO_TOKENS_SECAO = 150
+    LIMIAR_PONTO_DUPLICADO = 0.85
+    ORDEM_CRITICIDADE = {'CRITICO': 0, 'ATENCAO': 1, 'SUGESTAO': 2}
+    ORDEM_CONFORMIDADE = {'NAO_CONFORME': 0, 'PARCIALMENTE_CONFORME': 1, 'CONFORME': 2}
+    # Seção dispensada pela triagem heurística: nenhum modelo a avaliou, então não é CONFORME
+    NAO_ANALISADA_TRIAGEM = 'NAO_ANALISADA_TRIAGEM'
+    
+    # Roteamento em dois níveis: triagem barata primeiro, MODELO só nas seções sinalizadas
+    ROTEAMENTO_DESATIVADO = 'desativado'
+    ROTEAMENTO_HEURISTICA = 'heuristica'
+    ROTEAMENTO_MODELO = 'modelo'
+    MODELO_TRIAGEM = "gpt-4o-mini"
+    MAX_TOKENS_RESPOSTA = {'triagem': 1000, 'principal': 2000}
+    PRECOS_POR_MIL_TOKENS = {  # US$ (entrada, saída), tabela pública da OpenAI
+        "gpt-4": (0.03, 0.06),
+        "gpt-4o-mini": (0.00015, 0.0006),
+    }
+    MIN_TOKENS_SECAO_TRIAGEM = 150
+    
+    # Reanálise incremental: achados exportados de uma versão anterior do FRE
+    VERSAO_EXPORTACAO = 1
+    PADRAO_ITEM_SECAO = re.compile(r'^\s*(\d+\.\d+)')
+    PADROES_TRIAGEM = (
+        (re.compile(r'n[ãa]o se aplica|n[ãa]o aplic[áa]vel|\bn/a\b|n[ãa]o informad[oa]|a ser definid[oa]|em elabora[çc][ãa]o',
+                    re.IGNORECASE), "informação ausente ou marcada como não aplicável"),
+        (re.compile(r'multa|autua[çc][ãa]o|san[çc][ãa]o|descumpri|irregularidade|inadimpl|ressalva|embargo|'
+                    r'interdi[çc][ãa]o|a[çc][ãa]o civil p[úu]blica|termo de ajustamento', re.IGNORECASE),
+         "menção a sanções, litígios ou descumprimentos"),
+    )
+    
+    def __init__(self, api_key, base_url: Optional[str] = None, max_concorrencia: int = MAX_CONCORRENCIA_PADRAO,
+                 cache: Optional[CacheRespostasLLM] = None, roteamento: str = ROTEAMENTO_DESATIVADO):
         openai.api_key = api_key
-        self.client = openai.OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.base_url = base_url  # permite apontar para um servidor local compatível (ex.: stub_chat_completions.py)
+        self.max_concorrencia = max_concorrencia
+        self.cache = cache
+        self.acertos_cache = 0
+        self.reaproveitadas = 0
+        self.retomadas = 0
+        self._indice_cvm = None  # (texto das normas, IndiceBM25)
+        self.formatos_resposta = {}  # por modelo; None quando o endpoint recusou response_format
+        self.roteamento = roteamento
+        self.escaladas = 0
+        self.metricas_niveis = {}  # nível -> modelo, seções, latência, tokens e custo
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
         
     def extract_text_from_pdf(self, pdf_file):
         """Extrai texto de arquivo PDF com tratamento """
@@ -1329,19 +859,44 @@ class FREAnalyzer:
             st.error("❌ Formato de arquivo não suportado. Use PDF ou Word.")
             return ""
     
-    def analyze_fre_section(self, fre_text, cvm_references, section_name, section_content):
-        """Analisa uma seção específica do FRE contra as normas CVM"""
-        
-        prompt = f"""
+    def indice_referencias(self, cvm_references) -> IndiceBM25:
+        """Índice BM25 das normas CVM, construído uma vez por conjunto de documentos"""
+        if self._indice_cvm is None or self._indice_cvm[0] != cvm_references:
+            self._indice_cvm = (cvm_references, IndiceBM25(cvm_references))
+        return self._indice_cvm[1]
+    
+    def referencias_para_secao(self, cvm_references, section_name, section_content) -> str:
+        """Artigos das normas mais relevantes para a seção, dentro do orçamento de tokens"""
+        trechos = self.indice_referencias(cvm_references).selecionar(
+            f"{section_name}\n{section_content}",
+            self.ORCAMENTO_TOKENS_REFERENCIAS,
+            self.TOP_K_REFERENCIAS
+        )
+        return "\n\n---\n\n".join(trechos)
+    
+    def dividir_secao(self, section_content) -> List[str]:
+        """Trechos sobrepostos da seção dentro do orçamento de tokens (um só se a seção couber inteira)"""
+        return dividir_em_janelas(
+            section_content, self.MAX_TOKENS_TRECHO_SECAO, self.SOBREPOSICAO_TOKENS_SECAO
+        ) or [section_content]
+    
+    def montar_prompt_secao(self, cvm_references, section_name, section_content, parte=1, total_partes=1):
+        """Monta o prompt de análise de uma seção do FRE (ou de um trecho dela)"""
+        referencias = self.referencias_para_secao(cvm_references, section_name, section_content)
+        indicacao_parte = (
+            f" (parte {parte} de {total_partes}; as demais partes são analisadas separadamente)"
+            if total_partes > 1 else ""
+        )
+        return f"""
         Você é um especialista  em regulamentação CVM e análise de Formulários de Referência (FRE).
         
         Analise a seção "{section_name}" do FRE fornecido contra as normas e orientações CVM.
         
-        SEÇÃO ANALISADA:
-        {section_content[:3000]}...
+        SEÇÃO ANALISADA{indicacao_parte}:
+        {section_content}
         
-        NORMAS CVM DE REFERÊNCIA:
-        {cvm_references[:5000]}...
+        NORMAS CVM DE REFERÊNCIA (artigos mais relevantes para esta seção):
+        {referencias}
         
         Para esta seção, identifique:
         
@@ -1373,96 +928,1676 @@ class FREAnalyzer:
         - Use ATENCAO para informações incompletas
         - Use SUGESTAO para melhorias recomendadas
         """
+    
+    @staticmethod
+    def formato_resposta_modelo(modelo: str) -> Optional[Dict]:
+        """response_format suportado pelo modelo: esquema estrito, modo JSON ou nenhum (só o prompt)"""
+        if modelo.startswith(('gpt-4o', 'gpt-4.1', 'o1', 'o3', 'o4')):
+            return {
+                "type": "json_schema",
+                "json_schema": {"name": "analise_secao_fre", "strict": True, "schema": ESQUEMA_ANALISE_SECAO}
+            }
+        if modelo.startswith(('gpt-4-turbo', 'gpt-4-1106', 'gpt-4-0125', 'gpt-3.5-turbo')):
+            return {"type": "json_object"}
+        return None
+    
+    def interpretar_resposta(self, section_name, result) -> Tuple[Optional[Dict], List[str]]:
+        """Decodifica e valida o JSON da resposta do modelo; devolve (dados, erros)"""
+        texto = (result or "").strip()
+        
+        # Cercas de código markdown (```json ... ```) são o desvio mais comum sem JSON mode
+        cerca = re.match(r'^```(?:json)?\s*(.*?)\s*```$', texto, re.DOTALL)
+        if cerca:
+            texto = cerca.group(1)
         
+        inicio = texto.find('{')
+        if inicio < 0:
+            return None, ["a resposta não contém um objeto JSON"]
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=2000
+            dados, _ = json.JSONDecoder().raw_decode(texto, inicio)
+        except json.JSONDecodeError as e:
+            return None, [f"JSON inválido: {e.msg} (linha {e.lineno}, coluna {e.colno})"]
+        
+        erros = validar_analise_secao(dados)
+        if not erros:
+            dados['secao'] = dados.get('secao') or section_name
+        return dados, erros
+    
+    def mensagem_reparo(self, erros: List[str]) -> str:
+        return (
+            "Sua resposta anterior não segue o formato exigido:\n"
+            + "\n".join(f"- {erro}" for erro in erros)
+            + "\n\nResponda novamente APENAS com o objeto JSON corrigido, sem texto adicional."
+        )
+    
+    def resultado_erro(self, section_name, erros: List[str], resposta: str) -> Dict:
+        """Estrutura de erro após esgotar os reparos; a resposta do modelo é preservada para revisão"""
+        return {
+            "secao": section_name,
+            "conformidade": "ERRO_ANALISE",
+            "criticidade": "ATENCAO",
+            "pontos_atencao": [{
+                "problema": "Resposta do modelo fora do formato esperado",
+                "criticidade": "ATENCAO",
+                "artigo_cvm": "Resolução CVM nº 80/22",
+                "sugestao": "Revisar manualmente esta seção"
+            }],
+            "resumo": "Erro na análise automática desta seção: " + "; ".join(erros),
+            "resposta_bruta": resposta
+        }
+    
+    def uso_tokens(self, uso, prompt, conteudo) -> Dict[str, int]:
+        """Tokens consumidos pela requisição (campo usage da API ou estimados)"""
+        if uso is not None and getattr(uso, 'prompt_tokens', None) is not None:
+            return {'prompt': uso.prompt_tokens, 'resposta': uso.completion_tokens or 0}
+        return {'prompt': contar_tokens(prompt), 'resposta': contar_tokens(conteudo)}
+    
+    def deduplicar_pontos(self, pontos: List[Dict]) -> List[Dict]:
+        """Remove pontos repetidos entre trechos sobrepostos, mantendo a maior criticidade"""
+        unicos, normalizados = [], []
+        for ponto in pontos:
+            if not isinstance(ponto, dict):
+                continue
+            texto = ' '.join(IndiceBM25.termos(f"{ponto.get('problema', '')} {ponto.get('artigo_cvm', '')}"))
+            for k, existente in enumerate(normalizados):
+                if difflib.SequenceMatcher(None, texto, existente).ratio() >= self.LIMIAR_PONTO_DUPLICADO:
+                    if (self.ORDEM_CRITICIDADE.get(ponto.get('criticidade'), 3)
+                            < self.ORDEM_CRITICIDADE.get(unicos[k].get('criticidade'), 3)):
+                        unicos[k], normalizados[k] = ponto, texto
+                    break
+            else:
+                unicos.append(ponto)
+                normalizados.append(texto)
+        return unicos
+    
+    def combinar_resultados_parciais(self, section_name, parciais: List[Tuple[Dict, Dict[str, int]]]) -> Dict:
+        """Reduz os resultados dos trechos a um resultado da seção: pior conformidade e criticidade,
+        pontos deduplicados, resumos concatenados e contabilidade de tokens"""
+        uso = {
+            'prompt': sum(u['prompt'] for _, u in parciais),
+            'resposta': sum(u['resposta'] for _, u in parciais),
+            'trechos': len(parciais)
+        }
+        uso['total'] = uso['prompt'] + uso['resposta']
+        
+        validos = [r for r, _ in parciais if r.get('conformidade') != 'ERRO_ANALISE']
+        if not validos:
+            resultado = dict(parciais[0][0])
+        elif len(validos) == 1:
+            resultado = dict(validos[0])
+        else:
+            resultado = {
+                "secao": section_name,
+                "conformidade": min(
+                    (r.get('conformidade', 'PARCIALMENTE_CONFORME') for r in validos),
+                    key=lambda c: self.ORDEM_CONFORMIDADE.get(c, 1)
+                ),
+                "criticidade": min(
+                    (r.get('criticidade', 'ATENCAO') for r in validos),
+                    key=lambda c: self.ORDEM_CRITICIDADE.get(c, 1)
+                ),
+                "pontos_atencao": self.deduplicar_pontos(
+                    [ponto for r in validos for ponto in r.get('pontos_atencao', [])]
+                ),
+                "resumo": "\n".join(
+                    f"(parte {i}/{len(validos)}) {r.get('resumo', '')}" for i, r in enumerate(validos, 1)
+                )
+            }
+        
+        resultado['secao'] = resultado.get('secao') or section_name
+        resultado['uso_tokens'] = uso
+        return resultado
+    
+    def identificador_execucao(self, cvm_references, sections: Dict[str, str]) -> str:
+        """Identifica uma execução (mesmas seções, normas, modelo e prompt) para o checkpoint"""
+        return CacheRespostasLLM.gerar_chave(
+            self.MODELO, self.VERSAO_PROMPT, self.roteamento, cvm_references,
+            *(parte for item in sections.items() for parte in item)
+        )
+    
+    def chave_cache(self, cvm_references, section_name, section_content) -> str:
+        return CacheRespostasLLM.gerar_chave(
+            self.MODELO, self.VERSAO_PROMPT, self.roteamento, section_name, section_content, cvm_references
+        )
+    
+    def consultar_cache(self, chave: str) -> Optional[Dict]:
+        if self.cache is None:
+            return None
+        resultado = self.cache.obter(chave)
+        if resultado is not None:
+            self.acertos_cache += 1
+        return resultado
+    
+    def armazenar_cache(self, chave: str, resultado: Optional[Dict]):
+        # Falhas de interpretação não são cacheadas: a próxima execução tenta de novo
+        if self.cache is not None and resultado and resultado.get('conformidade') != 'ERRO_ANALISE':
+            self.cache.gravar(chave, resultado)
+    
+    def chave_item_secao(self, section_name) -> str:
+        """Item do FRE ("1.1", "4.1"...) que identifica a seção entre versões do documento"""
+        match = self.PADRAO_ITEM_SECAO.match(section_name)
+        return match.group(1) if match else section_name.strip().lower()
+    
+    @staticmethod
+    def texto_comparavel(texto: str) -> str:
+        """Texto da seção sem as diferenças que a extração introduz (espaços, quebras de linha e
+        caracteres de controle); qualquer outra diferença, por menor que seja, conta como alteração"""
+        texto = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]', '', texto)
+        return re.sub(r'\s+', ' ', texto).strip()
+    
+    def exportar_analise(self, cvm_references, fre_filename, resultados: Dict[str, Dict]) -> Dict:
+        """Achados da execução, reaproveitáveis na análise da próxima versão do FRE"""
+        return {
+            'versao': self.VERSAO_EXPORTACAO,
+            'modelo': self.MODELO,
+            'versao_prompt': self.VERSAO_PROMPT,
+            'roteamento': self.roteamento,
+            'referencias_cvm': CacheRespostasLLM.gerar_chave(cvm_references),
+            'fre_filename': fre_filename,
+            'gerado_em': datetime.now(timezone.utc).isoformat(),
+            'resultados': {
+                nome: resultado for nome, resultado in resultados.items()
+                if resultado.get('conformidade') != 'ERRO_ANALISE'
+            },
+        }
+    
+    def planejar_reanalise(self, cvm_references, secoes_anteriores: Dict[str, str], analise_anterior: Dict,
+                           secoes_atuais: Dict[str, str]) -> Dict[str, Dict]:
+        """Achados anteriores das seções que não mudaram entre as duas versões do FRE
+        
+        As seções são pareadas pelo item do FRE e só são reaproveitadas se o texto for idêntico a
+        menos de espaços e quebras de linha (ver texto_comparavel). A detecção de alterações por
+        sentença do comparador ignora sentenças curtas e repetidas ("Risco: Sim." -> "Risco: Não."),
+        por isso não decide o que deixa de ir ao modelo.
+        Levanta ValueError se a análise anterior foi feita com outras normas, modelo ou prompt.
+        Resultados que pararam na triagem só são reaproveitados se o modo de roteamento for o mesmo.
+        """
+        if not isinstance(analise_anterior, dict) or analise_anterior.get('versao') != self.VERSAO_EXPORTACAO:
+            raise ValueError("formato da análise anterior não reconhecido")
+        resultados_exportados = analise_anterior.get('resultados', {})
+        if not isinstance(resultados_exportados, dict) or not all(isinstance(r, dict) for r in resultados_exportados.values()):
+            raise ValueError("resultados da análise anterior em formato inválido")
+        if (analise_anterior.get('modelo'), analise_anterior.get('versao_prompt')) != (self.MODELO, self.VERSAO_PROMPT):
+            raise ValueError("a análise anterior foi feita com outro modelo ou versão do prompt")
+        if analise_anterior.get('referencias_cvm') != CacheRespostasLLM.gerar_chave(cvm_references):
+            raise ValueError("os documentos CVM de referência mudaram desde a análise anterior")
+        
+        anteriores = {self.chave_item_secao(nome): (nome, conteudo) for nome, conteudo in secoes_anteriores.items()}
+        # Uma seção dispensada pela triagem de outro modo (ou de uma exportação sem 'roteamento')
+        # nunca passou pelo modelo que o modo atual exigiria: é reanalisada
+        mesmo_roteamento = analise_anterior.get('roteamento') == self.roteamento
+        resultados_anteriores = {
+            self.chave_item_secao(nome): resultado for nome, resultado in resultados_exportados.items()
+            if mesmo_roteamento or not str(resultado.get('nivel', '')).startswith('triagem')
+        }
+        
+        reaproveitadas = {}
+        for section_name, section_content in secoes_atuais.items():
+            chave = self.chave_item_secao(section_name)
+            if chave not in anteriores or chave not in resultados_anteriores:
+                continue
+            
+            if self.texto_comparavel(anteriores[chave][1]) != self.texto_comparavel(section_content):
+                continue
+            
+            resultado = dict(resultados_anteriores[chave])
+            resultado['reaproveitada_de'] = analise_anterior.get('fre_filename') or 'versão anterior'
+            reaproveitadas[section_name] = resultado
+        
+        return reaproveitadas
+    
+    def analyze_fre_section(self, fre_text, cvm_references, section_name, section_content):
+        """Analisa uma seção específica do FRE contra as normas CVM"""
+        for _, resultado, erro in self.analisar_secoes_concorrente(cvm_references, {section_name: section_content}):
+            if erro is not None:
+                st.error(f"❌ Erro na análise da seção {section_name}: {str(erro)}")
+                return None
+            return resultado
+        return None
+    
+    def formato_resposta(self, modelo: str) -> Optional[Dict]:
+        if modelo not in self.formatos_resposta:
+            self.formatos_resposta[modelo] = self.formato_resposta_modelo(modelo)
+        return self.formatos_resposta[modelo]
+    
+    def registrar_metricas_nivel(self, nivel: str, modelo: str, latencia: float, uso: Dict[str, int]):
+        metricas = self.metricas_niveis.setdefault(nivel, {
+            'modelo': modelo, 'secoes': 0, 'latencia': 0.0, 'prompt': 0, 'resposta': 0, 'custo': 0.0
+        })
+        preco_entrada, preco_saida = self.PRECOS_POR_MIL_TOKENS.get(modelo, (0.0, 0.0))
+        metricas['secoes'] += 1
+        metricas['latencia'] += latencia
+        metricas['prompt'] += uso.get('prompt', 0)
+        metricas['resposta'] += uso.get('resposta', 0)
+        metricas['custo'] += uso.get('prompt', 0) / 1000 * preco_entrada + uso.get('resposta', 0) / 1000 * preco_saida
+    
+    def triagem_heuristica(self, section_name, section_content) -> List[str]:
+        """Sinais locais (sem custo de API) de que a seção pode ter problemas de conformidade"""
+        sinais = []
+        tokens = contar_tokens(section_content)
+        if tokens < self.MIN_TOKENS_SECAO_TRIAGEM:
+            sinais.append(f"seção curta ({tokens} tokens): possível informação incompleta")
+        for padrao, descricao in self.PADROES_TRIAGEM:
+            if padrao.search(section_content):
+                sinais.append(descricao)
+        return sinais
+    
+    def sinais_da_triagem(self, resultado: Dict) -> List[str]:
+        """Motivos para escalar ao modelo principal a partir da análise do modelo de triagem"""
+        sinais = []
+        conformidade = resultado.get('conformidade')
+        if conformidade != 'CONFORME':
+            sinais.append(f"triagem classificou como {conformidade}")
+        criticas = sum(1 for p in resultado.get('pontos_atencao', []) if p.get('criticidade') in ('CRITICO', 'ATENCAO'))
+        if criticas:
+            sinais.append(f"{criticas} ponto(s) CRITICO/ATENCAO na triagem")
+        return sinais
+    
+    async def analisar_com_roteamento(self, cliente, agendador: AgendadorRateLimit, cvm_references,
+                                      section_name, section_content, fila_texto: Optional["queue.Queue"] = None):
+        """Triagem (heurística local ou modelo rápido) e escalonamento só das seções sinalizadas"""
+        if self.roteamento == self.ROTEAMENTO_DESATIVADO:
+            return await self.analyze_fre_section_async(
+                cliente, agendador, cvm_references, section_name, section_content, fila_texto
+            )
+        
+        if self.roteamento == self.ROTEAMENTO_HEURISTICA:
+            inicio = time.perf_counter()
+            sinais = self.triagem_heuristica(section_name, section_content)
+            self.registrar_metricas_nivel('triagem', 'heurística local', time.perf_counter() - inicio,
+                                          {'prompt': 0, 'resposta': 0})
+            triagem = {
+                "secao": section_name,
+                "conformidade": self.NAO_ANALISADA_TRIAGEM,
+                "criticidade": "SUGESTAO",
+                "pontos_atencao": [],
+                "resumo": "Triagem local sem indícios de não conformidade; seção não enviada ao modelo principal."
+            }
+            modelo_triagem = 'heurística local'
+        else:
+            triagem = await self.analyze_fre_section_async(
+                cliente, agendador, cvm_references, section_name, section_content, fila_texto,
+                modelo=self.MODELO_TRIAGEM, nivel='triagem'
+            )
+            sinais = self.sinais_da_triagem(triagem)
+            modelo_triagem = self.MODELO_TRIAGEM
+        
+        if not sinais:
+            triagem['nivel'] = f"triagem ({modelo_triagem})"
+            return triagem
+        
+        self.escaladas += 1
+        resultado = await self.analyze_fre_section_async(
+            cliente, agendador, cvm_references, section_name, section_content, fila_texto
+        )
+        resultado['nivel'] = f"escalada para {self.MODELO}"
+        resultado['motivo_escalonamento'] = "; ".join(sinais)
+        return resultado
+    
+    async def analyze_fre_section_async(self, cliente, agendador: AgendadorRateLimit,
+                                        cvm_references, section_name, section_content,
+                                        fila_texto: Optional["queue.Queue"] = None,
+                                        modelo: Optional[str] = None, nivel: str = 'principal'):
+        """Versão assíncrona de analyze_fre_section (sem chamadas ao Streamlit: roda fora da thread do script)"""
+        modelo = modelo or self.MODELO
+        inicio = time.perf_counter()
+        trechos = self.dividir_secao(section_content)
+        
+        # Map: trechos em paralelo (o agendador limita a concorrência total); reduce: um resultado por seção
+        parciais = await asyncio.gather(*(
+            self._analisar_trecho_async(
+                cliente, agendador, cvm_references, section_name, trecho, parte, len(trechos), fila_texto,
+                modelo, self.MAX_TOKENS_RESPOSTA[nivel]
             )
+            for parte, trecho in enumerate(trechos, 1)
+        ))
+        
+        resultado = self.combinar_resultados_parciais(section_name, parciais)
+        self.registrar_metricas_nivel(nivel, modelo, time.perf_counter() - inicio, resultado['uso_tokens'])
+        return resultado
+    
+    async def _analisar_trecho_async(self, cliente, agendador: AgendadorRateLimit, cvm_references,
+                                     section_name, trecho, parte, total_partes,
+                                     fila_texto: Optional["queue.Queue"] = None, modelo: Optional[str] = None,
+                                     max_tokens: int = 2000) -> Tuple[Dict, Dict[str, int]]:
+        """Analisa um trecho; respostas fora do esquema voltam ao modelo com os erros (até MAX_REPAROS vezes).
+        Com fila_texto, a resposta é pedida em stream e cada pedaço de texto é publicado nela"""
+        mensagens = [{"role": "user", "content": self.montar_prompt_secao(
+            cvm_references, section_name, trecho, parte, total_partes
+        )}]
+        modelo = modelo or self.MODELO
+        uso = {'prompt': 0, 'resposta': 0}
+        reparos = 0
+        
+        while True:
+            formato = self.formato_resposta(modelo)
+            parametros = {"response_format": formato} if formato else {}
+            consumir = None
+            if fila_texto is not None:
+                parametros.update(stream=True, stream_options={"include_usage": True})
+                consumir = lambda stream: self._consumir_stream(stream, (section_name, parte, total_partes), fila_texto)
+            
+            try:
+                resultado = await agendador.executar(lambda: cliente.chat.completions.with_raw_response.create(
+                    model=modelo,
+                    messages=mensagens,
+                    temperature=0.1,
+                    max_tokens=max_tokens,
+                    **parametros
+                ), consumir)
+            except openai.BadRequestError as e:
+                # Endpoint sem suporte a response_format: segue só com o prompt e a validação local
+                if formato and 'response_format' in str(e):
+                    self.formatos_resposta[modelo] = None
+                    continue
+                raise
+            
+            if consumir is not None:
+                conteudo, uso_api = resultado
+            else:
+                conteudo, uso_api = resultado.choices[0].message.content or "", resultado.usage
+            parcial = self.uso_tokens(uso_api, "\n".join(m["content"] for m in mensagens), conteudo)
+            uso['prompt'] += parcial['prompt']
+            uso['resposta'] += parcial['resposta']
+            
+            dados, erros = self.interpretar_resposta(section_name, conteudo)
+            if not erros:
+                return dados, uso
+            if reparos >= self.MAX_REPAROS:
+                return self.resultado_erro(section_name, erros, conteudo), uso
+            
+            reparos += 1
+            mensagens = mensagens + [
+                {"role": "assistant", "content": conteudo},
+                {"role": "user", "content": self.mensagem_reparo(erros)}
+            ]
+    
+    async def _consumir_stream(self, stream, trecho: Tuple[str, int, int], fila_texto: "queue.Queue") -> Tuple[str, object]:
+        """Lê a resposta em stream publicando cada pedaço; devolve (texto completo, usage do último evento).
+        Trechos da mesma seção correm em paralelo e cada reparo/nova tentativa é uma resposta nova:
+        os pedaços levam o trecho e a resposta começa com um aviso para descartar o texto anterior"""
+        fila_texto.put((TEXTO_PARCIAL, trecho, None))
+        partes, uso = [], None
+        async for evento in stream:
+            if getattr(evento, 'usage', None) is not None:
+                uso = evento.usage
+            if evento.choices:
+                pedaco = evento.choices[0].delta.content
+                if pedaco:
+                    partes.append(pedaco)
+                    fila_texto.put((TEXTO_PARCIAL, trecho, pedaco))
+        return ''.join(partes), uso
+    
+    async def _analisar_secoes_async(self, cvm_references, sections: Dict[str, str], fila: "queue.Queue",
+                                     checkpoint: Optional[CheckpointAnalise] = None, transmitir_texto: bool = False,
+                                     reaproveitadas: Optional[Dict[str, Dict]] = None):
+        """Dispara todas as seções de uma vez; o agendador limita quantas ficam em voo"""
+        # Seções sem alterações desde a versão anterior, concluídas numa execução interrompida ou
+        # já analisadas saem direto dos achados anteriores/checkpoint/cache, sem abrir conexão com a API
+        reaproveitadas = reaproveitadas or {}
+        concluidas = checkpoint.carregar() if checkpoint else {}
+        pendentes = {}
+        for section_name, section_content in sections.items():
+            if section_name in reaproveitadas:
+                self.reaproveitadas += 1
+                fila.put((section_name, reaproveitadas[section_name], None))
+                continue
+            
+            if section_name in concluidas:
+                self.retomadas += 1
+                fila.put((section_name, concluidas[section_name], None))
+                continue
             
-            result = response.choices[0].message.content
+            resultado = self.consultar_cache(self.chave_cache(cvm_references, section_name, section_content))
+            if resultado is not None:
+                if checkpoint:
+                    checkpoint.registrar(section_name, resultado)
+                fila.put((section_name, resultado, None))
+            else:
+                pendentes[section_name] = section_content
+        
+        if not pendentes:
+            return
+        
+        agendador = AgendadorRateLimit(self.max_concorrencia)
+        
+        # Retries ficam a cargo do agendador, que conhece o estado compartilhado de rate limit
+        async with openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0) as cliente:
+            async def analisar(section_name, section_content):
+                try:
+                    resultado = await self.analisar_com_roteamento(
+                        cliente, agendador, cvm_references, section_name, section_content,
+                        fila if transmitir_texto else None
+                    )
+                    self.armazenar_cache(self.chave_cache(cvm_references, section_name, section_content), resultado)
+                    # Só resultados válidos entram no checkpoint: seções com erro são refeitas ao retomar
+                    if checkpoint and resultado.get('conformidade') != 'ERRO_ANALISE':
+                        checkpoint.registrar(section_name, resultado)
+                    fila.put((section_name, resultado, None))
+                except Exception as e:
+                    fila.put((section_name, None, e))
             
-            # Tenta extrair JSON da resposta
+            await asyncio.gather(*(analisar(nome, conteudo) for nome, conteudo in pendentes.items()))
+    
+    def analisar_secoes_concorrente(self, cvm_references, sections: Dict[str, str],
+                                    checkpoint: Optional[CheckpointAnalise] = None, ao_receber_texto=None,
+                                    reaproveitadas: Optional[Dict[str, Dict]] = None
+                                    ) -> Iterator[Tuple[str, Optional[Dict], Optional[Exception]]]:
+        """Analisa as seções concorrentemente e entrega (seção, resultado, erro) em ordem de conclusão.
+        Com ao_receber_texto((seção, parte, total de partes), pedaço), a resposta do modelo é transmitida
+        token a token (pedaço None: nova resposta para o trecho, o texto anterior deve ser descartado); o
+        callback roda na thread de quem consome o gerador (seguro para chamadas ao Streamlit). Seções presentes
+        em reaproveitadas (ver planejar_reanalise) não são enviadas ao modelo"""
+        fila = queue.Queue()
+        fim = object()
+        execucao = {}
+        iniciada = threading.Event()
+        
+        async def principal():
+            # Guarda o loop e a tarefa raiz para que o consumidor possa cancelá-la de outra thread
+            execucao['loop'], execucao['tarefa'] = asyncio.get_running_loop(), asyncio.current_task()
+            iniciada.set()
+            await self._analisar_secoes_async(
+                cvm_references, sections, fila, checkpoint, transmitir_texto=ao_receber_texto is not None,
+                reaproveitadas=reaproveitadas
+            )
+        
+        def executar():
             try:
-                json_start = result.find('{')
-                json_end = result.rfind('}') + 1
-                json_str = result[json_start:json_end]
-                return json.loads(json_str)
-            except:
-                # Se falhar, retorna estrutura padrão
-                return {
-                    "secao": section_name,
-                    "conformidade": "ERRO_ANALISE",
-                    "criticidade": "ATENCAO",
-                    "pontos_atencao": [{
-                        "problema": "Erro na análise automática",
-                        "criticidade": "ATENCAO",
-                        "artigo_cvm": "Resolução CVM nº 80/22",
-                        "sugestao": "Revisar manualmente esta seção"
-                    }],
-                    "resumo": "Erro na análise automática desta seção"
-                }
-                
-        except Exception as e:
-            st.error(f"❌ Erro na análise da seção {section_name}: {str(e)}")
-            return None
-    
-    def extract_fre_sections(self, fre_text):
-        """Extrai as seções principais do FRE"""
-        sections = {}
-        
-        # Padrões para identificar seções do FRE
-        section_patterns = [
-            r"1\.1\s+Histórico do emissor",
-            r"1\.2\s+Descrição das principais atividades",
-            r"1\.3\s+Informações relacionadas aos segmentos operacionais",
-            r"1\.4\s+Produção/Comercialização/Mercados",
-            r"1\.5\s+Principais clientes",
-            r"1\.6\s+Efeitos relevantes da regulação estatal",
-            r"1\.9\s+Informações ambientais sociais e de governança",
-            r"2\.1\s+Condições financeiras e patrimoniais",
-            r"2\.2\s+Resultados operacional e financeiro",
-            r"4\.1\s+Descrição dos fatores de risco",
-            r"7\.1\s+Principais características dos órgãos de administração",
-            r"8\.1\s+Política ou prática de remuneração",
-            r"11\.1\s+Regras, políticas e práticas",
-            r"12\.1\s+Informações sobre o capital social"
+                asyncio.run(principal())
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                fila.put((None, None, e))
+            finally:
+                iniciada.set()
+                fila.put(fim)
+        
+        # Event loop próprio numa thread: o script do Streamlit continua livre para atualizar a tela
+        thread = threading.Thread(target=executar, daemon=True)
+        thread.start()
+        
+        try:
+            while True:
+                item = fila.get()
+                if item is fim:
+                    break
+                if item[0] is TEXTO_PARCIAL:
+                    ao_receber_texto(item[1], item[2])
+                    continue
+                yield item
+        finally:
+            # Consumidor interrompido (rerun/StopException do Streamlit, erro no callback, gerador
+            # fechado): cancela as requisições em voo em vez de deixá-las consumindo cota em segundo plano
+            if thread.is_alive():
+                iniciada.wait()
+                if 'tarefa' in execucao:
+                    try:
+                        execucao['loop'].call_soon_threadsafe(execucao['tarefa'].cancel)
+                    except RuntimeError:
+                        pass  # loop já encerrado
+            thread.join()
+    
+    @staticmethod
+    def generate_pdf_report(analysis_results, fre_filename):
+        """Gera relatório em PDF (sem chamadas ao Streamlit: roda na thread do GeradorRelatoriosPDF)"""
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch)
+        estilos = estilos_relatorio_pdf()
+        title_style, heading_style, normal_style = estilos['titulo'], estilos['secao'], estilos['normal']
+        
+        def texto(valor) -> str:
+            # Respostas do modelo podem conter '<' e '&', que quebrariam o markup do Paragraph
+            return html.escape(str(valor), quote=False)
+        
+        story = []
+        
+        # Título
+        story.append(Paragraph("Relatório de Análise FRE vs Normas CVM", title_style))
+        story.append(Spacer(1, 20))
+        
+        # Informações gerais
+        story.append(Paragraph(f"<b>Arquivo analisado:</b> {texto(fre_filename)}", normal_style))
+        story.append(Paragraph(f"<b>Data da análise:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", normal_style))
+        story.append(Spacer(1, 20))
+        
+        # Resumo Executivo
+        story.append(Paragraph("RESUMO EXECUTIVO", heading_style))
+        
+        # Métricas gerais
+        # Seções dispensadas pela triagem local ficam fora da taxa de conformidade
+        nao_analisadas = sum(1 for r in analysis_results if r.get('conformidade') == FREAnalyzer.NAO_ANALISADA_TRIAGEM)
+        total_sections = len(analysis_results) - nao_analisadas
+        critico_count = sum(1 for r in analysis_results if any(p.get('criticidade') == 'CRITICO' for p in r.get('pontos_atencao', [])))
+        atencao_count = sum(1 for r in analysis_results if any(p.get('criticidade') == 'ATENCAO' for p in r.get('pontos_atencao', [])))
+        taxa_conformidade = (total_sections - critico_count) / total_sections * 100 if total_sections else 0.0
+        
+        metrics_data = [
+            ['Métrica', 'Valor'],
+            ['Total de seções analisadas', str(total_sections)],
+            ['Seções com pontos críticos', str(critico_count)],
+            ['Seções com pontos de atenção', str(atencao_count)],
+            ['Taxa de conformidade', f"{taxa_conformidade:.1f}%"]
         ]
+        if nao_analisadas:
+            metrics_data.append(['Seções não analisadas (dispensadas pela triagem local)', str(nao_analisadas)])
+        
+        metrics_table = Table(metrics_data)
+        metrics_table.setStyle(estilos['tabela_metricas'])
+        
+        story.append(metrics_table)
+        story.append(PageBreak())
         
-        # Divide o texto em seções
-        lines = fre_text.split('\n')
-        current_section = None
-        current_content = []
-        
-        for line in lines:
-            # Verifica se a linha corresponde a uma nova seção
-            section_found = False
-            for pattern in section_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
-                    # Salva a seção anterior se existir
-                    if current_section and current_content:
-                        sections[current_section] = '\n'.join(current_content)
+        # Análise Detalhada
+        story.append(Paragraph("ANÁLISE DETALHADA POR SEÇÃO", heading_style))
+        
+        for result in analysis_results:
+            if not result:
+                continue
+            
+            # Nome da seção
+            story.append(Paragraph(f"<b>{texto(result.get('secao', 'Seção não identificada'))}</b>", heading_style))
+            
+            # Status de conformidade
+            conformidade = result.get('conformidade', 'N/A')
+            color = (colors.green if conformidade == 'CONFORME' else colors.red if conformidade == 'NAO_CONFORME'
+                     else colors.grey if conformidade == FREAnalyzer.NAO_ANALISADA_TRIAGEM else colors.orange)
+            story.append(Paragraph(f"<b>Status:</b> <font color='{color.hexval()}'>{texto(conformidade)}</font>", normal_style))
+            if result.get('nivel'):
+                story.append(Paragraph(f"<b>Nível:</b> {texto(result['nivel'])}", normal_style))
+            
+            # Resumo
+            story.append(Paragraph(f"<b>Resumo:</b> {texto(result.get('resumo', 'N/A'))}", normal_style))
+            
+            # Pontos de atenção
+            pontos = result.get('pontos_atencao', [])
+            if pontos:
+                story.append(Paragraph("<b>Pontos de Atenção:</b>", normal_style))
+                
+                for i, ponto in enumerate(pontos, 1):
+                    criticidade = ponto.get('criticidade', 'N/A')
+                    emoji = "🔴" if criticidade == "CRITICO" else "🟡" if criticidade == "ATENCAO" else "🟢"
                     
-                    # Inicia nova seção
-                    current_section = line.strip()
-                    current_content = [line]
-                    section_found = True
-                    break
+                    story.append(Paragraph(f"{emoji} <b>Ponto {i}:</b> {texto(ponto.get('problema', 'N/A'))}", normal_style))
+                    story.append(Paragraph(f"<b>Base legal:</b> {texto(ponto.get('artigo_cvm', 'N/A'))}", normal_style))
+                    story.append(Paragraph(f"<b>Sugestão:</b> {texto(ponto.get('sugestao', 'N/A'))}", normal_style))
+                    story.append(Spacer(1, 10))
+            
+            story.append(Spacer(1, 20))
+        
+        # Constrói o PDF
+        doc.build(story)
+        buffer.seek(0)
+        return buffer
+    
+    def extract_fre_sections(self, fre_text) -> 'SecoesFRE':
+        """Extrai as seções principais do FRE (conteúdo fatiado do texto só quando acessado)"""
+        return SecoesFRE(fre_text, localizar_secoes_fre(fre_text))
+
+# Taxonomia do FRE (itens do Anexo C da Resolução CVM 80) mantida como dado, fora do código
+TAXONOMIA_FRE_ARQUIVO = Path(__file__).parent / "taxonomia_fre.json"
+PALAVRAS_TITULO_DETECCAO = 3  # palavras iniciais do título exigidas após o número do item
+
+@lru_cache(maxsize=1)
+def carregar_taxonomia_fre() -> Dict:
+    """Taxonomia do FRE com índices por número de item: títulos, pais e ordem no formulário"""
+    with open(TAXONOMIA_FRE_ARQUIVO, encoding='utf-8') as arquivo:
+        taxonomia = json.load(arquivo)
+    
+    titulos, pais, ordem = {}, {}, {}
+    
+    def indexar(nos: List[Dict], pai: Optional[str]):
+        for no in nos:
+            titulos[no['numero']] = no['titulo']
+            pais[no['numero']] = pai
+            ordem[no['numero']] = len(ordem)
+            indexar(no.get('itens', []), no['numero'])
+    
+    indexar(taxonomia['secoes'], None)
+    taxonomia.update(titulos=titulos, pais=pais, ordem=ordem)
+    return taxonomia
+
+# Candidatos a título: o ponto de um número de item ("1.1", "12.10"); começar pelo literal
+# deixa a varredura na busca rápida de caractere do re, e os dígitos anteriores são lidos à mão
+PADRAO_NUMERO_ITEM_FRE = re.compile(r'\.(?<=\d\.)\d{1,2}(?!\d)')
+# Fim de linha do sumário/índice: pontilhado seguido (ou não, quando a extração quebra a linha) do número da página
+PADRAO_LINHA_SUMARIO = re.compile(r'(?:[.…·_][^\S\n]*){3,}\d{0,4}[^\S\n]*$')
+
+@lru_cache(maxsize=1)
+def detector_secoes_fre() -> Dict[str, "re.Pattern"]:
+    """Padrão compilado do título de cada item da taxonomia (número do item -> padrão)
+    
+    O texto é varrido uma única vez atrás de números de item; só nos números que existem na
+    taxonomia o padrão do título (primeiras palavras, sem atravessar a quebra de linha) é
+    testado naquela posição.
+    """
+    taxonomia = carregar_taxonomia_fre()
+    padroes = {}
+    for numero, titulo in taxonomia['titulos'].items():
+        if taxonomia['pais'][numero] is None:
+            continue  # seções de primeiro nível: só os itens delimitam conteúdo
+        palavras = re.findall(r'\w+', titulo)[:PALAVRAS_TITULO_DETECCAO]
+        padroes[numero] = re.compile(
+            r"(?:[^\S\n]*/[^\S\n]*\d{1,2}\.\d{1,2})?[^\S\n]*[-–.]?[^\S\n]*"
+            + r"[^\w\n]+".join(re.escape(palavra) for palavra in palavras),
+            re.IGNORECASE
+        )
+    return padroes
+
+def localizar_secoes_fre(fre_text: str) -> List[Tuple[str, str, int, int]]:
+    """Seções do FRE como (item, título, início, fim): offsets no texto, da linha do título até a próxima seção
+    
+    Só abre seção o número de item no início da linha (referências cruzadas no meio do texto não
+    contam). Linhas do sumário (título com pontilhado e número de página) não abrem seção, os itens
+    que reaparecem depois do sumário ignoram as ocorrências anteriores a ele (títulos quebrados em
+    duas linhas no índice, capa), e das ocorrências repetidas de um item fica a que segue a ordem
+    da taxonomia (ver ocorrencias_em_ordem).
+    """
+    padroes_titulo = detector_secoes_fre()
+    inicios = []
+    fim_sumario = -1
+    for match in PADRAO_NUMERO_ITEM_FRE.finditer(fre_text):
+        inicio_numero = match.start() - 1
+        if inicio_numero > 0 and fre_text[inicio_numero - 1].isdigit():
+            inicio_numero -= 1
+        if inicio_numero > 0 and (fre_text[inicio_numero - 1].isdigit() or fre_text[inicio_numero - 1] == '.'):
+            continue  # "1.1" dentro de "111.1" ou "2.1.1"
+        inicio_linha = fre_text.rfind('\n', 0, inicio_numero) + 1
+        if fre_text[inicio_linha:inicio_numero].strip():
+            continue  # número no meio da linha ("ver item 4.1 Descrição dos fatores de risco")
+        
+        numero = fre_text[inicio_numero:match.end()]
+        padrao_titulo = padroes_titulo.get(numero)
+        if padrao_titulo is None or not padrao_titulo.match(fre_text, match.end()):
+            continue
+        fim_linha = fre_text.find('\n', match.end())
+        fim_linha = len(fre_text) if fim_linha == -1 else fim_linha
+        if PADRAO_LINHA_SUMARIO.search(fre_text, match.end(), fim_linha):
+            fim_sumario = fim_linha
+            continue
+        fim_proxima = fre_text.find('\n', fim_linha + 1)
+        fim_proxima = len(fre_text) if fim_proxima == -1 else fim_proxima
+        if PADRAO_LINHA_SUMARIO.search(fre_text, fim_linha + 1, fim_proxima):
+            fim_sumario = fim_proxima  # título do índice quebrado em duas linhas: fica se não reaparecer
+        inicios.append((numero, inicio_linha))
+    
+    if fim_sumario >= 0:
+        depois_do_sumario = {numero for numero, inicio in inicios if inicio > fim_sumario}
+        inicios = [(numero, inicio) for numero, inicio in inicios
+                   if inicio > fim_sumario or numero not in depois_do_sumario]
+    inicios = [inicios[i] for i in ocorrencias_em_ordem([numero for numero, _ in inicios])]
+    
+    limites = []
+    for posicao, (numero, inicio) in enumerate(inicios):
+        fim = inicios[posicao + 1][1] - 1 if posicao + 1 < len(inicios) else len(fre_text)
+        fim_titulo = fre_text.find('\n', inicio, fim)
+        titulo = fre_text[inicio:fim if fim_titulo == -1 else fim_titulo].strip()
+        limites.append((numero, titulo, inicio, fim))
+    return limites
+
+def ocorrencias_em_ordem(numeros: List[str]) -> List[int]:
+    """Posições (na lista de números de item, em ordem do documento) das ocorrências que abrem seção
+    
+    As seções reais seguem a ordem da taxonomia; uma repetição fora dela é referência cruzada no
+    corpo de outro item ("4.1 Descrição dos fatores de risco" dentro do 12.1). De cada item repetido
+    fica a ocorrência na maior subsequência crescente pela ordem da taxonomia (em empate, a mais
+    adiante: sumário sem pontilhado); sem nenhuma nela, a primeira. Itens sem repetição ficam
+    sempre, mesmo fora de ordem (numeração antiga do formulário).
+    """
+    ordem = carregar_taxonomia_fre()['ordem']
+    chaves = [ordem.get(numero, -1) for numero in numeros]
+    
+    # Maior subsequência estritamente crescente (paciência): caudas guarda posições, anteriores o encadeamento
+    caudas, chaves_caudas, anteriores = [], [], [None] * len(chaves)
+    for posicao, chave in enumerate(chaves):
+        tamanho = bisect.bisect_left(chaves_caudas, chave)
+        anteriores[posicao] = caudas[tamanho - 1] if tamanho else None
+        if tamanho == len(caudas):
+            caudas.append(posicao)
+            chaves_caudas.append(chave)
+        else:
+            caudas[tamanho] = posicao
+            chaves_caudas[tamanho] = chave
+    em_ordem = set()
+    posicao = caudas[-1] if caudas else None
+    while posicao is not None:
+        em_ordem.add(posicao)
+        posicao = anteriores[posicao]
+    
+    repeticoes = Counter(numeros)
+    itens_em_ordem = {numeros[posicao] for posicao in em_ordem}
+    mantidas, vistos = [], set()
+    for posicao, numero in enumerate(numeros):
+        if repeticoes[numero] == 1 or posicao in em_ordem or (numero not in itens_em_ordem and numero not in vistos):
+            mantidas.append(posicao)
+        vistos.add(numero)
+    return mantidas
+
+def uma_secao_por_item(limites: Iterable[Tuple]) -> List[Tuple]:
+    """Um trecho por item da taxonomia, na ordem do documento (ver ocorrencias_em_ordem)
+    
+    O tamanho do trecho não serve de critério (a linha do índice costuma ser mais longa que um
+    item "Não aplicável"), nem a posição sozinha (uma referência cruzada vem depois do título real).
+    """
+    entradas = sorted(limites, key=lambda entrada: entrada[2])
+    return [entradas[posicao] for posicao in ocorrencias_em_ordem([entrada[0] for entrada in entradas])]
+
+class SecoesFRE(Mapping):
+    """Seções do FRE indexadas por título; guarda só offsets e fatia o texto sob demanda"""
+    
+    __slots__ = ('texto', 'limites', 'itens')
+    unidade = 'caracteres'  # unidade dos offsets em limites
+    
+    def __init__(self, texto: str, limites: Iterable[Tuple[str, str, int, int]]):
+        self.texto = texto
+        self.limites: Dict[str, Tuple[int, int]] = {}
+        self.itens: Dict[str, str] = {}  # título -> número do item na taxonomia
+        for numero, titulo, inicio, fim in uma_secao_por_item(limites):
+            self.limites[titulo] = (inicio, fim)
+            self.itens[titulo] = numero
+    
+    def __getitem__(self, titulo: str) -> str:
+        inicio, fim = self.limites[titulo]
+        return self.texto[inicio:fim]
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.limites)
+    
+    def __len__(self) -> int:
+        return len(self.limites)
+    
+    def subconjunto(self, titulos: Iterable[str]) -> 'SecoesFRE':
+        """Somente as seções escolhidas, na ordem do documento"""
+        escolhidos = set(titulos)
+        return SecoesFRE(self.texto, (
+            (self.itens[titulo], titulo, inicio, fim)
+            for titulo, (inicio, fim) in self.limites.items() if titulo in escolhidos
+        ))
+    
+    def texto_dos_itens(self, numeros: Iterable[str]) -> str:
+        """Conteúdo dos itens da taxonomia escolhidos, concatenado na ordem do documento"""
+        escolhidos = set(numeros)
+        return '\n'.join(self[titulo] for titulo, numero in self.itens.items() if numero in escolhidos)
+    
+    def arvore(self) -> List[Dict]:
+        """Índice hierárquico com offsets: seções da taxonomia cobrindo o trecho das seções encontradas"""
+        taxonomia = carregar_taxonomia_fre()
+        nos = {}
+        raizes = []
+        
+        def obter_no(numero: str) -> Dict:
+            if numero not in nos:
+                no = {'numero': numero, 'titulo': taxonomia['titulos'][numero], 'inicio': None, 'fim': None, 'filhos': []}
+                nos[numero] = no
+                pai = taxonomia['pais'][numero]
+                (obter_no(pai)['filhos'] if pai else raizes).append(no)
+            return nos[numero]
+        
+        for titulo, (inicio, fim) in self.limites.items():
+            numero = self.itens[titulo]
+            folha = {'numero': numero, 'titulo': titulo, 'inicio': inicio, 'fim': fim, 'filhos': []}
+            pai = taxonomia['pais'][numero]
+            (obter_no(pai)['filhos'] if pai else raizes).append(folha)
+            while pai:
+                ancestral = nos[pai]
+                ancestral['inicio'] = inicio if ancestral['inicio'] is None else min(ancestral['inicio'], inicio)
+                ancestral['fim'] = fim if ancestral['fim'] is None else max(ancestral['fim'], fim)
+                pai = taxonomia['pais'][pai]
+        
+        def ordenar(lista: List[Dict]):
+            lista.sort(key=lambda no: (taxonomia['ordem'].get(no['numero'], 0), no['inicio'] or 0))
+            for no in lista:
+                ordenar(no['filhos'])
+        
+        ordenar(raizes)
+        return raizes
+
+def padrao_titulo_sumario(titulo: str) -> "re.Pattern":
+    """Título de um marcador do PDF no início de uma linha do texto da página, mesmo quebrado em várias
+    linhas pela extração (o impresso pode trazer o número do item que o marcador omite)"""
+    return re.compile(
+        r"^[ \t]*(?:\d{1,2}\.\d{1,2}\W+)?" + r"\W+".join(re.escape(palavra) for palavra in re.findall(r'\w+', titulo)),
+        re.IGNORECASE | re.MULTILINE
+    )
+
+def padrao_inicio_item(numero: str) -> "re.Pattern":
+    """Número de um item do FRE no início de uma linha ("1.2", mas não "1.20" nem "1.2.1")"""
+    return re.compile(rf"^[ \t]*{re.escape(numero)}(?!\.?\d)", re.MULTILINE)
+
+class SecoesFREPorSumario(SecoesFRE):
+    """Seções do FRE localizadas pelos marcadores (outline) do PDF
+    
+    limites guarda intervalos de páginas [início, fim); o texto de uma seção é extraído só
+    quando acessado, apenas das suas páginas, e recortado entre o seu título e o do
+    marcador seguinte.
+    """
+    
+    __slots__ = ('pdf_bytes', 'proximos', '_documento', '_paginas')
+    unidade = 'páginas'
+    
+    def __init__(self, pdf_bytes: bytes, entradas: Iterable[Tuple[str, str, int, int, Optional[str]]],
+                 _compartilhado: Optional['SecoesFREPorSumario'] = None):
+        self.pdf_bytes = pdf_bytes
+        self.limites = {}
+        self.itens = {}
+        self.proximos: Dict[str, Optional[str]] = {}  # título do marcador seguinte, para recortar o fim
+        for numero, titulo, pagina_inicio, pagina_fim, proximo in uma_secao_por_item(entradas):
+            self.limites[titulo] = (pagina_inicio, pagina_fim)
+            self.itens[titulo] = numero
+            self.proximos[titulo] = proximo
+        # Subconjuntos reaproveitam o documento aberto e as páginas já extraídas
+        self._documento = _compartilhado._documento if _compartilhado else None
+        self._paginas: Dict[int, str] = _compartilhado._paginas if _compartilhado else {}
+    
+    def texto_pagina(self, numero_pagina: int) -> str:
+        if numero_pagina not in self._paginas:
+            if self._documento is None:
+                self._documento = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+            self._paginas[numero_pagina] = self._documento[numero_pagina].get_text()
+        return self._paginas[numero_pagina]
+    
+    @property
+    def texto(self) -> str:
+        if self._documento is None:
+            self._documento = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+        return '\n'.join(self.texto_pagina(numero) for numero in range(self._documento.page_count))
+    
+    def __getitem__(self, titulo: str) -> str:
+        pagina_inicio, pagina_fim = self.limites[titulo]
+        texto = '\n'.join(self.texto_pagina(numero) for numero in range(pagina_inicio, pagina_fim))
+        
+        numero = self.itens[titulo]
+        match = padrao_titulo_sumario(titulo).search(texto) or padrao_inicio_item(numero).search(texto)
+        inicio = match.start() if match else 0
+        
+        # O título do marcador costuma diferir do impresso (abreviado, outro travessão, truncado):
+        # o corte fica no primeiro sinal do item seguinte, e o número do item é o sinal mais estável.
+        # Só o marcador seguinte corta: outros títulos no trecho são referências cruzadas no corpo
+        cortes = [len(texto)]
+        proximo = self.proximos[titulo]
+        if proximo:
+            match = padrao_titulo_sumario(proximo).search(texto, inicio + 1)
+            if match:
+                cortes.append(match.start())
+            itens_proximo = localizar_secoes_fre(proximo)
+            if itens_proximo:
+                match = padrao_inicio_item(itens_proximo[0][0]).search(texto, inicio + 1)
+                if match:
+                    cortes.append(match.start())
+        return texto[inicio:min(cortes)].strip()
+    
+    def subconjunto(self, titulos: Iterable[str]) -> 'SecoesFREPorSumario':
+        escolhidos = set(titulos)
+        return SecoesFREPorSumario(self.pdf_bytes, (
+            (self.itens[titulo], titulo, inicio, fim, self.proximos[titulo])
+            for titulo, (inicio, fim) in self.limites.items() if titulo in escolhidos
+        ), _compartilhado=self)
+
+def localizar_secoes_por_sumario(pdf_bytes: bytes) -> Optional[SecoesFREPorSumario]:
+    """Mapeia os itens do FRE para intervalos de páginas pelos marcadores do PDF, sem extrair texto
+    
+    Devolve None quando o PDF não tem marcadores que correspondam a itens da taxonomia
+    (a detecção por expressões regulares no texto continua sendo o caminho padrão).
+    """
+    try:
+        documento = fitz.open(stream=pdf_bytes, filetype="pdf")
+        sumario = [(titulo.strip(), pagina - 1) for _, titulo, pagina in documento.get_toc(simple=True) if pagina >= 1]
+        total_paginas = documento.page_count
+        documento.close()
+    except Exception:
+        return None
+    
+    entradas = []
+    for posicao, (titulo, pagina) in enumerate(sumario):
+        itens = localizar_secoes_fre(titulo)
+        if not itens:
+            continue  # marcador que não é item do FRE (capa, seção de primeiro nível, anexos...)
+        proximo = sumario[posicao + 1] if posicao + 1 < len(sumario) else None
+        # A página do marcador seguinte entra no intervalo: a seção pode terminar no meio dela
+        pagina_fim = max(proximo[1], pagina) + 1 if proximo else total_paginas
+        entradas.append((itens[0][0], titulo, pagina, pagina_fim, proximo[0] if proximo else None))
+    
+    return SecoesFREPorSumario(pdf_bytes, entradas) if entradas else None
+
+class SourceMap:
+    """Mapa compacto de coordenadas do texto extraído (página, linha e caractere)
+    
+    Guarda apenas offsets cumulativos: o início de cada página (em linhas e caracteres)
+    e o início de cada linha no texto completo (páginas unidas por '\n'). As consultas
+    são feitas com bisect, sem custo adicional por linha do diff.
+    """
+    
+    __slots__ = ('inicios_pagina_linha', 'inicios_pagina_char', 'inicios_linha_char', 'proximo_char')
+    
+    def __init__(self, paginas: Iterable[str] = ()):
+        self.inicios_pagina_linha = array('q')
+        self.inicios_pagina_char = array('q')
+        self.inicios_linha_char = array('q')
+        self.proximo_char = 0
+        for pagina in paginas:
+            self.adicionar_pagina(pagina)
+    
+    def adicionar_pagina(self, texto: str):
+        """Registra a próxima página extraída"""
+        inicio = self.proximo_char
+        self.inicios_pagina_char.append(inicio)
+        self.inicios_pagina_linha.append(len(self.inicios_linha_char))
+        self.inicios_linha_char.append(inicio)
+        
+        posicao = texto.find('\n')
+        while posicao != -1:
+            self.inicios_linha_char.append(inicio + posicao + 1)
+            posicao = texto.find('\n', posicao + 1)
+        
+        self.proximo_char = inicio + len(texto) + 1
+    
+    def __len__(self) -> int:
+        return len(self.inicios_pagina_char)
+    
+    def localizar_linha(self, indice_linha: int) -> Tuple[int, int]:
+        """Página e linha na página (base 1) de uma linha do texto completo (base 0)"""
+        pagina = bisect.bisect_right(self.inicios_pagina_linha, indice_linha) - 1
+        return pagina + 1, indice_linha - self.inicios_pagina_linha[pagina] + 1
+    
+    def coordenadas(self, inicio: int, fim: int) -> Dict:
+        """Coordenadas de um trecho [inicio, fim) do texto completo"""
+        pagina = bisect.bisect_right(self.inicios_pagina_char, inicio) - 1
+        indice_linha = bisect.bisect_right(self.inicios_linha_char, inicio) - 1
+        inicio_pagina = self.inicios_pagina_char[pagina]
+        
+        return {
+            'pagina': pagina + 1,
+            'linha': indice_linha - self.inicios_pagina_linha[pagina] + 1,
+            'coluna': inicio - self.inicios_linha_char[indice_linha] + 1,
+            'inicio': inicio - inicio_pagina,
+            'fim': fim - inicio_pagina
+        }
+
+# Códigos compactos dos tipos de linha do diff visual
+DIFF_INALTERADO = 0
+DIFF_ADICIONADO = 1
+DIFF_REMOVIDO = 2
+DIFF_MODIFICADO = 3
+DIFF_TIPOS = ('unchanged', 'added', 'removed', 'modified')
+
+class VisualDiffResult:
+    """Resultado compacto do diff visual em arrays paralelos
+    
+    Cada linha do diff ocupa apenas um código de tipo e dois índices inteiros
+    (linha no documento de referência e no novo, -1 quando ausente). O texto
+    é buscado sob demanda nas listas de linhas originais.
+    """
+    
+    __slots__ = ('linhas_ref', 'linhas_novo', 'tipos', 'indices_ref', 'indices_novo', 'algoritmo',
+                 'inicio_ref', 'inicio_novo', 'mapa_ref', 'mapa_novo', 'indices_por_tipo', 'indices_diferencas',
+                 '_lado_a_lado')
+    
+    def __init__(self, linhas_ref: List[str], linhas_novo: List[str], inicio_ref: int = 0, inicio_novo: int = 0,
+                 mapa_ref: Optional[SourceMap] = None, mapa_novo: Optional[SourceMap] = None):
+        self.linhas_ref = linhas_ref
+        self.linhas_novo = linhas_novo
+        self.algoritmo = None
+        # Deslocamento das linhas no documento completo (hunks do modo streaming)
+        self.inicio_ref = inicio_ref
+        self.inicio_novo = inicio_novo
+        # Coordenadas de página de cada documento (opcionais)
+        self.mapa_ref = mapa_ref
+        self.mapa_novo = mapa_novo
+        self.tipos = array('b')
+        self.indices_ref = array('i')
+        self.indices_novo = array('i')
+        # Índices pré-calculados por tipo (estatísticas em O(1), filtros em O(k))
+        self.indices_por_tipo = tuple(array('i') for _ in DIFF_TIPOS)
+        self.indices_diferencas = array('i')
+        # Pares da visão lado a lado, montados uma única vez sob demanda
+        self._lado_a_lado = None
+    
+    def adicionar(self, tipo: int, indice_ref: int, indice_novo: int):
+        """Acrescenta uma linha ao diff"""
+        posicao = len(self.tipos)
+        self.tipos.append(tipo)
+        self.indices_ref.append(indice_ref)
+        self.indices_novo.append(indice_novo)
+        self.indices_por_tipo[tipo].append(posicao)
+        if tipo != DIFF_INALTERADO:
+            self.indices_diferencas.append(posicao)
+    
+    def __len__(self) -> int:
+        return len(self.tipos)
+    
+    def contar(self, tipo: int) -> int:
+        """Conta as linhas de um tipo"""
+        return len(self.indices_por_tipo[tipo])
+    
+    def lado_a_lado(self) -> Dict:
+        """Linhas da visão lado a lado a partir dos pares alinhados do diff
+        
+        Cada linha da visão aponta para uma linha do diff à esquerda e outra à direita (-1 quando
+        vazia). Linhas inalteradas e modificadas ocupam os dois lados; sequências de remoções e
+        adições vizinhas são emparelhadas, como no GitHub. O resultado fica guardado no objeto.
+        """
+        if self._lado_a_lado is not None:
+            return self._lado_a_lado
+        
+        esquerda, direita = array('i'), array('i')
+        removidas, adicionadas = [], []
+        
+        def descarregar():
+            for k in range(max(len(removidas), len(adicionadas))):
+                esquerda.append(removidas[k] if k < len(removidas) else -1)
+                direita.append(adicionadas[k] if k < len(adicionadas) else -1)
+            removidas.clear()
+            adicionadas.clear()
+        
+        for posicao, tipo in enumerate(self.tipos):
+            if tipo == DIFF_REMOVIDO:
+                if adicionadas:
+                    descarregar()
+                removidas.append(posicao)
+            elif tipo == DIFF_ADICIONADO:
+                adicionadas.append(posicao)
+            else:
+                descarregar()
+                esquerda.append(posicao)
+                direita.append(posicao)
+        descarregar()
+        
+        # Índices por tipo das linhas da visão (uma linha entra no tipo de qualquer um dos lados)
+        indices_por_tipo = tuple(array('i') for _ in DIFF_TIPOS)
+        indices_diferencas = array('i')
+        for linha_visao, (pos_esquerda, pos_direita) in enumerate(zip(esquerda, direita)):
+            tipos = {self.tipos[pos] for pos in (pos_esquerda, pos_direita) if pos >= 0}
+            for tipo in tipos:
+                indices_por_tipo[tipo].append(linha_visao)
+            if tipos != {DIFF_INALTERADO}:
+                indices_diferencas.append(linha_visao)
+        
+        self._lado_a_lado = {
+            'esquerda': esquerda,
+            'direita': direita,
+            'indices_por_tipo': indices_por_tipo,
+            'indices_diferencas': indices_diferencas
+        }
+        return self._lado_a_lado
+    
+    def linha(self, posicao: int) -> Dict:
+        """Materializa uma linha do diff como dicionário"""
+        tipo = self.tipos[posicao]
+        indice_ref = self.indices_ref[posicao]
+        indice_novo = self.indices_novo[posicao]
+        
+        conteudo_original = self.linhas_ref[indice_ref] if indice_ref >= 0 else ''
+        conteudo_novo = self.linhas_novo[indice_novo] if indice_novo >= 0 else ''
+        
+        numero_ref = self.inicio_ref + indice_ref + 1 if indice_ref >= 0 else None
+        numero_novo = self.inicio_novo + indice_novo + 1 if indice_novo >= 0 else None
+        
+        pagina_ref, linha_pagina_ref = (
+            self.mapa_ref.localizar_linha(numero_ref - 1) if self.mapa_ref and numero_ref else (None, None)
+        )
+        pagina_novo, linha_pagina_novo = (
+            self.mapa_novo.localizar_linha(numero_novo - 1) if self.mapa_novo and numero_novo else (None, None)
+        )
+        
+        return {
+            'numero': numero_novo if numero_novo is not None else numero_ref,
+            'numero_ref': numero_ref,
+            'numero_novo': numero_novo,
+            'pagina_ref': pagina_ref,
+            'linha_pagina_ref': linha_pagina_ref,
+            'pagina_novo': pagina_novo,
+            'linha_pagina_novo': linha_pagina_novo,
+            'tipo': DIFF_TIPOS[tipo],
+            'conteudo': conteudo_original if tipo == DIFF_REMOVIDO else conteudo_novo,
+            'conteudo_original': conteudo_original,
+            'conteudo_novo': conteudo_novo,
+            'spans': self.spans_intralinha(posicao) if tipo == DIFF_MODIFICADO else []
+        }
+    
+    def spans_intralinha(self, posicao: int) -> List[Tuple[str, int, int, int, int]]:
+        """Trechos alterados dentro de uma linha modificada (opcodes por caractere, sem 'equal')"""
+        if self.tipos[posicao] != DIFF_MODIFICADO:
+            return []
+        original = self.linhas_ref[self.indices_ref[posicao]]
+        novo = self.linhas_novo[self.indices_novo[posicao]]
+        matcher = difflib.SequenceMatcher(None, original, novo, autojunk=False)
+        return [opcode for opcode in matcher.get_opcodes() if opcode[0] != 'equal']
+    
+    def __getitem__(self, posicao):
+        if isinstance(posicao, slice):
+            return [self.linha(i) for i in range(*posicao.indices(len(self)))]
+        if posicao < 0:
+            posicao += len(self)
+        return self.linha(posicao)
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.linha(i)
+    
+    def como_payload_json(self) -> str:
+        """Serializa o diff para o visualizador virtualizado (arrays paralelos + linhas de origem)"""
+        spans = {
+            posicao: [[i1, i2, j1, j2] for _, i1, i2, j1, j2 in self.spans_intralinha(posicao)]
+            for posicao in self.indices_por_tipo[DIFF_MODIFICADO]
+        }
+        lado_a_lado = self.lado_a_lado()
+        
+        payload = {
+            'tipos': self.tipos.tolist(),
+            'ref': self.indices_ref.tolist(),
+            'novo': self.indices_novo.tolist(),
+            'inicio_ref': self.inicio_ref,
+            'inicio_novo': self.inicio_novo,
+            'linhas_ref': self.linhas_ref,
+            'linhas_novo': self.linhas_novo,
+            'paginas_ref': self.mapa_ref.inicios_pagina_linha.tolist() if self.mapa_ref else [],
+            'paginas_novo': self.mapa_novo.inicios_pagina_linha.tolist() if self.mapa_novo else [],
+            'spans': spans,
+            'indices': {
+                **{str(tipo): indices.tolist() for tipo, indices in enumerate(self.indices_por_tipo)},
+                'diferencas': self.indices_diferencas.tolist()
+            },
+            'lado_a_lado': {
+                'esquerda': lado_a_lado['esquerda'].tolist(),
+                'direita': lado_a_lado['direita'].tolist(),
+                'indices': {
+                    **{str(tipo): indices.tolist() for tipo, indices in enumerate(lado_a_lado['indices_por_tipo'])},
+                    'diferencas': lado_a_lado['indices_diferencas'].tolist()
+                }
+            }
+        }
+        # '</' escapado para o JSON poder ser embutido num <script>
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    
+    def como_texto_unificado(self) -> str:
+        """Texto no estilo unified diff (linhas modificadas aparecem como '-' seguido de '+')"""
+        primeira_ref = self.inicio_ref + 1
+        primeira_novo = self.inicio_novo + 1
+        total_ref = sum(1 for i in self.indices_ref if i >= 0)
+        total_novo = sum(1 for i in self.indices_novo if i >= 0)
+        
+        saida = [f"@@ -{primeira_ref},{total_ref} +{primeira_novo},{total_novo} @@"]
+        for tipo, indice_ref, indice_novo in zip(self.tipos, self.indices_ref, self.indices_novo):
+            if tipo == DIFF_INALTERADO:
+                saida.append(' ' + self.linhas_ref[indice_ref])
+            if tipo in (DIFF_REMOVIDO, DIFF_MODIFICADO):
+                saida.append('-' + self.linhas_ref[indice_ref])
+            if tipo in (DIFF_ADICIONADO, DIFF_MODIFICADO):
+                saida.append('+' + self.linhas_novo[indice_novo])
+        return '\n'.join(saida)
+
+class LineDiffEngine:
+    """Motor de diff por linhas com algoritmos selecionáveis
+    
+    Todos os algoritmos devolvem opcodes no formato de difflib.SequenceMatcher.get_opcodes(),
+    permitindo trocar o alinhamento sem alterar o restante do pipeline.
+    """
+    
+    ALGORITMOS = ('difflib', 'myers', 'patience', 'histogram')
+    # Acima deste número de edições o Myers cai para o difflib na região
+    MAX_D_MYERS = 1000
+    # Linhas mais frequentes que isso não servem de âncora no histogram diff
+    MAX_OCORRENCIAS_HISTOGRAMA = 64
+    # Fração de linhas repetidas a partir da qual o histogram diff é preferido
+    LIMIAR_DUPLICACAO = 0.25
+    # Total de linhas até o qual o Myers (diff mínimo) é usado na escolha automática
+    MAX_LINHAS_MYERS = 5000
+    
+    def __init__(self, algoritmo: str = 'auto', autojunk: bool = False):
+        if algoritmo != 'auto' and algoritmo not in self.ALGORITMOS:
+            raise ValueError(f"Algoritmo de diff desconhecido: {algoritmo}")
+        self.algoritmo = algoritmo
+        self.autojunk = autojunk
+        self.algoritmo_usado = None
+    
+    def escolher_algoritmo(self, linhas_ref: List[str], linhas_novo: List[str]) -> str:
+        """Escolhe o algoritmo pelo tamanho da entrada e pela taxa de linhas repetidas"""
+        total = len(linhas_ref) + len(linhas_novo)
+        if total == 0:
+            return 'difflib'
+        
+        distintas = len(set(linhas_ref).union(linhas_novo))
+        duplicacao = 1.0 - distintas / total
+        
+        if duplicacao >= self.LIMIAR_DUPLICACAO:
+            return 'histogram'
+        if total <= self.MAX_LINHAS_MYERS:
+            return 'myers'
+        return 'patience'
+    
+    def opcodes(self, linhas_ref: List[str], linhas_novo: List[str]) -> List[Tuple[str, int, int, int, int]]:
+        """Calcula os opcodes do diff entre duas listas de linhas"""
+        algoritmo = self.algoritmo
+        if algoritmo == 'auto':
+            algoritmo = self.escolher_algoritmo(linhas_ref, linhas_novo)
+        self.algoritmo_usado = algoritmo
+        
+        if algoritmo == 'difflib':
+            return difflib.SequenceMatcher(None, linhas_ref, linhas_novo, autojunk=self.autojunk).get_opcodes()
+        
+        # Linhas convertidas em inteiros para comparações baratas
+        identificadores = {}
+        a = [identificadores.setdefault(linha, len(identificadores)) for linha in linhas_ref]
+        b = [identificadores.setdefault(linha, len(identificadores)) for linha in linhas_novo]
+        
+        blocos = []
+        if algoritmo == 'myers':
+            self._blocos_myers(a, b, 0, len(a), 0, len(b), blocos)
+        elif algoritmo == 'patience':
+            self._blocos_patience(a, b, 0, len(a), 0, len(b), blocos)
+        else:
+            self._blocos_histogram(a, b, 0, len(a), 0, len(b), blocos)
+        
+        return self._blocos_para_opcodes(blocos, len(a), len(b))
+    
+    def _aparar_extremos(self, a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                         blocos: List[Tuple[int, int, int]]) -> Tuple[int, int, int, int]:
+        """Registra prefixo e sufixo comuns da região e devolve a região restante"""
+        inicio = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > inicio:
+            blocos.append((inicio, blo - (alo - inicio), alo - inicio))
+        
+        fim = ahi
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        if fim > ahi:
+            blocos.append((ahi, bhi, fim - ahi))
+        
+        return alo, ahi, blo, bhi
+    
+    def _blocos_difflib(self, a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                        blocos: List[Tuple[int, int, int]]):
+        """Alinha uma região com o SequenceMatcher (fallback dos demais algoritmos)"""
+        matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=self.autojunk)
+        for i, j, tamanho in matcher.get_matching_blocks():
+            if tamanho:
+                blocos.append((alo + i, blo + j, tamanho))
+    
+    def _blocos_myers(self, a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                      blocos: List[Tuple[int, int, int]]):
+        """Diff mínimo de Myers (O(ND)) numa região, limitado a MAX_D_MYERS edições"""
+        alo, ahi, blo, bhi = self._aparar_extremos(a, b, alo, ahi, blo, bhi, blocos)
+        n, m = ahi - alo, bhi - blo
+        if n == 0 or m == 0:
+            return
+        
+        v = {1: 0}
+        trace = []
+        for d in range(min(n + m, self.MAX_D_MYERS) + 1):
+            trace.append(v.copy())
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                    x = v[k + 1]
+                else:
+                    x = v[k - 1] + 1
+                y = x - k
+                while x < n and y < m and a[alo + x] == b[blo + y]:
+                    x += 1
+                    y += 1
+                v[k] = x
+                if x >= n and y >= m:
+                    self._reconstruir_myers(trace, n, m, alo, blo, blocos)
+                    return
+        
+        # Documentos muito diferentes: custo do Myers deixaria de ser limitado
+        self._blocos_difflib(a, b, alo, ahi, blo, bhi, blocos)
+    
+    def _reconstruir_myers(self, trace: List[Dict[int, int]], n: int, m: int, alo: int, blo: int,
+                           blocos: List[Tuple[int, int, int]]):
+        """Percorre o trace do Myers de trás para frente registrando as diagonais"""
+        x, y = n, m
+        for d in range(len(trace) - 1, -1, -1):
+            v = trace[d]
+            k = x - y
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                k_anterior = k + 1
+            else:
+                k_anterior = k - 1
+            x_anterior = v[k_anterior]
+            y_anterior = x_anterior - k_anterior
             
-            if not section_found and current_section:
-                current_content.append(line)
+            tamanho = min(x - x_anterior, y - y_anterior) if d > 0 else x
+            if tamanho > 0:
+                blocos.append((alo + x - tamanho, blo + y - tamanho, tamanho))
+            x, y = x_anterior, y_anterior
+    
+    def _ancoras_unicas(self, a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int) -> List[Tuple[int, int]]:
+        """Linhas únicas nas duas regiões, na maior subsequência crescente (patience sorting)"""
+        ocorrencias_a = {}
+        for i in range(alo, ahi):
+            ocorrencias_a[a[i]] = -1 if a[i] in ocorrencias_a else i
+        ocorrencias_b = {}
+        for j in range(blo, bhi):
+            if ocorrencias_a.get(b[j], -1) >= 0:
+                ocorrencias_b[b[j]] = -1 if b[j] in ocorrencias_b else j
+        
+        candidatos = [(ocorrencias_a[linha], j) for linha, j in ocorrencias_b.items() if j >= 0]
+        if not candidatos:
+            return []
+        candidatos.sort(key=lambda par: par[1])
+        
+        # Maior subsequência crescente nas posições de 'a'
+        topos = []
+        indices_topos = []
+        anteriores = [-1] * len(candidatos)
+        for posicao, (i, _) in enumerate(candidatos):
+            pilha = bisect.bisect_left(topos, i)
+            if pilha == len(topos):
+                topos.append(i)
+                indices_topos.append(posicao)
+            else:
+                topos[pilha] = i
+                indices_topos[pilha] = posicao
+            anteriores[posicao] = indices_topos[pilha - 1] if pilha > 0 else -1
         
-        # Salva a última seção
-        if current_section and current_content:
-            sections[current_section] = '\n'.join(current_content)
+        ancoras = []
+        posicao = indices_topos[-1]
+        while posicao >= 0:
+            ancoras.append(candidatos[posicao])
+            posicao = anteriores[posicao]
+        ancoras.reverse()
+        return ancoras
+    
+    def _blocos_patience(self, a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                         blocos: List[Tuple[int, int, int]]):
+        """Patience diff: ancora em linhas únicas e recorre entre as âncoras"""
+        regioes = [(alo, ahi, blo, bhi)]
+        while regioes:
+            alo, ahi, blo, bhi = self._aparar_extremos(a, b, *regioes.pop(), blocos)
+            if alo == ahi or blo == bhi:
+                continue
+            
+            ancoras = self._ancoras_unicas(a, b, alo, ahi, blo, bhi)
+            if not ancoras:
+                self._blocos_myers(a, b, alo, ahi, blo, bhi, blocos)
+                continue
+            
+            i_anterior, j_anterior = alo, blo
+            for i, j in ancoras:
+                blocos.append((i, j, 1))
+                regioes.append((i_anterior, i, j_anterior, j))
+                i_anterior, j_anterior = i + 1, j + 1
+            regioes.append((i_anterior, ahi, j_anterior, bhi))
+    
+    def _blocos_histogram(self, a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                          blocos: List[Tuple[int, int, int]]):
+        """Histogram diff: ancora na linha comum menos frequente e recorre nos dois lados"""
+        regioes = [(alo, ahi, blo, bhi)]
+        while regioes:
+            alo, ahi, blo, bhi = self._aparar_extremos(a, b, *regioes.pop(), blocos)
+            if alo == ahi or blo == bhi:
+                continue
+            
+            posicoes_a = {}
+            for i in range(alo, ahi):
+                posicoes_a.setdefault(a[i], []).append(i)
+            
+            melhor = None
+            menor_contagem = self.MAX_OCORRENCIAS_HISTOGRAMA  # linhas mais frequentes não viram âncora
+            j = blo
+            while j < bhi:
+                posicoes = posicoes_a.get(b[j])
+                proximo_j = j + 1
+                if posicoes and len(posicoes) <= menor_contagem:
+                    for i in posicoes:
+                        tamanho = 1
+                        while i + tamanho < ahi and j + tamanho < bhi and a[i + tamanho] == b[j + tamanho]:
+                            tamanho += 1
+                        if melhor is None or len(posicoes) < menor_contagem or tamanho > melhor[2]:
+                            menor_contagem = len(posicoes)
+                            melhor = (i, j, tamanho)
+                        if len(posicoes) == 1:
+                            # Trecho coberto por uma sequência comum única não gera âncora melhor
+                            proximo_j = j + tamanho
+                j = proximo_j
+            
+            if melhor is None:
+                # Só há linhas muito repetidas: alinhamento tradicional na região
+                self._blocos_myers(a, b, alo, ahi, blo, bhi, blocos)
+                continue
+            
+            i, j, tamanho = melhor
+            blocos.append((i, j, tamanho))
+            regioes.append((alo, i, blo, j))
+            regioes.append((i + tamanho, ahi, j + tamanho, bhi))
+    
+    @staticmethod
+    def _blocos_para_opcodes(blocos: List[Tuple[int, int, int]], n: int, m: int) -> List[Tuple[str, int, int, int, int]]:
+        """Converte blocos comuns (i, j, tamanho) em opcodes no formato do difflib"""
+        blocos.sort()
+        mesclados = []
+        for i, j, tamanho in blocos:
+            if mesclados and mesclados[-1][0] + mesclados[-1][2] == i and mesclados[-1][1] + mesclados[-1][2] == j:
+                mesclados[-1][2] += tamanho
+            else:
+                mesclados.append([i, j, tamanho])
+        mesclados.append([n, m, 0])
         
-        return sections
+        opcodes = []
+        i = j = 0
+        for ai, bj, tamanho in mesclados:
+            if i < ai and j < bj:
+                opcodes.append(('replace', i, ai, j, bj))
+            elif i < ai:
+                opcodes.append(('delete', i, ai, j, bj))
+            elif j < bj:
+                opcodes.append(('insert', i, ai, j, bj))
+            i, j = ai + tamanho, bj + tamanho
+            if tamanho:
+                opcodes.append(('equal', ai, i, bj, j))
+        return opcodes
+
+# Opções do seletor de algoritmo na interface
+ALGORITMOS_DIFF_UI = {
+    "Automático": 'auto',
+    "Myers": 'myers',
+    "Patience": 'patience',
+    "Histogram": 'histogram',
+    "difflib (SequenceMatcher)": 'difflib',
+}
+
+# Blocos exibidos ao vivo durante o diff em streaming
+MAX_HUNKS_STREAMING_EXIBIDOS = 20
+
+# Carregador do payload do diff: enviado uma vez por diff e por sessão, guarda o JSON na página do
+# app (fora dos iframes dos componentes, que somem ou são recriados entre reruns)
+# Componente sem build (HTML estático) que guarda o payload do diff na página e confirma o recebimento
+carregador_diff = components.declare_component(
+    "carregador_diff", path=str(STATIC_DIR / "componentes" / "carregador_diff")
+)
+
+# Visualizador de diff com rolagem virtual (renderizado via components.html); recebe só a chave do
+# payload, então o HTML não muda entre reruns e o iframe não é recarregado
+DIFF_VIEWER_TEMPLATE = """
+<style>
+    body { margin: 0; font-family: 'JetBrains Mono', 'Consolas', monospace; font-size: 12.5px; }
+    .dv-toolbar { display: flex; gap: 12px; align-items: center; padding: 8px 4px; font-family: 'Inter', sans-serif; font-size: 13px; }
+    .dv-toolbar select { padding: 4px 8px; border-radius: 6px; border: 1px solid #dee2e6; }
+    .dv-scroll { position: relative; overflow-y: auto; border: 1px solid #dee2e6; border-radius: 8px; background: #fff; }
+    .dv-rows { position: absolute; top: 0; left: 0; right: 0; }
+    .dv-row { display: flex; height: 24px; line-height: 24px; white-space: pre; overflow: hidden; border-left: 4px solid transparent; }
+    .dv-row.dv-alta { height: 48px; }
+    .dv-num { flex: 0 0 56px; text-align: right; padding-right: 8px; color: #6c757d; background: #f8f9fa; user-select: none; }
+    .dv-pag { flex: 0 0 96px; padding: 0 6px; color: #6c757d; font-size: 11px; user-select: none; }
+    .dv-sinal { flex: 0 0 16px; text-align: center; font-weight: 700; user-select: none; }
+    .dv-texto { flex: 1; overflow: hidden; text-overflow: ellipsis; padding-right: 8px; }
+    .dv-texto div { height: 24px; overflow: hidden; text-overflow: ellipsis; }
+    .dv-1 { background: #d4edda; border-left-color: #28a745; color: #155724; }
+    .dv-2 { background: #f8d7da; border-left-color: #dc3545; color: #721c24; }
+    .dv-3 { background: #fff3cd; border-left-color: #ffc107; color: #856404; }
+    .dv-0 { color: #495057; }
+    .dv-lado { flex: 1 1 50%; display: flex; min-width: 0; border-left: 4px solid transparent; }
+    .dv-lado + .dv-lado { border-left: 1px solid #dee2e6; }
+    .dv-vazio { background: repeating-linear-gradient(135deg, #f8f9fa, #f8f9fa 4px, #eef0f2 4px, #eef0f2 8px); }
+    .dv-row.dv-sbs { border-left: none; background: none; }
+    del { background: #f1aeb5; text-decoration: line-through; }
+    ins { background: #a3cfbb; text-decoration: none; }
+</style>
+<div class="dv-toolbar">
+    <label>Filtrar por tipo:
+        <select id="dv-filtro">
+            <option value="todos">Todos</option>
+            <option value="1">Apenas adicionados</option>
+            <option value="2">Apenas removidos</option>
+            <option value="3">Apenas modificados</option>
+            <option value="0">Apenas inalterados</option>
+            <option value="diferencas">Apenas diferenças</option>
+        </select>
+    </label>
+    <span id="dv-info"></span>
+</div>
+<div class="dv-scroll" id="dv-scroll" style="height: __ALTURA__px;">
+    <div id="dv-spacer"></div>
+    <div class="dv-rows" id="dv-rows"></div>
+</div>
+<script>
+const CHAVE = '__CHAVE__';
+const MODO = '__MODO__';
+let D = null, TOTAL = 0;
+const ALTURA_LINHA = 24, MARGEM = 30;
+const SINAIS = [' ', '+', '-', '~'];
+const scroll = document.getElementById('dv-scroll');
+const spacer = document.getElementById('dv-spacer');
+const rows = document.getElementById('dv-rows');
+let visiveis = [], topos = new Float64Array(1);
+
+function esc(s) {
+    return s.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+}
+function pagina(inicios, indice) {
+    if (!inicios.length) return null;
+    let lo = 0, hi = inicios.length - 1;
+    while (lo < hi) { const mid = (lo + hi + 1) >> 1; if (inicios[mid] <= indice) lo = mid; else hi = mid - 1; }
+    return 'p.' + (lo + 1) + ' l.' + (indice - inicios[lo] + 1);
+}
+function marcar(texto, spans, lado, tag) {
+    if (!spans || !spans.length) return esc(texto);
+    // Spans vêm em code points (Python); String.slice conta unidades UTF-16 e desalinha com emoji
+    const cp = Array.from(texto);
+    const trecho = (a, b) => cp.slice(a, b).join('');
+    let saida = '', pos = 0;
+    for (const sp of spans) {
+        const a = sp[lado * 2], b = sp[lado * 2 + 1];
+        saida += esc(trecho(pos, a));
+        if (b > a) saida += '<' + tag + '>' + esc(trecho(a, b)) + '</' + tag + '>';
+        pos = b;
+    }
+    return saida + esc(trecho(pos));
+}
+const SBS = MODO === 'lado_a_lado';
+function alturaLinha(k) { return !SBS && D.tipos[k] === 3 ? 2 * ALTURA_LINHA : ALTURA_LINHA; }
+function filtrar(valor) {
+    // Índices por tipo já vêm prontos do servidor: filtrar custa O(k)
+    if (valor === 'todos') {
+        visiveis = new Int32Array(TOTAL);
+        for (let k = 0; k < visiveis.length; k++) visiveis[k] = k;
+    } else {
+        visiveis = (SBS ? D.lado_a_lado.indices : D.indices)[valor];
+    }
+    topos = new Float64Array(visiveis.length + 1);
+    for (let v = 0; v < visiveis.length; v++) topos[v + 1] = topos[v] + alturaLinha(visiveis[v]);
+    spacer.style.height = topos[visiveis.length] + 'px';
+    document.getElementById('dv-info').textContent = visiveis.length + ' de ' + TOTAL + ' linhas';
+    scroll.scrollTop = 0;
+    desenhar();
+}
+function linhaHtml(k) {
+    const t = D.tipos[k], r = D.ref[k], n = D.novo[k];
+    const numero = n >= 0 ? D.inicio_novo + n : D.inicio_ref + r;
+    const local = n >= 0 ? pagina(D.paginas_novo, numero) : pagina(D.paginas_ref, numero);
+    let texto;
+    if (t === 3) {
+        const sp = D.spans[k];
+        texto = '<div>' + marcar(D.linhas_ref[r], sp, 0, 'del') + '</div><div>' + marcar(D.linhas_novo[n], sp, 1, 'ins') + '</div>';
+    } else {
+        texto = esc(t === 2 ? D.linhas_ref[r] : D.linhas_novo[n]);
+    }
+    return '<div class="dv-row dv-' + t + (t === 3 ? ' dv-alta' : '') + '">'
+        + '<span class="dv-num">' + (r >= 0 ? D.inicio_ref + r + 1 : '') + '</span>'
+        + '<span class="dv-num">' + (n >= 0 ? D.inicio_novo + n + 1 : '') + '</span>'
+        + '<span class="dv-pag">' + (local || '') + '</span>'
+        + '<span class="dv-sinal">' + SINAIS[t] + '</span>'
+        + '<div class="dv-texto">' + texto + '</div></div>';
+}
+function ladoHtml(k, lado) {
+    if (k < 0) return '<div class="dv-lado dv-vazio"></div>';
+    const t = D.tipos[k];
+    const indice = lado === 0 ? D.ref[k] : D.novo[k];
+    const numero = (lado === 0 ? D.inicio_ref : D.inicio_novo) + indice;
+    const local = pagina(lado === 0 ? D.paginas_ref : D.paginas_novo, numero);
+    const texto = lado === 0 ? D.linhas_ref[indice] : D.linhas_novo[indice];
+    const conteudo = t === 3 ? marcar(texto, D.spans[k], lado, lado === 0 ? 'del' : 'ins') : esc(texto);
+    return '<div class="dv-lado dv-' + t + '">'
+        + '<span class="dv-num">' + (numero + 1) + '</span>'
+        + '<span class="dv-pag">' + (local || '') + '</span>'
+        + '<div class="dv-texto">' + conteudo + '</div></div>';
+}
+function linhaLadoALadoHtml(v) {
+    return '<div class="dv-row dv-sbs">'
+        + ladoHtml(D.lado_a_lado.esquerda[v], 0)
+        + ladoHtml(D.lado_a_lado.direita[v], 1) + '</div>';
+}
+function desenhar() {
+    const topo = scroll.scrollTop, fim = topo + scroll.clientHeight;
+    let lo = 0, hi = visiveis.length;
+    while (lo < hi) { const mid = (lo + hi) >> 1; if (topos[mid + 1] <= topo) lo = mid + 1; else hi = mid; }
+    const inicio = Math.max(0, lo - MARGEM);
+    let ultimo = lo;
+    while (ultimo < visiveis.length && topos[ultimo] < fim) ultimo++;
+    ultimo = Math.min(visiveis.length, ultimo + MARGEM);
+    let html = '';
+    for (let v = inicio; v < ultimo; v++) html += SBS ? linhaLadoALadoHtml(visiveis[v]) : linhaHtml(visiveis[v]);
+    rows.style.transform = 'translateY(' + topos[inicio] + 'px)';
+    rows.innerHTML = html;
+}
+let agendado = false;
+scroll.addEventListener('scroll', () => {
+    if (!agendado) { agendado = true; requestAnimationFrame(() => { agendado = false; desenhar(); }); }
+});
+document.getElementById('dv-filtro').addEventListener('change', (e) => filtrar(e.target.value));
+function iniciar() {
+    let texto = null;
+    try { texto = (window.parent.__solviDiffs || {})[CHAVE]; } catch (e) {}
+    if (!texto) return false;
+    D = JSON.parse(texto);
+    TOTAL = SBS ? D.lado_a_lado.esquerda.length : D.tipos.length;
+    filtrar('todos');
+    return true;
+}
+// Na primeira exibição o carregador é outro iframe e pode terminar depois deste (ou só num rerun
+// seguinte, quando o envio é repetido): a espera continua até o payload chegar
+if (!iniciar()) {
+    document.getElementById('dv-info').textContent = 'Carregando o diff...';
+    let tentativas = 0;
+    const espera = setInterval(() => {
+        if (iniciar()) {
+            clearInterval(espera);
+        } else if (++tentativas === 200) {
+            document.getElementById('dv-info').textContent = 'Aguardando o envio do diff...';
+        }
+    }, 50);
+}
+</script>
+"""
 
 class AdvancedDocumentComparator:
     """Classe  para comparação avançada de documentos com visualização"""
     
+    # Similaridade mínima para tratar duas linhas de um bloco substituído como modificação
+    LIMIAR_LINHA_MODIFICADA = 0.5
+    # Limite de combinações (linhas ref x linhas novas) alinhadas por bloco substituído
+    MAX_CELULAS_ALINHAMENTO = 2500
+    # Linhas iguais consecutivas exigidas para ressincronizar o diff em streaming
+    TAMANHO_ANCORA = 3
+    # Fim de sentença: ponto seguido de letra maiúscula, mas não em números
+    PADRAO_FIM_SENTENCA = re.compile(r'(?:\.|…)(?!\d)\s*(?=[A-Z])')
+    # Abreviações que não encerram sentença
+    PADRAO_ABREVIACAO_FINAL = re.compile(r'(?:\b(?:Sr|Sra|Dr|Dra|etc|ex)|\bp\.\s*ex)\Z', re.IGNORECASE)
+    
     def __init__(self):
         self.texto_ref = []
         self.texto_novo = []
@@ -1584,42 +2719,42 @@ class AdvancedDocumentComparator:
     
     def dividir_em_sentencas_inteligente(self, texto: str) -> List[str]:
         """Divide o texto em sentenças de forma mais inteligente"""
-        # Normalizar o texto primeiro
-        texto = self.normalizar_texto_avancado(texto)
-        
-        # Substituir abreviações comuns primeiro para evitar quebras incorretas
-        abreviacoes_protegidas = {
-            'Sr.': 'Sr_TEMP_',
-            'Sra.': 'Sra_TEMP_',
-            'Dr.': 'Dr_TEMP_',
-            'Dra.': 'Dra_TEMP_',
-            'etc.': 'etc_TEMP_',
-            'ex.': 'ex_TEMP_',
-            'p.ex.': 'pex_TEMP_'
-        }
+        return self.dividir_em_sentencas_com_posicoes(texto)[0]
+    
+    def dividir_em_sentencas_com_posicoes(self, texto: str) -> Tuple[List[str], List[Tuple[int, int]]]:
+        """Divide o texto em sentenças normalizadas, preservando o trecho [inicio, fim) de cada uma no texto original
         
-        # Proteger abreviações
-        for abrev, temp in abreviacoes_protegidas.items():
-            texto = texto.replace(abrev, temp)
+        A quebra é feita no texto original (ponto seguido de letra maiúscula, exceto em números e
+        abreviações protegidas) e cada sentença é normalizada individualmente, para que as
+        coordenadas continuem apontando para o documento extraído.
+        """
+        sentencas = []
+        posicoes = []
+        inicio = 0
         
-        # Dividir em sentenças usando padrão mais simples
-        # Quebra em ponto seguido de espaço e letra maiúscula, mas não em números
-        sentencas = re.split(r'\.(?!\d)\s+(?=[A-Z])', texto)
+        for fim_sentenca in self.PADRAO_FIM_SENTENCA.finditer(texto):
+            # Não quebrar após abreviações (Sr., Dra., etc., p.ex., ...)
+            if self.PADRAO_ABREVIACAO_FINAL.search(texto, max(inicio, fim_sentenca.start() - 8), fim_sentenca.start()):
+                continue
+            self._registrar_sentenca(texto, inicio, fim_sentenca.start(), sentencas, posicoes)
+            inicio = fim_sentenca.end()
         
-        # Restaurar abreviações
-        sentencas_restauradas = []
-        for sentenca in sentencas:
-            for abrev, temp in abreviacoes_protegidas.items():
-                sentenca = sentenca.replace(temp, abrev)
-            sentencas_restauradas.append(sentenca)
+        self._registrar_sentenca(texto, inicio, len(texto), sentencas, posicoes)
         
-        sentencas_limpas = []
-        for sentenca in sentencas_restauradas:
-            sentenca = sentenca.strip()
-            if sentenca and len(sentenca) > 15:  # Filtrar sentenças muito curtas
-                sentencas_limpas.append(sentenca)
+        return sentencas, posicoes
+    
+    def _registrar_sentenca(self, texto: str, inicio: int, fim: int,
+                            sentencas: List[str], posicoes: List[Tuple[int, int]]):
+        """Normaliza um trecho e o registra se for longo o bastante"""
+        trecho = texto[inicio:fim]
+        sentenca = self.normalizar_texto_avancado(trecho)
         
-        return sentencas_limpas
+        if sentenca and len(sentenca) > 15:  # Filtrar sentenças muito curtas
+            sentencas.append(sentenca)
+            posicoes.append((
+                inicio + len(trecho) - len(trecho.lstrip()),
+                inicio + len(trecho.rstrip())
+            ))
     
     def calcular_similaridade_avancada(self, texto1: str, texto2: str) -> float:
         """Calcula similaridade usando múltiplos algoritmos"""
@@ -1651,67 +2786,239 @@ class AdvancedDocumentComparator:
         
         return similaridade_final
     
-    def gerar_diff_visual_linha_por_linha(self, texto_ref: str, texto_novo: str) -> List[Dict]:
-        """Gera diferenças visuais linha por linha para exibição"""
+    def gerar_diff_visual_linha_por_linha(self, texto_ref: str, texto_novo: str,
+                                          algoritmo: str = 'auto', autojunk: bool = False,
+                                          mapa_ref: Optional[SourceMap] = None,
+                                          mapa_novo: Optional[SourceMap] = None) -> 'VisualDiffResult':
+        """Gera diferenças visuais linha por linha cobrindo o documento inteiro"""
         linhas_ref = texto_ref.split('\n')
         linhas_novo = texto_novo.split('\n')
         
-        # Usar difflib para comparação linha por linha
-        differ = difflib.unified_diff(
-            linhas_ref, 
-            linhas_novo, 
-            fromfile='Documento Original', 
-            tofile='Documento Novo',
-            lineterm=''
-        )
+        resultado = VisualDiffResult(linhas_ref, linhas_novo, mapa_ref=mapa_ref, mapa_novo=mapa_novo)
         
-        diff_lines = []
-        linha_num = 1
+        # Opcodes cobrem todas as linhas, inclusive as inalteradas (sem contexto limitado)
+        engine = LineDiffEngine(algoritmo, autojunk=autojunk)
+        self._preencher_diff_visual(resultado, engine.opcodes(linhas_ref, linhas_novo))
+        resultado.algoritmo = engine.algoritmo_usado
         
-        for line in differ:
-            if line.startswith('@@'):
-                # Cabeçalho de seção - ignorar
-                continue
-            elif line.startswith('---') or line.startswith('+++'):
-                # Cabeçalho de arquivo - ignorar
-                continue
-            elif line.startswith('-'):
-                # Linha removida
-                diff_lines.append({
-                    'numero': linha_num,
-                    'tipo': 'removed',
-                    'conteudo': line[1:],  # Remove o prefixo '-'
-                    'conteudo_original': line[1:],
-                    'conteudo_novo': ''
-                })
-                linha_num += 1
-            elif line.startswith('+'):
-                # Linha adicionada
-                diff_lines.append({
-                    'numero': linha_num,
-                    'tipo': 'added',
-                    'conteudo': line[1:],  # Remove o prefixo '+'
-                    'conteudo_original': '',
-                    'conteudo_novo': line[1:]
-                })
-                linha_num += 1
-            elif line.startswith(' '):
-                # Linha inalterada
-                diff_lines.append({
-                    'numero': linha_num,
-                    'tipo': 'unchanged',
-                    'conteudo': line[1:],  # Remove o prefixo ' '
-                    'conteudo_original': line[1:],
-                    'conteudo_novo': line[1:]
-                })
-                linha_num += 1
+        return resultado
+    
+    def _preencher_diff_visual(self, resultado: 'VisualDiffResult', opcodes: List[Tuple[str, int, int, int, int]]):
+        """Converte opcodes em linhas do diff visual, pareando linhas modificadas"""
+        linhas_ref = resultado.linhas_ref
+        linhas_novo = resultado.linhas_novo
+        
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                for deslocamento in range(i2 - i1):
+                    resultado.adicionar(DIFF_INALTERADO, i1 + deslocamento, j1 + deslocamento)
+            elif tag == 'delete':
+                for i in range(i1, i2):
+                    resultado.adicionar(DIFF_REMOVIDO, i, -1)
+            elif tag == 'insert':
+                for j in range(j1, j2):
+                    resultado.adicionar(DIFF_ADICIONADO, -1, j)
+            else:  # replace
+                for indice_ref, indice_novo in self._alinhar_bloco_substituido(linhas_ref, linhas_novo, i1, i2, j1, j2):
+                    if indice_ref >= 0 and indice_novo >= 0:
+                        resultado.adicionar(DIFF_MODIFICADO, indice_ref, indice_novo)
+                    elif indice_ref >= 0:
+                        resultado.adicionar(DIFF_REMOVIDO, indice_ref, -1)
+                    else:
+                        resultado.adicionar(DIFF_ADICIONADO, -1, indice_novo)
+    
+    def iterar_linhas_documento(self, arquivo_bytes: bytes, tipo: str,
+                                mapa: Optional[SourceMap] = None) -> Iterator[str]:
+        """Percorre as linhas do documento página a página, sem montar o texto completo
+        
+        Se um SourceMap for informado, cada página é registrada nele à medida que é lida.
+        """
+        if tipo == 'pdf':
+            doc = fitz.open(stream=arquivo_bytes, filetype="pdf")
+            try:
+                paginas = (pagina.get_text() for pagina in doc)
+                for texto in paginas:
+                    if mapa is not None:
+                        mapa.adicionar_pagina(texto)
+                    yield from texto.split('\n')
+            finally:
+                doc.close()
+        else:
+            for texto in self.extrair_texto_word(arquivo_bytes):
+                if mapa is not None:
+                    mapa.adicionar_pagina(texto)
+                yield from texto.split('\n')
+    
+    def gerar_diff_em_hunks(self, linhas_ref: Iterable[str], linhas_novo: Iterable[str], algoritmo: str = 'auto',
+                            contexto: int = 3, max_janela: int = 4096,
+                            mapa_ref: Optional[SourceMap] = None,
+                            mapa_novo: Optional[SourceMap] = None) -> Iterator['VisualDiffResult']:
+        """Diff em streaming: avança pelas regiões inalteradas e entrega cada bloco alterado assim que fica pronto
+        
+        Linhas iguais são consumidas sem serem guardadas (além do contexto). Em cada divergência,
+        lê à frente numa janela crescente até achar uma âncora (TAMANHO_ANCORA linhas iguais seguidas
+        nos dois documentos), calcula o diff só daquela região e devolve o hunk. A memória fica
+        proporcional ao maior hunk (limitado por max_janela), não ao documento.
+        """
+        iter_ref = iter(linhas_ref)
+        iter_novo = iter(linhas_novo)
+        buffer_ref, buffer_novo = deque(), deque()
+        pos_ref = pos_novo = 0
+        linhas_contexto = deque(maxlen=contexto)
+        engine = LineDiffEngine(algoritmo)
+        
+        def encher(buffer, iterador, tamanho) -> bool:
+            """Completa o buffer até 'tamanho' linhas; False quando o documento acabou"""
+            while len(buffer) < tamanho:
+                linha = next(iterador, None)
+                if linha is None:
+                    return False
+                buffer.append(linha)
+            return True
+        
+        while True:
+            # Região inalterada: consome enquanto as linhas coincidem
+            while True:
+                encher(buffer_ref, iter_ref, 1)
+                encher(buffer_novo, iter_novo, 1)
+                if buffer_ref and buffer_novo and buffer_ref[0] == buffer_novo[0]:
+                    linhas_contexto.append(buffer_ref.popleft())
+                    buffer_novo.popleft()
+                    pos_ref += 1
+                    pos_novo += 1
+                else:
+                    break
+            
+            if not buffer_ref and not buffer_novo:
+                return
+            
+            # Divergência: procura a próxima âncora numa janela crescente
+            janela = 64
+            while True:
+                resta_ref = encher(buffer_ref, iter_ref, janela)
+                resta_novo = encher(buffer_novo, iter_novo, janela)
+                ancora = self._encontrar_ancora(list(buffer_ref), list(buffer_novo))
+                if ancora or (not resta_ref and not resta_novo) or janela >= max_janela:
+                    break
+                janela *= 2
+            
+            fim_ref, fim_novo = ancora if ancora else (len(buffer_ref), len(buffer_novo))
+            regiao_ref = [buffer_ref.popleft() for _ in range(fim_ref)]
+            regiao_novo = [buffer_novo.popleft() for _ in range(fim_novo)]
+            
+            contexto_atual = list(linhas_contexto)
+            hunk = VisualDiffResult(
+                contexto_atual + regiao_ref,
+                contexto_atual + regiao_novo,
+                inicio_ref=pos_ref - len(contexto_atual),
+                inicio_novo=pos_novo - len(contexto_atual),
+                mapa_ref=mapa_ref,
+                mapa_novo=mapa_novo
+            )
+            self._preencher_diff_visual(hunk, engine.opcodes(hunk.linhas_ref, hunk.linhas_novo))
+            hunk.algoritmo = engine.algoritmo_usado
+            
+            pos_ref += fim_ref
+            pos_novo += fim_novo
+            linhas_contexto.clear()
+            
+            yield hunk
+    
+    def _encontrar_ancora(self, linhas_ref: List[str], linhas_novo: List[str]) -> Optional[Tuple[int, int]]:
+        """Primeira posição (menor i + j) em que TAMANHO_ANCORA linhas não vazias coincidem nos dois lados"""
+        k = self.TAMANHO_ANCORA
+        posicoes_novo = {}
+        for j in range(len(linhas_novo) - k + 1):
+            trecho = tuple(linhas_novo[j:j + k])
+            if any(linha.strip() for linha in trecho):
+                posicoes_novo.setdefault(trecho, j)
+        
+        melhor = None
+        for i in range(len(linhas_ref) - k + 1):
+            if melhor and i >= melhor[0] + melhor[1]:
+                break
+            j = posicoes_novo.get(tuple(linhas_ref[i:i + k]))
+            if j is not None and (melhor is None or i + j < melhor[0] + melhor[1]):
+                melhor = (i, j)
+        return melhor
+    
+    def _alinhar_bloco_substituido(self, linhas_ref: List[str], linhas_novo: List[str],
+                                   i1: int, i2: int, j1: int, j2: int) -> List[Tuple[int, int]]:
+        """Alinha as linhas de um bloco 'replace' em pares modificados, remoções e adições
+        
+        Usa programação dinâmica maximizando a soma das similaridades dos pares
+        (acima de LIMIAR_LINHA_MODIFICADA). Blocos com mais de MAX_CELULAS_ALINHAMENTO
+        combinações caem no modo simples de remoção + adição para manter o custo limitado.
+        """
+        n, m = i2 - i1, j2 - j1
+        
+        if n * m > self.MAX_CELULAS_ALINHAMENTO:
+            return [(i, -1) for i in range(i1, i2)] + [(-1, j) for j in range(j1, j2)]
+        
+        # Similaridade de cada par candidato (filtros rápidos antes do ratio completo)
+        similaridades = [[0.0] * m for _ in range(n)]
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        for b in range(m):
+            matcher.set_seq2(linhas_novo[j1 + b])
+            for a in range(n):
+                matcher.set_seq1(linhas_ref[i1 + a])
+                if (matcher.real_quick_ratio() >= self.LIMIAR_LINHA_MODIFICADA
+                        and matcher.quick_ratio() >= self.LIMIAR_LINHA_MODIFICADA):
+                    similaridade = matcher.ratio()
+                    if similaridade >= self.LIMIAR_LINHA_MODIFICADA:
+                        similaridades[a][b] = similaridade
+        
+        # Pontuação acumulada do melhor alinhamento monotônico
+        pontuacao = [[0.0] * (m + 1) for _ in range(n + 1)]
+        for a in range(1, n + 1):
+            for b in range(1, m + 1):
+                melhor = max(pontuacao[a - 1][b], pontuacao[a][b - 1])
+                similaridade = similaridades[a - 1][b - 1]
+                if similaridade and pontuacao[a - 1][b - 1] + similaridade > melhor:
+                    melhor = pontuacao[a - 1][b - 1] + similaridade
+                pontuacao[a][b] = melhor
+        
+        # Reconstrução do caminho (de trás para frente)
+        pares = []
+        removidas, adicionadas = [], []
+        a, b = n, m
+        while a > 0 or b > 0:
+            if (a > 0 and b > 0 and similaridades[a - 1][b - 1]
+                    and pontuacao[a][b] == pontuacao[a - 1][b - 1] + similaridades[a - 1][b - 1]):
+                pares.extend((-1, j1 + x) for x in adicionadas)
+                pares.extend((i1 + x, -1) for x in removidas)
+                removidas, adicionadas = [], []
+                pares.append((i1 + a - 1, j1 + b - 1))
+                a -= 1
+                b -= 1
+            elif b > 0 and (a == 0 or pontuacao[a][b] == pontuacao[a][b - 1]):
+                adicionadas.append(b - 1)
+                b -= 1
+            else:
+                removidas.append(a - 1)
+                a -= 1
+        pares.extend((-1, j1 + x) for x in adicionadas)
+        pares.extend((i1 + x, -1) for x in removidas)
         
-        return diff_lines
-    
-    def encontrar_alteracoes_avancadas(self, sentencas_ref: List[str], sentencas_novo: List[str]) -> List[Dict]:
-        """Encontra alterações usando algoritmo avançado"""
+        pares.reverse()
+        return pares
+    
+    def encontrar_alteracoes_avancadas(self, sentencas_ref: List[str], sentencas_novo: List[str],
+                                       posicoes_ref: Optional[List[Tuple[int, int]]] = None,
+                                       posicoes_novo: Optional[List[Tuple[int, int]]] = None,
+                                       mapa_ref: Optional[SourceMap] = None,
+                                       mapa_novo: Optional[SourceMap] = None) -> List[Dict]:
+        """Encontra alterações usando algoritmo avançado
+        
+        Quando as posições das sentenças e os mapas de coordenadas são informados, cada
+        alteração recebe 'coord_ref' / 'coord_novo' com página, linha, coluna e trecho de caracteres.
+        """
         alteracoes = []
         
+        # Primeira ocorrência de cada sentença no documento (para as coordenadas)
+        localizar_ref = self._indexar_coordenadas(sentencas_ref, posicoes_ref, mapa_ref)
+        localizar_novo = self._indexar_coordenadas(sentencas_novo, posicoes_novo, mapa_novo)
+        
         # Criar conjuntos de sentenças únicas
         set_ref = set(sentencas_ref)
         set_novo = set(sentencas_novo)
@@ -1751,7 +3058,9 @@ class AdvancedDocumentComparator:
                 'texto': sentenca,
                 'texto_original': sentenca,
                 'texto_novo': '',
-                'similaridade': 0.0
+                'similaridade': 0.0,
+                'coord_ref': localizar_ref(sentenca),
+                'coord_novo': None
             })
         
         for sentenca in sentencas_adicionadas:
@@ -1760,7 +3069,9 @@ class AdvancedDocumentComparator:
                 'texto': sentenca,
                 'texto_original': '',
                 'texto_novo': sentenca,
-                'similaridade': 0.0
+                'similaridade': 0.0,
+                'coord_ref': None,
+                'coord_novo': localizar_novo(sentenca)
             })
         
         for mod in sentencas_modificadas:
@@ -1769,18 +3080,70 @@ class AdvancedDocumentComparator:
                 'texto': f"ANTES: {mod['original']}\nDEPOIS: {mod['novo']}",
                 'texto_original': mod['original'],
                 'texto_novo': mod['novo'],
-                'similaridade': mod['similaridade']
+                'similaridade': mod['similaridade'],
+                'coord_ref': localizar_ref(mod['original']),
+                'coord_novo': localizar_novo(mod['novo'])
             })
         
         return alteracoes
+    
+    def _indexar_coordenadas(self, sentencas: List[str], posicoes: Optional[List[Tuple[int, int]]],
+                             mapa: Optional[SourceMap]):
+        """Cria a função que devolve as coordenadas da primeira ocorrência de uma sentença"""
+        if not posicoes or mapa is None:
+            return lambda sentenca: None
+        
+        primeira_posicao = {}
+        for sentenca, posicao in zip(sentencas, posicoes):
+            primeira_posicao.setdefault(sentenca, posicao)
+        
+        def localizar(sentenca: str) -> Optional[Dict]:
+            posicao = primeira_posicao.get(sentenca)
+            return mapa.coordenadas(*posicao) if posicao else None
+        
+        return localizar
+
+def formatar_coordenadas(coordenadas: Optional[Dict]) -> str:
+    """Formata coordenadas de uma alteração como 'p. X, l. Y, c. Z'"""
+    if not coordenadas:
+        return '-'
+    return f"p. {coordenadas['pagina']}, l. {coordenadas['linha']}, c. {coordenadas['coluna']}"
+
+# Caracteres de prévia das sentenças na tabela semântica
+TAMANHO_PREVIA_TABELA = 100
+
+def montar_tabela_alteracoes(alteracoes: List[Dict]) -> pd.DataFrame:
+    """Monta a tabela colunar das alterações semânticas (prévias curtas; texto completo fica na lista original)"""
+    def previa(texto: str) -> str:
+        return texto[:TAMANHO_PREVIA_TABELA] + '...' if len(texto) > TAMANHO_PREVIA_TABELA else texto
+    
+    return pd.DataFrame({
+        'ID': pd.array(range(1, len(alteracoes) + 1), dtype='int32'),
+        'Tipo': pd.Categorical([a['tipo'].title() for a in alteracoes],
+                               categories=['Adicionado', 'Removido', 'Modificado']),
+        'Texto Original': [previa(a['texto_original']) for a in alteracoes],
+        'Texto Novo': [previa(a['texto_novo']) for a in alteracoes],
+        # Adições e remoções não têm par: similaridade ausente (NaN, célula vazia), não 0%
+        'Similaridade': pd.array([a.get('similaridade', 0) * 100 if a['tipo'] == 'modificado' else None
+                                  for a in alteracoes], dtype='Float32'),
+        'Local Original': [formatar_coordenadas(a.get('coord_ref')) for a in alteracoes],
+        'Local Novo': [formatar_coordenadas(a.get('coord_novo')) for a in alteracoes],
+    })
+
+def imagem_local(nome: str, alt: str, classe: str) -> str:
+    """Tag <img> de um asset servido de static/; sem o arquivo local, um bloco local no lugar"""
+    url = localizar_assets_estaticos()['imagens'].get(nome)
+    if url:
+        return f'<img src="{url}" alt="{alt}" class="{classe}">'
+    return f'<div class="{classe} solvi-image-placeholder" role="img" aria-label="{alt}"></div>'
 
 def render_header():
     """Renderiza o header masterpiece da aplicação"""
-    st.markdown("""
+    st.markdown(f"""
     <div class="solvi-header">
         <div class="solvi-header-content">
             <div class="solvi-logo-section">
-                <img src="https://static.wixstatic.com/media/b5b170_1e07cf7f7f82492a9808f9ae7f038596~mv2.png/v1/crop/x_0,y_0,w_2742,h_1106/fill/w_92,h_37,al_c,q_85,usm_0.66_1.00_0.01,enc_auto/Logotipo%20Solv%C3%AD_edited_edited.png" alt="Solví Logo" class="solvi-logo">
+                {imagem_local('logo', 'Solví Logo', 'solvi-logo')}
                 <div class="solvi-title-section">
                     <h1 class="solvi-title">Plataforma Solví</h1>
                     <p class="solvi-subtitle">Análise Inteligente de Documentos com IA</p>
@@ -1795,31 +3158,31 @@ def render_header():
 
 def render_inspiration_section():
     """Renderiza seção de imagens inspiracionais """
-    st.markdown("""
+    st.markdown(f"""
     <div class="solvi-inspiration">
         <div class="solvi-inspiration-item">
-            <img src="https://images.unsplash.com/photo-1558618666-fcd25c85cd64?ixlib=rb-4.0.3&auto=format&fit=crop&w=600&q=80" alt="Tecnologia Sustentável" class="solvi-inspiration-image">
+            {imagem_local('tecnologia', 'Tecnologia Sustentável', 'solvi-inspiration-image')}
             <div class="solvi-inspiration-content">
                 <h3 class="solvi-inspiration-title">Tecnologia Sustentável</h3>
                 <p class="solvi-inspiration-desc">Inovação em energia renovável e soluções tecnológicas verdes para um futuro sustentável e próspero para todas as gerações.</p>
             </div>
         </div>
         <div class="solvi-inspiration-item">
-            <img src="https://images.unsplash.com/photo-1441974231531-c6227db76b6e?ixlib=rb-4.0.3&auto=format&fit=crop&w=600&q=80" alt="Proteção Ambiental" class="solvi-inspiration-image">
+            {imagem_local('ambiental', 'Proteção Ambiental', 'solvi-inspiration-image')}
             <div class="solvi-inspiration-content">
                 <h3 class="solvi-inspiration-title">Proteção Ambiental</h3>
                 <p class="solvi-inspiration-desc">Preservação da natureza e biodiversidade através de práticas ambientais responsáveis e sustentáveis que protegem nosso planeta.</p>
             </div>
         </div>
         <div class="solvi-inspiration-item">
-            <img src="https://images.unsplash.com/photo-1542601906990-b4d3fb778b09?ixlib=rb-4.0.3&auto=format&fit=crop&w=600&q=80" alt="Gestão de Resíduos" class="solvi-inspiration-image">
+            {imagem_local('residuos', 'Gestão de Resíduos', 'solvi-inspiration-image')}
             <div class="solvi-inspiration-content">
                 <h3 class="solvi-inspiration-title">Gestão de Resíduos</h3>
                 <p class="solvi-inspiration-desc">Soluções inteligentes para reciclagem e economia circular, transformando resíduos em recursos valiosos para a sociedade.</p>
             </div>
         </div>
         <div class="solvi-inspiration-item">
-            <img src="https://static.wixstatic.com/media/b5b170_b587909825174509a2a6a71af0106cc3~mv2.png/v1/fill/w_245,h_357,al_c,q_85,enc_auto/Group%2041.png" alt="Inovação Verde" class="solvi-inspiration-image">
+            {imagem_local('inovacao', 'Inovação Verde', 'solvi-inspiration-image')}
             <div class="solvi-inspiration-content">
                 <h3 class="solvi-inspiration-title">Inovação Verde</h3>
                 <p class="solvi-inspiration-desc">Desenvolvimento de tecnologias limpas e processos inovadores para sustentabilidade empresarial e crescimento responsável.</p>
@@ -1846,17 +3209,47 @@ def render_navigation():
     
     st.markdown("</div>", unsafe_allow_html=True)
 
-def render_visual_diff_viewer(diff_data: List[Dict], arquivo_ref: str, arquivo_novo: str):
-    """Renderiza o visualizador avançado de diferenças usando componentes Streamlit nativos"""
+def render_diff_virtualizado(diff_data: VisualDiffResult, modo: str = 'unificado', altura: int = 640):
+    """Renderiza o diff num único componente HTML com rolagem virtual
+    
+    O payload compacto (com as visões unificada e lado a lado) é montado uma vez por diff e
+    enviado ao navegador por um componente carregador que o guarda na página e devolve a chave
+    ao recebê-lo; confirmado o recebimento, o visualizador recebe só a chave, então reruns de
+    outros widgets e trocas de modo não reenviam as linhas. O filtro por tipo e a rolagem rodam no navegador, que só cria
+    elementos para a janela visível.
+    """
+    cache = st.session_state.get('diff_payload_cache')
+    if not cache or cache[0] is not diff_data:
+        cache = (diff_data, diff_data.como_payload_json(), uuid.uuid4().hex)
+        st.session_state.diff_payload_cache = cache
+    _, payload, chave = cache
+    
+    # Reenviado a cada rerun até o carregador confirmar que o payload chegou à página
+    if st.session_state.get('diff_payload_enviado') != chave:
+        if carregador_diff(chave=chave, payload=payload, key="carregador_diff", default=None) == chave:
+            st.session_state.diff_payload_enviado = chave
+    
+    components.html(
+        DIFF_VIEWER_TEMPLATE.replace('__ALTURA__', str(altura)).replace('__MODO__', modo).replace('__CHAVE__', chave),
+        height=altura + 60,
+        scrolling=False
+    )
+
+def render_visual_diff_viewer(diff_data: VisualDiffResult, arquivo_ref: str, arquivo_novo: str):
+    """Renderiza o visualizador de diferenças: estatísticas do diff e o documento inteiro no visualizador virtualizado
+    
+    As linhas vão para o navegador num payload JSON montado uma vez por diff (ver
+    render_diff_virtualizado); aqui só ficam as métricas e a escolha do modo.
+    """
     
     # Calcular estatísticas
     total_lines = len(diff_data)
-    added_lines = len([d for d in diff_data if d['tipo'] == 'added'])
-    removed_lines = len([d for d in diff_data if d['tipo'] == 'removed'])
-    modified_lines = len([d for d in diff_data if d['tipo'] == 'modified'])
+    added_lines = diff_data.contar(DIFF_ADICIONADO)
+    removed_lines = diff_data.contar(DIFF_REMOVIDO)
+    modified_lines = diff_data.contar(DIFF_MODIFICADO)
     unchanged_lines = total_lines - added_lines - removed_lines - modified_lines
     
-    # Header com estatísticas usando Streamlit nativo
+    # Header com estatísticas
     st.markdown(f"""
     <div class="diff-viewer">
         <div class="diff-header">
@@ -1896,81 +3289,22 @@ def render_visual_diff_viewer(diff_data: List[Dict], arquivo_ref: str, arquivo_n
             delta=f"Taxa de mudança: {((added_lines + removed_lines + modified_lines) / total_lines * 100):.1f}%" if total_lines > 0 else "0%"
         )
     
-    # Controles de visualização aprimorados
+    # Modo de visualização; o filtro por tipo fica no próprio visualizador
     st.markdown("### Controles de Visualização")
     
-    col_ctrl1, col_ctrl2, col_ctrl3 = st.columns(3)
-    
-    with col_ctrl1:
-        filtro_tipo = st.selectbox(
-            "Filtrar por tipo:",
-            ["Todos", "Apenas adicionados", "Apenas removidos", "Apenas modificados", "Apenas inalterados", "Apenas diferenças"],
-            index=0
-        )
-    
-    with col_ctrl2:
-        max_linhas = st.selectbox(
-            "Máximo de linhas:",
-            [50, 100, 200, 500, 1000],
-            index=2
-        )
+    view_mode = st.radio(
+        "Modo de visualização:",
+        ["Unificado", "Lado a lado"],
+        index=0,
+        horizontal=True
+    )
     
-    with col_ctrl3:
-        view_mode = st.radio(
-            "Modo de visualização:",
-            ["Unificado", "Lado a lado"],
-            index=0,
-            horizontal=True
-        )
+    st.info(f"Total no documento: {total_lines} linhas | Algoritmo: {diff_data.algoritmo or 'N/A'} | Filtro e rolagem são feitos no navegador, sem recarregar a página")
     
-    # Filtrar dados baseado na seleção
-    if filtro_tipo == "Apenas adicionados":
-        filtered_data = [d for d in diff_data if d['tipo'] == 'added']
-    elif filtro_tipo == "Apenas removidos":
-        filtered_data = [d for d in diff_data if d['tipo'] == 'removed']
-    elif filtro_tipo == "Apenas modificados":
-        filtered_data = [d for d in diff_data if d['tipo'] == 'modified']
-    elif filtro_tipo == "Apenas inalterados":
-        filtered_data = [d for d in diff_data if d['tipo'] == 'unchanged']
-    elif filtro_tipo == "Apenas diferenças":
-        filtered_data = [d for d in diff_data if d['tipo'] != 'unchanged']
-    else:  # Todos
-        filtered_data = diff_data
-    
-    # Limitar linhas baseado na seleção
-    display_data = filtered_data[:max_linhas]
-    
-    if len(filtered_data) > max_linhas:
-        st.warning(f"Mostrando apenas as primeiras {max_linhas} linhas de {len(filtered_data)} total. Ajuste o filtro para ver mais.")
-    
-    # Informações de filtro aplicado
-    st.info(f"Filtro aplicado: {filtro_tipo} | Exibindo: {len(display_data)} de {len(filtered_data)} linhas filtradas | Total no documento: {total_lines} linhas")
-    
-    # Visualização das diferenças
+    # Visualização das diferenças (renderizador virtualizado: só as linhas visíveis vão para o DOM)
     st.markdown("### Diferenças Detectadas")
     
-    # Container com scroll para as diferenças
-    diff_container = st.container()
-    
-    with diff_container:
-        for i, line_data in enumerate(display_data):
-            tipo = line_data['tipo']
-            numero = line_data['numero']
-            conteudo = line_data['conteudo'][:500]  # Aumentar limite para mais contexto
-            
-            # Calcular página aproximada (assumindo 50 linhas por página)
-            pagina = (numero // 50) + 1
-            linha_na_pagina = numero % 50 if numero % 50 != 0 else 50
-            
-            # Escolher cor e ícone baseado no tipo
-            if tipo == 'added':
-                st.success(f"**Linha {numero}** (Página {pagina}, Linha {linha_na_pagina}) | **ADICIONADA**\n```\n{conteudo}\n```")
-            elif tipo == 'removed':
-                st.error(f"**Linha {numero}** (Página {pagina}, Linha {linha_na_pagina}) | **REMOVIDA**\n```\n{conteudo}\n```")
-            elif tipo == 'modified':
-                st.warning(f"**Linha {numero}** (Página {pagina}, Linha {linha_na_pagina}) | **MODIFICADA**\n```\n{conteudo}\n```")
-            else:  # unchanged
-                st.info(f"**Linha {numero}** (Página {pagina}, Linha {linha_na_pagina}) | **INALTERADA**\n```\n{conteudo}\n```")
+    render_diff_virtualizado(diff_data, modo='lado_a_lado' if view_mode == "Lado a lado" else 'unificado')
     
     # Resumo final
     st.markdown("### Resumo da Análise")
@@ -2026,6 +3360,273 @@ def render_visual_diff_viewer(diff_data: List[Dict], arquivo_ref: str, arquivo_n
         </div>
         """, unsafe_allow_html=True)
 
+def render_streaming_hunks(hunks: List[VisualDiffResult], arquivo_ref: str, arquivo_novo: str):
+    """Renderiza os blocos de alterações produzidos pelo modo streaming"""
+    st.markdown(f"""
+    <div class="diff-viewer">
+        <div class="diff-header">
+            <h3 class="diff-title">Comparação em Streaming: {arquivo_ref} ↔ {arquivo_novo}</h3>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Blocos alterados", len(hunks))
+    with col2:
+        st.metric("Adições", sum(h.contar(DIFF_ADICIONADO) for h in hunks))
+    with col3:
+        st.metric("Remoções", sum(h.contar(DIFF_REMOVIDO) for h in hunks))
+    with col4:
+        st.metric("Modificações", sum(h.contar(DIFF_MODIFICADO) for h in hunks))
+    
+    if not hunks:
+        st.success("✅ Nenhuma diferença encontrada entre os documentos!")
+        return
+    
+    max_blocos = st.selectbox(
+        "Máximo de blocos:",
+        [20, 50, 100, 500],
+        index=1
+    )
+    
+    if len(hunks) > max_blocos:
+        st.warning(f"Mostrando apenas os primeiros {max_blocos} blocos de {len(hunks)} total.")
+    
+    for hunk in hunks[:max_blocos]:
+        st.code(hunk.como_texto_unificado(), language='diff')
+
+MAX_INDICES_SECOES_SESSAO = 4
+
+def indexar_secoes_upload(arquivo, extrair_texto) -> SecoesFRE:
+    """Texto e índice de seções de um upload, calculados uma vez por arquivo e guardados na sessão"""
+    conteudo = arquivo.getvalue()
+    chave = hashlib.md5(conteudo).hexdigest()
+    indices = st.session_state.setdefault('indices_secoes', {})
+    if chave not in indices:
+        if len(indices) >= MAX_INDICES_SECOES_SESSAO:
+            indices.pop(next(iter(indices)))
+        # PDFs com marcadores: páginas de cada item pelo sumário; sem eles, varredura do texto inteiro
+        secoes = localizar_secoes_por_sumario(conteudo) if arquivo.name.lower().endswith('.pdf') else None
+        if secoes is None:
+            texto = extrair_texto(arquivo) or ""
+            secoes = SecoesFRE(texto, localizar_secoes_fre(texto))
+        indices[chave] = secoes
+    return indices[chave]
+
+def render_indice_secoes(secoes: SecoesFRE, titulo: str):
+    """Árvore de seções do FRE (seção > item) com o tamanho de cada trecho"""
+    taxonomia = carregar_taxonomia_fre()
+    itens_taxonomia = sum(1 for pai in taxonomia['pais'].values() if pai is not None)
+    itens_encontrados = len(set(secoes.itens.values()))
+    
+    with st.expander(f"🌳 {titulo}: {itens_encontrados} de {itens_taxonomia} itens localizados", expanded=False):
+        if not secoes:
+            st.info("Nenhum item da taxonomia do FRE foi localizado no documento.")
+            return
+        def extensao(no: Dict) -> str:
+            if secoes.unidade == 'páginas':
+                return f"pp. {no['inicio'] + 1}–{no['fim']}"
+            return f"{no['fim'] - no['inicio']:,} caracteres".replace(',', '.')
+        
+        linhas = []
+        for no in secoes.arvore():
+            linhas.append(f"**{no['numero']}. {no['titulo']}** — {extensao(no)}")
+            for filho in no['filhos']:
+                linhas.append(f"- {filho['titulo']} — {extensao(filho)}")
+        st.markdown("\n".join(linhas))
+        if isinstance(secoes, SecoesFREPorSumario):
+            st.caption("🔖 Seções localizadas pelos marcadores do PDF; só as páginas das seções processadas são extraídas")
+        st.caption(f"Taxonomia: {taxonomia['fonte']} • {taxonomia['escopo']}")
+
+def rotulo_item_fre(numero: str) -> str:
+    return f"{numero} {carregar_taxonomia_fre()['titulos'].get(numero, '')}"
+
+def contar_pontos_por_criticidade(analysis_results: List[Dict]) -> Tuple[int, int, int, int]:
+    """Conta total de pontos de atenção e quantos são CRITICO, ATENCAO e SUGESTAO"""
+    contagem = {'CRITICO': 0, 'ATENCAO': 0, 'SUGESTAO': 0}
+    total = 0
+    for result in analysis_results:
+        for ponto in result.get('pontos_atencao', []):
+            total += 1
+            criticidade = ponto.get('criticidade')
+            if criticidade in contagem:
+                contagem[criticidade] += 1
+    return total, contagem['CRITICO'], contagem['ATENCAO'], contagem['SUGESTAO']
+
+def render_latencia_painel(escopo: str, inicio: float):
+    """Registra e exibe a latência do rerun de um painel ao lado da do último rerun completo do app"""
+    latencias = st.session_state.latencias_rerun
+    latencias[escopo] = (time.perf_counter() - inicio) * 1000
+    if 'app' in latencias:
+        st.caption(
+            f"⏱️ Rerun deste painel: {latencias[escopo]:.0f} ms • "
+            f"último rerun completo do app: {latencias['app']:.0f} ms"
+        )
+    else:
+        st.caption(f"⏱️ Rerun deste painel: {latencias[escopo]:.0f} ms")
+
+ROTEAMENTOS_UI = {
+    f"Desativado ({FREAnalyzer.MODELO} em todas as seções)": FREAnalyzer.ROTEAMENTO_DESATIVADO,
+    "Triagem local (heurística, sem custo)": FREAnalyzer.ROTEAMENTO_HEURISTICA,
+    f"Triagem com modelo rápido ({FREAnalyzer.MODELO_TRIAGEM})": FREAnalyzer.ROTEAMENTO_MODELO,
+}
+
+def render_metricas_roteamento(analyzer: FREAnalyzer):
+    """Latência, tokens e custo por nível do roteamento da última execução"""
+    niveis = {'triagem': '1 • Triagem', 'principal': f'2 • {analyzer.MODELO}'}
+    linhas = []
+    for nivel, metricas in analyzer.metricas_niveis.items():
+        linhas.append({
+            "Nível": niveis.get(nivel, nivel),
+            "Modelo": metricas['modelo'],
+            "Seções": metricas['secoes'],
+            "Latência média (s)": round(metricas['latencia'] / metricas['secoes'], 2) if metricas['secoes'] else 0.0,
+            "Tokens prompt": metricas['prompt'],
+            "Tokens resposta": metricas['resposta'],
+            "Custo estimado (US$)": round(metricas['custo'], 4),
+        })
+    
+    st.markdown("#### 🧭 Métricas por nível de modelo")
+    st.dataframe(pd.DataFrame(linhas), use_container_width=True, hide_index=True)
+    if analyzer.roteamento != FREAnalyzer.ROTEAMENTO_DESATIVADO:
+        triadas = analyzer.metricas_niveis.get('triagem', {}).get('secoes', 0)
+        st.caption(f"🧭 {analyzer.escaladas} de {triadas} seção(ões) triada(s) escalada(s) para o {analyzer.MODELO}")
+        if analyzer.roteamento == FREAnalyzer.ROTEAMENTO_HEURISTICA and triadas > analyzer.escaladas:
+            st.caption(f"⏭️ {triadas - analyzer.escaladas} seção(ões) sem indícios na triagem local ficaram como "
+                       f"{FREAnalyzer.NAO_ANALISADA_TRIAGEM} (não avaliadas por nenhum modelo)")
+
+def metricas_criticidade_html(total_pontos: int, criticos: int, atencao: int, sugestoes: int) -> str:
+    return f"""
+    <div class="solvi-metrics">
+        <div class="solvi-metric">
+            <div class="solvi-metric-value">{total_pontos}</div>
+            <div class="solvi-metric-label">Total de Pontos</div>
+        </div>
+        <div class="solvi-metric">
+            <div class="solvi-metric-value">{criticos}</div>
+            <div class="solvi-metric-label">Críticos</div>
+        </div>
+        <div class="solvi-metric">
+            <div class="solvi-metric-value">{atencao}</div>
+            <div class="solvi-metric-label">Atenção</div>
+        </div>
+        <div class="solvi-metric">
+            <div class="solvi-metric-value">{sugestoes}</div>
+            <div class="solvi-metric-label">Sugestões</div>
+        </div>
+    </div>
+    """
+
+def render_resultado_secao(result: Dict):
+    """Expander com o resultado da análise de uma seção"""
+    with st.expander(f"📑 {result.get('secao', 'Seção não identificada')}", expanded=False):
+        conformidade = result.get('conformidade', 'N/A')
+        if conformidade == 'CONFORME':
+            st.success(f"✅ Status: {conformidade}")
+        elif conformidade == 'NAO_CONFORME':
+            st.error(f"❌ Status: {conformidade}")
+        elif conformidade == FREAnalyzer.NAO_ANALISADA_TRIAGEM:
+            st.info(f"⏭️ Status: {conformidade}")
+        else:
+            st.warning(f"⚠️ Status: {conformidade}")
+        
+        st.write(f"**Resumo:** {result.get('resumo', 'N/A')}")
+        
+        if result.get('reaproveitada_de'):
+            st.caption(f"🔁 Seção sem alterações: achados reaproveitados da análise de {result['reaproveitada_de']}")
+        
+        if result.get('nivel'):
+            motivo = result.get('motivo_escalonamento')
+            st.caption(f"🧭 {result['nivel'].capitalize()}" + (f" • motivo: {motivo}" if motivo else ""))
+        
+        uso = result.get('uso_tokens')
+        if uso:
+            st.caption(
+                f"🔢 Tokens: {uso['prompt']:,} de prompt • {uso['resposta']:,} de resposta • "
+                f"{uso['trechos']} trecho(s) analisado(s)".replace(',', '.')
+            )
+        
+        pontos = result.get('pontos_atencao', [])
+        if pontos:
+            st.write("**Pontos de Atenção:**")
+            for i, ponto in enumerate(pontos, 1):
+                criticidade = ponto.get('criticidade', 'N/A')
+                emoji = "🔴" if criticidade == "CRITICO" else "🟡" if criticidade == "ATENCAO" else "🟢"
+                
+                st.write(f"{emoji} **Ponto {i}:** {ponto.get('problema', 'N/A')}")
+                st.write(f"**Base legal:** {ponto.get('artigo_cvm', 'N/A')}")
+                st.write(f"**Sugestão:** {ponto.get('sugestao', 'N/A')}")
+                st.write("---")
+
+@st.fragment(run_every=1.0)
+def aguardar_relatorio_pdf(tarefa):
+    """Consulta a geração do PDF a cada segundo (só enquanto pendente); ao terminar, reexecuta o app para exibir o download"""
+    if tarefa.done():
+        st.rerun()
+    st.caption("⏳ Gerando o relatório PDF em segundo plano...")
+
+@st.fragment
+def render_relatorio_pdf():
+    """Download do relatório PDF, montado em segundo plano assim que os resultados ficam prontos"""
+    fre_filename = st.session_state.get('fre_filename') or 'FRE'
+    tarefa = obter_gerador_relatorios().solicitar(st.session_state.analysis_results, fre_filename)
+    
+    st.markdown("### 📄 Relatório em PDF")
+    if not tarefa.done():
+        # st.rerun(scope="fragment") não é permitido numa execução completa do app; o poller
+        # só é renderizado enquanto o Future está pendente, então deixa de rodar ao terminar
+        aguardar_relatorio_pdf(tarefa)
+        return
+    
+    try:
+        pdf_bytes = tarefa.result()
+    except Exception as e:
+        st.error(f"❌ Erro ao gerar o relatório PDF: {str(e)}")
+        return
+    
+    st.download_button(
+        label="⬇️ Baixar Relatório PDF",
+        data=pdf_bytes,
+        file_name=f"relatorio_fre_analise_{Path(fre_filename).stem}.pdf",
+        mime="application/pdf",
+        type="primary"
+    )
+
+@st.fragment
+def render_resultados_cvm():
+    """Painel de resultados da análise CVM, reexecutado isoladamente a cada interação"""
+    inicio_rerun = time.perf_counter()
+    analysis_results = st.session_state.analysis_results
+    
+    st.markdown("### 📊 Resultados da Análise ")
+    
+    # Métricas (calculadas uma vez por conjunto de resultados)
+    metricas = st.session_state.get('analysis_metrics')
+    if not metricas or metricas[0] is not analysis_results:
+        metricas = (analysis_results, contar_pontos_por_criticidade(analysis_results))
+        st.session_state.analysis_metrics = metricas
+    total_pontos, criticos, atencao, sugestoes = metricas[1]
+    
+    st.markdown(metricas_criticidade_html(total_pontos, criticos, atencao, sugestoes), unsafe_allow_html=True)
+    
+    # Exibir resultados detalhados (somente a página atual é materializada)
+    inicio, fim = render_paginacao(len(analysis_results), 'pagina_resultados_cvm', itens_por_pagina=5)
+    
+    for result in analysis_results[inicio:fim]:
+        render_resultado_secao(result)
+    
+    if st.session_state.analise_exportada:
+        st.download_button(
+            "💾 Exportar achados (JSON) para reanálise incremental",
+            data=json.dumps(st.session_state.analise_exportada, ensure_ascii=False),
+            file_name=f"analise_cvm_{Path(st.session_state.fre_filename or 'fre').stem}.json",
+            mime="application/json",
+            help="Na próxima versão do FRE, envie este arquivo com o FRE anterior para reanalisar só as seções alteradas"
+        )
+    
+    render_latencia_painel('resultados_cvm', inicio_rerun)
+
 def render_cvm_analysis():
     """Renderiza a interface  de análise CVM com SIDEBAR CORRIGIDA"""
     st.markdown("""
@@ -2087,6 +3688,60 @@ def render_cvm_analysis():
             st.error("⚠️ Máximo de 5 documentos CVM permitidos para análise !")
             cvm_files = cvm_files[:5]
         
+        st.markdown("---")
+        
+        # Concorrência da análise com IA
+        max_concorrencia = st.slider(
+            "⚡ Seções analisadas em paralelo",
+            min_value=1,
+            max_value=8,
+            value=FREAnalyzer.MAX_CONCORRENCIA_PADRAO,
+            help="Número máximo de requisições simultâneas à API; pausas de rate limit são respeitadas automaticamente"
+        )
+        
+        rotulo_roteamento = st.selectbox(
+            "🧭 Roteamento de modelos",
+            list(ROTEAMENTOS_UI.keys()),
+            help=f"Com triagem, só as seções sinalizadas como possivelmente não conformes vão para o {FREAnalyzer.MODELO}"
+        )
+        
+        transmitir_texto = st.checkbox(
+            "📡 Mostrar resposta do modelo em tempo real",
+            value=False,
+            help="Transmite o texto gerado pelo modelo enquanto cada seção é analisada"
+        )
+        
+        usar_cache = st.checkbox(
+            "♻️ Reaproveitar análises anteriores",
+            value=True,
+            help="Seções já analisadas com o mesmo conteúdo, as mesmas normas e o mesmo modelo vêm do cache local"
+        )
+        
+        st.markdown("---")
+        
+        # Reanálise incremental entre versões do FRE
+        st.markdown("### 🔁 Reanálise incremental")
+        reanalise_incremental = st.checkbox(
+            "Analisar só as seções alteradas desde a versão anterior",
+            value=False,
+            help="Seções sem alterações reaproveitam os achados da análise anterior, sem chamadas à API"
+        )
+        fre_anterior_file = None
+        analise_anterior_file = None
+        if reanalise_incremental:
+            fre_anterior_file = st.file_uploader(
+                "FRE anterior",
+                type=['pdf', 'docx'],
+                key="fre_anterior",
+                help="Versão do FRE cujos achados foram exportados; sem ela, usa a última análise desta sessão"
+            )
+            analise_anterior_file = st.file_uploader(
+                "Achados da análise anterior (JSON)",
+                type=['json'],
+                key="analise_anterior",
+                help="Arquivo gerado pelo botão 'Exportar achados' dos resultados"
+            )
+        
         st.markdown('</div>', unsafe_allow_html=True)
     
     # Área principal 
@@ -2149,19 +3804,29 @@ def render_cvm_analysis():
         </div>
         """, unsafe_allow_html=True)
     
+    # Inicializar analisador 
+    analyzer = FREAnalyzer(
+        api_key,
+        max_concorrencia=max_concorrencia,
+        cache=obter_cache_respostas() if usar_cache else None,
+        roteamento=ROTEAMENTOS_UI[rotulo_roteamento]
+    )
+    
+    # Índice de seções do FRE (extraído uma vez por arquivo): permite analisar só parte do documento
+    secoes_fre_completas = indexar_secoes_upload(fre_file, analyzer.extract_text_from_file)
+    render_indice_secoes(secoes_fre_completas, "Índice de seções do FRE")
+    secoes_escolhidas = st.multiselect(
+        "📑 Seções a analisar",
+        list(secoes_fre_completas),
+        key="secoes_cvm",
+        placeholder="Todas as seções localizadas",
+        help="Deixe vazio para analisar o FRE inteiro"
+    )
+    
     # Botão de análise 
     if st.button("🔍 Iniciar Análise CVM ", type="primary", use_container_width=True):
         with st.spinner("🔄 Processando análise  com IA..."):
             try:
-                # Inicializar analisador 
-                analyzer = FREAnalyzer(api_key)
-                
-                # Extrair texto do FRE
-                fre_text = analyzer.extract_text_from_file(fre_file)
-                if not fre_text:
-                    st.error("❌ Erro ao extrair texto do FRE")
-                    return
-                
                 # Extrair texto dos documentos CVM
                 cvm_text = ""
                 for cvm_file in cvm_files:
@@ -2172,108 +3837,268 @@ def render_cvm_analysis():
                     st.error("❌ Erro ao extrair texto dos documentos CVM")
                     return
                 
-                # Extrair seções do FRE
-                fre_sections = analyzer.extract_fre_sections(fre_text)
+                # Seções do FRE (todas ou só as escolhidas)
+                fre_sections = (
+                    secoes_fre_completas.subconjunto(secoes_escolhidas) if secoes_escolhidas else secoes_fre_completas
+                )
                 
                 if not fre_sections:
                     st.error("❌ Não foi possível identificar seções no FRE")
                     return
                 
+                # Reanálise incremental: achados das seções que não mudaram desde a versão anterior
+                reaproveitadas = {}
+                if reanalise_incremental:
+                    try:
+                        if fre_anterior_file and analise_anterior_file:
+                            secoes_anteriores = indexar_secoes_upload(fre_anterior_file, analyzer.extract_text_from_file)
+                            # JSONDecodeError e UnicodeDecodeError são ValueError: arquivo inválido vira aviso
+                            analise_anterior = json.loads(analise_anterior_file.getvalue().decode('utf-8'))
+                        else:
+                            secoes_anteriores = st.session_state.fre_sections_anteriores
+                            analise_anterior = st.session_state.analise_exportada
+                        
+                        if not secoes_anteriores or not analise_anterior:
+                            st.warning("⚠️ Envie o FRE anterior e os achados exportados (ou rode uma análise nesta sessão) "
+                                       "para a reanálise incremental; todas as seções serão analisadas.")
+                        else:
+                            reaproveitadas = analyzer.planejar_reanalise(
+                                cvm_text, secoes_anteriores, analise_anterior, fre_sections
+                            )
+                    except ValueError as e:
+                        st.warning(f"⚠️ Achados anteriores não reaproveitados: {e}. Todas as seções serão analisadas.")
+                
                 # Analisar cada seção com IA 
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
-                analysis_results = []
+                resultados_por_secao = {}
+                falhas = {}
                 total_sections = len(fre_sections)
+                status_text.text(
+                    f"🤖 Analisando com IA: {total_sections - len(reaproveitadas)} de {total_sections} seções, "
+                    f"até {max_concorrencia} em paralelo"
+                )
                 
-                for i, (section_name, section_content) in enumerate(fre_sections.items()):
-                    status_text.text(f"🤖 Analisando com IA: {section_name}")
-                    
-                    result = analyzer.analyze_fre_section(
-                        fre_text, cvm_text, section_name, section_content
-                    )
-                    
-                    if result:
-                        analysis_results.append(result)
+                # Checkpoint da execução: seções concluídas sobrevivem a uma interrupção
+                checkpoint = CheckpointAnalise(analyzer.identificador_execucao(cvm_text, fre_sections))
+                st.session_state.fre_filename = fre_file.name
+                st.session_state.analysis_results = None
+                
+                # Painel ao vivo: contagens e seções aparecem conforme cada análise termina
+                painel_ao_vivo = st.empty()
+                with painel_ao_vivo.container():
+                    st.markdown("### 📡 Resultados em tempo real")
+                    metricas_ao_vivo = st.empty()
+                    metricas_ao_vivo.markdown(metricas_criticidade_html(0, 0, 0, 0), unsafe_allow_html=True)
+                    texto_ao_vivo = st.empty()
+                    lista_ao_vivo = st.container()
+                
+                textos_parciais = {}
+                ultima_atualizacao = [0.0]
+                
+                def ao_receber_texto(trecho, pedaco):
+                    # Um buffer por trecho da seção; reparos e novas tentativas recomeçam o buffer
+                    if pedaco is None:
+                        textos_parciais[trecho] = ""
+                        return
+                    textos_parciais[trecho] += pedaco
+                    # No máximo ~10 atualizações por segundo para não inundar o navegador
+                    agora = time.perf_counter()
+                    if agora - ultima_atualizacao[0] >= 0.1:
+                        ultima_atualizacao[0] = agora
+                        section_name, parte, total_partes = trecho
+                        titulo = f"{section_name} (trecho {parte}/{total_partes})" if total_partes > 1 else section_name
+                        texto_ao_vivo.code(f"# {titulo}\n{textos_parciais[trecho][-800:]}", language="json")
+                
+                # Resultados chegam em ordem de conclusão e já ficam na sessão (relatório na ordem do FRE)
+                concluidas = 0
+                contagem = [0, 0, 0, 0]
+                for section_name, result, erro in analyzer.analisar_secoes_concorrente(
+                    cvm_text, fre_sections, checkpoint,
+                    ao_receber_texto=ao_receber_texto if transmitir_texto else None,
+                    reaproveitadas=reaproveitadas
+                ):
+                    concluidas += 1
+                    if erro is not None:
+                        falhas[section_name] = erro
+                    elif result:
+                        resultados_por_secao[section_name] = result
+                        st.session_state.analysis_results = [
+                            resultados_por_secao[nome] for nome in fre_sections if nome in resultados_por_secao
+                        ]
+                        
+                        contagem = [a + b for a, b in zip(contagem, contar_pontos_por_criticidade([result]))]
+                        metricas_ao_vivo.markdown(metricas_criticidade_html(*contagem), unsafe_allow_html=True)
+                        with lista_ao_vivo:
+                            render_resultado_secao(result)
                     
-                    progress_bar.progress((i + 1) / total_sections)
-                    time.sleep(0.5)
+                    status_text.text(f"🤖 Concluída ({concluidas}/{total_sections}): {section_name}")
+                    progress_bar.progress(min(concluidas / total_sections, 1.0))
                 
-                status_text.text("✅ Análise  concluída com sucesso!")
+                analysis_results = st.session_state.analysis_results or []
+                if analysis_results:
+                    # Relatório PDF começa a ser montado já, em segundo plano, enquanto o resumo é exibido
+                    obter_gerador_relatorios().solicitar(analysis_results, fre_file.name)
+                painel_ao_vivo.empty()  # o painel paginado abaixo assume a exibição
                 progress_bar.empty()
                 status_text.empty()
                 
-                # Salvar resultados 
-                st.session_state.analysis_results = analysis_results
-                st.session_state.fre_filename = fre_file.name
+                total_tokens = sum(r.get('uso_tokens', {}).get('total', 0) for r in analysis_results)
+                if total_tokens:
+                    st.caption(f"🔢 {total_tokens:,} tokens contabilizados nas seções analisadas".replace(',', '.'))
                 
-                st.markdown("""
-                <div class="solvi-alert success">
-                    ✅ <strong>Análise CVM  concluída com sucesso!</strong><br>
-                    Confira os resultados detalhados e insights avançados abaixo.
-                </div>
-                """, unsafe_allow_html=True)
+                if analyzer.metricas_niveis:
+                    render_metricas_roteamento(analyzer)
+                
+                if analyzer.reaproveitadas:
+                    st.caption(
+                        f"🔁 {analyzer.reaproveitadas} de {total_sections} seção(ões) sem alterações reaproveitada(s) "
+                        f"da versão anterior; {total_sections - analyzer.reaproveitadas} enviada(s) para análise"
+                    )
+                
+                # Achados desta versão ficam disponíveis para a próxima reanálise incremental
+                st.session_state.analise_exportada = analyzer.exportar_analise(
+                    cvm_text, fre_file.name, resultados_por_secao
+                )
+                st.session_state.fre_sections_anteriores = fre_sections
+                
+                if analyzer.retomadas:
+                    st.caption(f"⏯️ {analyzer.retomadas} seção(ões) retomada(s) do checkpoint da execução anterior")
+                
+                if analyzer.acertos_cache:
+                    st.caption(f"♻️ {analyzer.acertos_cache} de {total_sections} seção(ões) reaproveitada(s) do cache de análises")
+                
+                if falhas:
+                    for section_name, erro in falhas.items():
+                        st.error(f"❌ Erro na análise da seção {section_name}: {str(erro)}")
+                    st.markdown(f"""
+                    <div class="solvi-alert warning">
+                        ⚠️ <strong>{len(falhas)} seção(ões) não puderam ser analisadas.</strong><br>
+                        As {len(analysis_results)} seções concluídas foram salvas; execute a análise novamente
+                        para retomar apenas as pendentes.
+                    </div>
+                    """, unsafe_allow_html=True)
+                else:
+                    checkpoint.concluir()
+                    st.markdown("""
+                    <div class="solvi-alert success">
+                        ✅ <strong>Análise CVM  concluída com sucesso!</strong><br>
+                        Confira os resultados detalhados e insights avançados abaixo.
+                    </div>
+                    """, unsafe_allow_html=True)
                 
             except Exception as e:
                 st.error(f"❌ Erro durante a análise : {str(e)}")
     
-    # Exibir resultados  se disponíveis
+    # Exibir resultados  se disponíveis (fragmento: paginação reexecuta só este painel)
     if st.session_state.analysis_results:
-        analysis_results = st.session_state.analysis_results
+        render_resultados_cvm()
+        render_relatorio_pdf()
+
+@st.fragment
+def render_resultados_comparacao():
+    """Painel de resultados da comparação, reexecutado isoladamente a cada interação"""
+    inicio_rerun = time.perf_counter()
+    
+    if st.session_state.comparison_results.get('hunks') is not None:
+        render_streaming_hunks(
+            st.session_state.comparison_results['hunks'],
+            st.session_state.comparison_results['arquivo_ref'],
+            st.session_state.comparison_results['arquivo_novo']
+        )
+    
+    if st.session_state.visual_diff_data is not None:
+        st.markdown("### 🎨 Visualização Avançada de Diferenças")
         
-        st.markdown("### 📊 Resultados da Análise ")
+        itens_fre = st.session_state.comparison_results.get('itens_fre')
+        if itens_fre:
+            st.caption("📑 Comparação restrita aos itens do FRE: " + "; ".join(rotulo_item_fre(n) for n in itens_fre))
         
-        # Métricas 
-        total_pontos = sum(len(r.get('pontos_atencao', [])) for r in analysis_results)
-        criticos = sum(1 for r in analysis_results for p in r.get('pontos_atencao', []) if p.get('criticidade') == 'CRITICO')
-        atencao = sum(1 for r in analysis_results for p in r.get('pontos_atencao', []) if p.get('criticidade') == 'ATENCAO')
-        sugestoes = sum(1 for r in analysis_results for p in r.get('pontos_atencao', []) if p.get('criticidade') == 'SUGESTAO')
+        # Renderizar o visualizador 
+        render_visual_diff_viewer(
+            st.session_state.visual_diff_data,
+            st.session_state.comparison_results['arquivo_ref'],
+            st.session_state.comparison_results['arquivo_novo']
+        )
         
-        st.markdown(f"""
-        <div class="solvi-metrics">
-            <div class="solvi-metric">
-                <div class="solvi-metric-value">{total_pontos}</div>
-                <div class="solvi-metric-label">Total de Pontos</div>
-            </div>
-            <div class="solvi-metric">
-                <div class="solvi-metric-value">{criticos}</div>
-                <div class="solvi-metric-label">Críticos</div>
-            </div>
-            <div class="solvi-metric">
-                <div class="solvi-metric-value">{atencao}</div>
-                <div class="solvi-metric-label">Atenção</div>
-            </div>
-            <div class="solvi-metric">
-                <div class="solvi-metric-value">{sugestoes}</div>
-                <div class="solvi-metric-label">Sugestões</div>
+        # Tabela de alterações semânticas
+        if st.session_state.comparison_results['diferencas']:
+            st.markdown("### 📋 Análise Semântica Detalhada")
+            
+            alteracoes = st.session_state.comparison_results['diferencas']
+            
+            # Tabela colunar montada uma vez por comparação
+            tabela = st.session_state.comparison_results.get('tabela_alteracoes')
+            if tabela is None:
+                tabela = montar_tabela_alteracoes(alteracoes)
+                st.session_state.comparison_results['tabela_alteracoes'] = tabela
+            
+            # Métricas semânticas
+            contagem_tipos = tabela['Tipo'].value_counts()
+            total_alteracoes = len(tabela)
+            adicionados = int(contagem_tipos.get('Adicionado', 0))
+            removidos = int(contagem_tipos.get('Removido', 0))
+            modificados = int(contagem_tipos.get('Modificado', 0))
+            
+            st.markdown(f"""
+            <div class="solvi-metrics">
+                <div class="solvi-metric">
+                    <div class="solvi-metric-value">{total_alteracoes}</div>
+                    <div class="solvi-metric-label">Alterações Semânticas</div>
+                </div>
+                <div class="solvi-metric">
+                    <div class="solvi-metric-value">{adicionados}</div>
+                    <div class="solvi-metric-label">Sentenças Adicionadas</div>
+                </div>
+                <div class="solvi-metric">
+                    <div class="solvi-metric-value">{removidos}</div>
+                    <div class="solvi-metric-label">Sentenças Removidas</div>
+                </div>
+                <div class="solvi-metric">
+                    <div class="solvi-metric-value">{modificados}</div>
+                    <div class="solvi-metric-label">Sentenças Modificadas</div>
+                </div>
             </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Exibir resultados detalhados 
-        for result in analysis_results:
-            with st.expander(f"📑 {result.get('secao', 'Seção não identificada')}", expanded=False):
-                conformidade = result.get('conformidade', 'N/A')
-                if conformidade == 'CONFORME':
-                    st.success(f"✅ Status: {conformidade}")
-                elif conformidade == 'NAO_CONFORME':
-                    st.error(f"❌ Status: {conformidade}")
-                else:
-                    st.warning(f"⚠️ Status: {conformidade}")
-                
-                st.write(f"**Resumo:** {result.get('resumo', 'N/A')}")
+            """, unsafe_allow_html=True)
+            
+            # Tabela de alterações (texto completo só na seleção da linha)
+            evento = st.dataframe(
+                tabela,
+                use_container_width=True,
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key="tabela_alteracoes_semanticas",
+                column_config={
+                    "ID": st.column_config.NumberColumn("ID", format="%d"),
+                    "Tipo": st.column_config.TextColumn("Tipo"),
+                    "Texto Original": st.column_config.TextColumn("Texto Original", width="large"),
+                    "Texto Novo": st.column_config.TextColumn("Texto Novo", width="large"),
+                    "Similaridade": st.column_config.ProgressColumn(
+                        "Similaridade", format="%.0f%%", min_value=0, max_value=100
+                    ),
+                    "Local Original": st.column_config.TextColumn("Local Original"),
+                    "Local Novo": st.column_config.TextColumn("Local Novo"),
+                }
+            )
+            
+            linhas_selecionadas = evento.selection.rows
+            if linhas_selecionadas:
+                alteracao = alteracoes[int(tabela['ID'].iat[linhas_selecionadas[0]]) - 1]
                 
-                pontos = result.get('pontos_atencao', [])
-                if pontos:
-                    st.write("**Pontos de Atenção:**")
-                    for i, ponto in enumerate(pontos, 1):
-                        criticidade = ponto.get('criticidade', 'N/A')
-                        emoji = "🔴" if criticidade == "CRITICO" else "🟡" if criticidade == "ATENCAO" else "🟢"
-                        
-                        st.write(f"{emoji} **Ponto {i}:** {ponto.get('problema', 'N/A')}")
-                        st.write(f"**Base legal:** {ponto.get('artigo_cvm', 'N/A')}")
-                        st.write(f"**Sugestão:** {ponto.get('sugestao', 'N/A')}")
-                        st.write("---")
+                st.markdown(f"#### Alteração {int(tabela['ID'].iat[linhas_selecionadas[0]])} ({alteracao['tipo'].title()})")
+                col_orig, col_novo = st.columns(2)
+                with col_orig:
+                    st.caption(f"Original • {formatar_coordenadas(alteracao.get('coord_ref'))}")
+                    st.text_area("Texto original completo", alteracao['texto_original'], height=200, disabled=True)
+                with col_novo:
+                    st.caption(f"Novo • {formatar_coordenadas(alteracao.get('coord_novo'))}")
+                    st.text_area("Texto novo completo", alteracao['texto_novo'], height=200, disabled=True)
+            else:
+                st.caption("Selecione uma linha da tabela para ver o texto completo da alteração.")
+    
+    render_latencia_painel('resultados_comparacao', inicio_rerun)
 
 def render_document_comparison():
     """Renderiza a interface  de comparação visual de documentos"""
@@ -2364,6 +4189,59 @@ def render_document_comparison():
             </div>
             """, unsafe_allow_html=True)
         
+        # Algoritmo de alinhamento das linhas
+        col_alg1, col_alg2, col_alg3 = st.columns([3, 1, 1])
+        
+        with col_alg1:
+            algoritmo_label = st.selectbox(
+                "Algoritmo de diff:",
+                list(ALGORITMOS_DIFF_UI.keys()),
+                index=0,
+                help="Automático escolhe pelo tamanho e pela taxa de linhas repetidas (tabelas, 'R$', 'N/A', cabeçalhos)"
+            )
+        
+        with col_alg2:
+            autojunk = st.checkbox(
+                "Autojunk (difflib)",
+                value=False,
+                help="Heurística do difflib que ignora linhas muito frequentes; só afeta o algoritmo difflib"
+            )
+        
+        with col_alg3:
+            modo_streaming = st.checkbox(
+                "Modo streaming",
+                value=False,
+                help="Para documentos muito grandes: exibe os blocos alterados à medida que ficam prontos, sem carregar o documento inteiro"
+            )
+        
+        # Comparação restrita a itens do FRE (documentos de referência e novo indexados uma vez por arquivo)
+        itens_comparados = []
+        if st.checkbox(
+            "📑 Comparar só seções do FRE",
+            value=False,
+            help="Localiza os itens do Formulário de Referência nos dois documentos e compara apenas os escolhidos"
+        ):
+            def extrair_texto_comparacao(arquivo):
+                if comparator.detectar_tipo_arquivo(arquivo.name) == 'pdf':
+                    return '\n'.join(comparator.extrair_texto_pdf(arquivo.getvalue()))
+                return '\n'.join(comparator.extrair_texto_word(arquivo.getvalue()))
+            
+            secoes_ref = indexar_secoes_upload(arquivo_ref, extrair_texto_comparacao)
+            secoes_novo = indexar_secoes_upload(arquivo_novo, extrair_texto_comparacao)
+            col_idx1, col_idx2 = st.columns(2)
+            with col_idx1:
+                render_indice_secoes(secoes_ref, "Referência")
+            with col_idx2:
+                render_indice_secoes(secoes_novo, "Novo")
+            
+            ordem = carregar_taxonomia_fre()['ordem']
+            itens_comparados = st.multiselect(
+                "Itens do FRE a comparar",
+                sorted(set(secoes_ref.itens.values()) | set(secoes_novo.itens.values()), key=ordem.get),
+                format_func=rotulo_item_fre,
+                key="itens_comparacao"
+            )
+        
         if st.button("🎨 Comparar com Visualização Avançada", type="primary", use_container_width=True):
             with st.spinner("🔄 Processando comparação visual ..."):
                 try:
@@ -2371,136 +4249,163 @@ def render_document_comparison():
                     ref_bytes = arquivo_ref.read()
                     novo_bytes = arquivo_novo.read()
                     
-                    if tipo_ref == 'pdf':
-                        texto_ref_pages = comparator.extrair_texto_pdf(ref_bytes)
+                    if modo_streaming:
+                        status_text = st.empty()
+                        area_parcial = st.empty()
+                        hunks = []
+                        
+                        if itens_comparados:
+                            # Trechos escolhidos não têm coordenadas de página no documento original
+                            mapa_ref = mapa_novo = None
+                            linhas_ref = iter(secoes_ref.texto_dos_itens(itens_comparados).split('\n'))
+                            linhas_novo = iter(secoes_novo.texto_dos_itens(itens_comparados).split('\n'))
+                        else:
+                            mapa_ref, mapa_novo = SourceMap(), SourceMap()
+                            linhas_ref = comparator.iterar_linhas_documento(ref_bytes, tipo_ref, mapa_ref)
+                            linhas_novo = comparator.iterar_linhas_documento(novo_bytes, tipo_novo, mapa_novo)
+                        
+                        for hunk in comparator.gerar_diff_em_hunks(
+                            linhas_ref,
+                            linhas_novo,
+                            algoritmo=ALGORITMOS_DIFF_UI[algoritmo_label],
+                            mapa_ref=mapa_ref,
+                            mapa_novo=mapa_novo
+                        ):
+                            hunks.append(hunk)
+                            status_text.text(f"🎨 {len(hunks)} bloco(s) de alterações encontrados...")
+                            if len(hunks) <= MAX_HUNKS_STREAMING_EXIBIDOS:
+                                with area_parcial.container():
+                                    for hunk_parcial in hunks:
+                                        st.code(hunk_parcial.como_texto_unificado(), language='diff')
+                        
+                        status_text.empty()
+                        area_parcial.empty()
+                        
+                        # Salvar resultados (sem diff completo nem análise semântica no modo streaming)
+                        st.session_state.visual_diff_data = None
+                        st.session_state.comparison_results = {
+                            'diferencas': [],
+                            'arquivo_ref': arquivo_ref.name,
+                            'arquivo_novo': arquivo_novo.name,
+                            'diff_visual': None,
+                            'hunks': hunks
+                        }
+                    elif itens_comparados:
+                        texto_ref_completo = secoes_ref.texto_dos_itens(itens_comparados)
+                        texto_novo_completo = secoes_novo.texto_dos_itens(itens_comparados)
+                        
+                        # Trechos escolhidos não têm coordenadas de página no documento original
+                        diff_visual = comparator.gerar_diff_visual_linha_por_linha(
+                            texto_ref_completo, texto_novo_completo,
+                            algoritmo=ALGORITMOS_DIFF_UI[algoritmo_label], autojunk=autojunk
+                        )
+                        alteracoes_avancadas = comparator.encontrar_alteracoes_avancadas(
+                            comparator.dividir_em_sentencas_inteligente(texto_ref_completo),
+                            comparator.dividir_em_sentencas_inteligente(texto_novo_completo)
+                        )
+                        
+                        st.session_state.visual_diff_data = diff_visual
+                        st.session_state.comparison_results = {
+                            'diferencas': alteracoes_avancadas,
+                            'tabela_alteracoes': montar_tabela_alteracoes(alteracoes_avancadas),
+                            'arquivo_ref': arquivo_ref.name,
+                            'arquivo_novo': arquivo_novo.name,
+                            'diff_visual': diff_visual,
+                            'itens_fre': list(itens_comparados)
+                        }
+                        
+                        st.markdown(f"""
+                        <div class="solvi-alert success">
+                            ✅ <strong>Comparação visual concluída para {len(itens_comparados)} item(ns) do FRE!</strong><br>
+                            Confira a visualização avançada e insights detalhados abaixo.
+                        </div>
+                        """, unsafe_allow_html=True)
                     else:
-                        texto_ref_pages = comparator.extrair_texto_word(ref_bytes)
+                        if tipo_ref == 'pdf':
+                            texto_ref_pages = comparator.extrair_texto_pdf(ref_bytes)
+                        else:
+                            texto_ref_pages = comparator.extrair_texto_word(ref_bytes)
                     
-                    if tipo_novo == 'pdf':
-                        texto_novo_pages = comparator.extrair_texto_pdf(novo_bytes)
-                    else:
-                        texto_novo_pages = comparator.extrair_texto_word(novo_bytes)
+                        if tipo_novo == 'pdf':
+                            texto_novo_pages = comparator.extrair_texto_pdf(novo_bytes)
+                        else:
+                            texto_novo_pages = comparator.extrair_texto_word(novo_bytes)
                     
-                    if not texto_ref_pages or not texto_novo_pages:
-                        st.error("❌ Erro ao extrair texto dos documentos")
-                        return
+                        if not texto_ref_pages or not texto_novo_pages:
+                            st.error("❌ Erro ao extrair texto dos documentos")
+                            return
                     
-                    # Combinar todas as páginas em um texto único
-                    texto_ref_completo = '\n'.join(texto_ref_pages)
-                    texto_novo_completo = '\n'.join(texto_novo_pages)
+                        # Combinar todas as páginas em um texto único
+                        texto_ref_completo = '\n'.join(texto_ref_pages)
+                        texto_novo_completo = '\n'.join(texto_novo_pages)
                     
-                    # Gerar diferenças visuais linha por linha
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
+                        # Gerar diferenças visuais linha por linha
+                        progress_bar = st.progress(0)
+                        status_text = st.empty()
                     
-                    status_text.text("🎨 Gerando visualização linha por linha...")
-                    progress_bar.progress(0.3)
+                        status_text.text("🎨 Gerando visualização linha por linha...")
+                        progress_bar.progress(0.3)
                     
-                    diff_visual = comparator.gerar_diff_visual_linha_por_linha(
-                        texto_ref_completo, texto_novo_completo
-                    )
+                        # Coordenadas de página/linha de cada documento
+                        mapa_ref = SourceMap(texto_ref_pages)
+                        mapa_novo = SourceMap(texto_novo_pages)
+                        
+                        diff_visual = comparator.gerar_diff_visual_linha_por_linha(
+                            texto_ref_completo, texto_novo_completo,
+                            algoritmo=ALGORITMOS_DIFF_UI[algoritmo_label], autojunk=autojunk,
+                            mapa_ref=mapa_ref, mapa_novo=mapa_novo
+                        )
                     
-                    progress_bar.progress(0.6)
-                    status_text.text("📊 Calculando estatísticas avançadas...")
+                        progress_bar.progress(0.6)
+                        status_text.text("📊 Calculando estatísticas avançadas...")
                     
-                    # Comparar textos com algoritmo avançado para estatísticas
-                    sentencas_ref = comparator.dividir_em_sentencas_inteligente(texto_ref_completo)
-                    sentencas_novo = comparator.dividir_em_sentencas_inteligente(texto_novo_completo)
+                        # Comparar textos com algoritmo avançado para estatísticas
+                        sentencas_ref, posicoes_ref = comparator.dividir_em_sentencas_com_posicoes(texto_ref_completo)
+                        sentencas_novo, posicoes_novo = comparator.dividir_em_sentencas_com_posicoes(texto_novo_completo)
                     
-                    alteracoes_avancadas = comparator.encontrar_alteracoes_avancadas(
-                        sentencas_ref, sentencas_novo
-                    )
+                        alteracoes_avancadas = comparator.encontrar_alteracoes_avancadas(
+                            sentencas_ref, sentencas_novo,
+                            posicoes_ref, posicoes_novo,
+                            mapa_ref, mapa_novo
+                        )
                     
-                    progress_bar.progress(1.0)
-                    status_text.text("✅ Visualização  concluída!")
+                        progress_bar.progress(1.0)
+                        status_text.text("✅ Visualização  concluída!")
                     
-                    time.sleep(0.5)
-                    progress_bar.empty()
-                    status_text.empty()
+                        time.sleep(0.5)
+                        progress_bar.empty()
+                        status_text.empty()
                     
-                    # Salvar resultados 
-                    st.session_state.visual_diff_data = diff_visual
-                    st.session_state.comparison_results = {
-                        'diferencas': alteracoes_avancadas,
-                        'arquivo_ref': arquivo_ref.name,
-                        'arquivo_novo': arquivo_novo.name,
-                        'diff_visual': diff_visual
-                    }
+                        # Salvar resultados 
+                        st.session_state.visual_diff_data = diff_visual
+                        st.session_state.comparison_results = {
+                            'diferencas': alteracoes_avancadas,
+                            'tabela_alteracoes': montar_tabela_alteracoes(alteracoes_avancadas),
+                            'arquivo_ref': arquivo_ref.name,
+                            'arquivo_novo': arquivo_novo.name,
+                            'diff_visual': diff_visual
+                        }
                     
-                    st.markdown("""
-                    <div class="solvi-alert success">
-                        ✅ <strong>Comparação visual  concluída com sucesso!</strong><br>
-                        Confira a visualização avançada e insights detalhados abaixo.
-                    </div>
-                    """, unsafe_allow_html=True)
+                        st.markdown("""
+                        <div class="solvi-alert success">
+                            ✅ <strong>Comparação visual  concluída com sucesso!</strong><br>
+                            Confira a visualização avançada e insights detalhados abaixo.
+                        </div>
+                        """, unsafe_allow_html=True)
                     
                 except Exception as e:
                     st.error(f"❌ Erro durante a comparação visual: {str(e)}")
     
-    # Exibir visualização  se disponível
-    if st.session_state.visual_diff_data:
-        st.markdown("### 🎨 Visualização Avançada de Diferenças")
-        
-        # Renderizar o visualizador 
-        render_visual_diff_viewer(
-            st.session_state.visual_diff_data,
-            st.session_state.comparison_results['arquivo_ref'],
-            st.session_state.comparison_results['arquivo_novo']
-        )
-        
-        # Tabela de alterações semânticas
-        if st.session_state.comparison_results['diferencas']:
-            st.markdown("### 📋 Análise Semântica Detalhada")
-            
-            alteracoes = st.session_state.comparison_results['diferencas']
-            
-            # Métricas semânticas
-            total_alteracoes = len(alteracoes)
-            adicionados = len([a for a in alteracoes if a['tipo'] == 'adicionado'])
-            removidos = len([a for a in alteracoes if a['tipo'] == 'removido'])
-            modificados = len([a for a in alteracoes if a['tipo'] == 'modificado'])
-            
-            st.markdown(f"""
-            <div class="solvi-metrics">
-                <div class="solvi-metric">
-                    <div class="solvi-metric-value">{total_alteracoes}</div>
-                    <div class="solvi-metric-label">Alterações Semânticas</div>
-                </div>
-                <div class="solvi-metric">
-                    <div class="solvi-metric-value">{adicionados}</div>
-                    <div class="solvi-metric-label">Sentenças Adicionadas</div>
-                </div>
-                <div class="solvi-metric">
-                    <div class="solvi-metric-value">{removidos}</div>
-                    <div class="solvi-metric-label">Sentenças Removidas</div>
-                </div>
-                <div class="solvi-metric">
-                    <div class="solvi-metric-value">{modificados}</div>
-                    <div class="solvi-metric-label">Sentenças Modificadas</div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Tabela de alterações
-            df_alteracoes = []
-            for i, alteracao in enumerate(alteracoes, 1):
-                df_alteracoes.append({
-                    'ID': i,
-                    'Tipo': alteracao['tipo'].title(),
-                    'Texto Original': alteracao['texto_original'][:100] + '...' if len(alteracao['texto_original']) > 100 else alteracao['texto_original'],
-                    'Texto Novo': alteracao['texto_novo'][:100] + '...' if len(alteracao['texto_novo']) > 100 else alteracao['texto_novo'],
-                    'Similaridade': f"{alteracao.get('similaridade', 0):.2%}" if alteracao.get('similaridade') else 'N/A'
-                })
-            
-            df = pd.DataFrame(df_alteracoes)
-            st.dataframe(df, use_container_width=True)
+    # Exibir visualização  se disponível (fragmento: controles do visualizador reexecutam só este painel)
+    if st.session_state.comparison_results:
+        render_resultados_comparacao()
 
 def render_footer():
     """Renderiza o footer  da aplicação"""
-    st.markdown("""
+    st.markdown(f"""
     <div class="solvi-footer">
         <div class="solvi-footer-content">
-            <img src="https://static.wixstatic.com/media/b5b170_1e07cf7f7f82492a9808f9ae7f038596~mv2.png/v1/crop/x_0,y_0,w_2742,h_1106/fill/w_92,h_37,al_c,q_85,usm_0.66_1.00_0.01,enc_auto/Logotipo%20Solv%C3%AD_edited_edited.png" alt="Solví Logo" class="solvi-footer-logo">
+            {imagem_local('logo', 'Solví Logo', 'solvi-footer-logo')}
             <p style="margin: 3rem 0 1.5rem 0; font-size: 1.6rem; font-weight: 800; font-family: 'Poppins', sans-serif;">
                 🌱 Plataforma Solví - Soluções Inteligentes  para Análise de Documentos
             </p>
@@ -2513,6 +4418,8 @@ def render_footer():
 
 def main():
     """Função principal masterpiece da aplicação"""
+    inicio_rerun = time.perf_counter()
+    
     # Inicializar session state 
     init_session_state()
     
@@ -2537,6 +4444,9 @@ def main():
     
     # Renderizar footer 
     render_footer()
+    
+    # Latência do rerun completo (comparada à dos painéis em fragmento)
+    st.session_state.latencias_rerun['app'] = (time.perf_counter() - inicio_rerun) * 1000
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,110 @@
+"""
+⏱️ Benchmark dos algoritmos de diff por linhas
+Mede tempo de execução e número de blocos alterados (hunks) de cada algoritmo do
+LineDiffEngine em entradas com o formato de FREs reais: tabelas com células curtas
+repetidas ("R$", "N/A", "-"), cabeçalhos e rodapés em todas as páginas e texto corrido.
+
+Os casos limite (entradas vazias, idênticas, todo substituído, linha repetida no limite de
+ocorrências do histogram) são verificados em tests/test_line_diff_engine.py.
+
+Uso:
+    python benchmark_diff.py [--paginas 200] [--repeticoes 3] [--seed 42]
+"""
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from app_solvi_unified import LineDiffEngine
+
+PALAVRAS = (
+    "companhia emissor controle acionista resultado exercício receita despesa "
+    "risco mercado regulação ambiental governança capital social diretoria conselho "
+    "administração remuneração política contrato operação segmento cliente"
+).split()
+
+CELULAS_REPETIDAS = ["R$", "N/A", "-", "0,00", "Sim", "Não", "Total", "%"]
+
+
+def gerar_pagina(numero: int, rng: random.Random) -> List[str]:
+    """Gera uma página no formato de FRE: cabeçalho, texto, tabela e rodapé"""
+    linhas = [
+        "Formulário de Referência - 2024 - SOLVÍ PARTICIPAÇÕES S.A.",
+        "Versão : 1",
+    ]
+    for _ in range(rng.randint(8, 20)):
+        linhas.append(" ".join(rng.choice(PALAVRAS) for _ in range(rng.randint(6, 16))).capitalize() + ".")
+    for _ in range(rng.randint(0, 4)):
+        linhas.append(rng.choice(PALAVRAS).capitalize())
+        for _ in range(rng.randint(3, 8)):
+            linhas.append(rng.choice(CELULAS_REPETIDAS))
+            linhas.append(f"{rng.randint(0, 999)}.{rng.randint(0, 999):03d}")
+    linhas.append(f"PÁGINA: {numero} de 500")
+    return linhas
+
+
+def gerar_documentos(paginas: int, taxa_edicao: float, seed: int) -> Tuple[List[str], List[str]]:
+    """Gera um documento de referência e uma versão editada"""
+    rng = random.Random(seed)
+    ref = []
+    for numero in range(1, paginas + 1):
+        ref.extend(gerar_pagina(numero, rng))
+    
+    novo = []
+    for linha in ref:
+        sorteio = rng.random()
+        if sorteio < taxa_edicao / 3:
+            continue  # remoção
+        if sorteio < 2 * taxa_edicao / 3:
+            novo.append(linha + " (revisado)")  # modificação
+        elif sorteio < taxa_edicao:
+            novo.append(linha)
+            novo.append(rng.choice(CELULAS_REPETIDAS))  # inserção
+        else:
+            novo.append(linha)
+    return ref, novo
+
+
+def contar_hunks(opcodes) -> int:
+    """Conta os blocos contíguos de alteração"""
+    return sum(1 for opcode in opcodes if opcode[0] != 'equal')
+
+
+def executar(paginas: int, repeticoes: int, seed: int):
+    cenarios = [
+        ("poucas edições", 0.01),
+        ("edições moderadas", 0.05),
+        ("muitas edições", 0.20),
+    ]
+    configuracoes = [(algoritmo, False) for algoritmo in LineDiffEngine.ALGORITMOS]
+    configuracoes.insert(1, ('difflib', True))
+    configuracoes.append(('auto', False))
+    
+    for nome, taxa in cenarios:
+        ref, novo = gerar_documentos(paginas, taxa, seed)
+        print(f"\n== {nome}: {paginas} páginas, {len(ref)} x {len(novo)} linhas ==")
+        print(f"{'algoritmo':<22}{'tempo (s)':>12}{'hunks':>10}{'linhas iguais':>16}")
+        
+        for algoritmo, autojunk in configuracoes:
+            engine = LineDiffEngine(algoritmo, autojunk=autojunk)
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                opcodes = engine.opcodes(ref, novo)
+                tempos.append(time.perf_counter() - inicio)
+            
+            iguais = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == 'equal')
+            rotulo = algoritmo + (" (autojunk)" if autojunk else "")
+            if algoritmo == 'auto':
+                rotulo += f" -> {engine.algoritmo_usado}"
+            print(f"{rotulo:<22}{min(tempos):>12.4f}{contar_hunks(opcodes):>10}{iguais:>16}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos algoritmos de diff por linhas")
+    parser.add_argument("--paginas", type=int, default=200)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    executar(args.paginas, args.repeticoes, args.seed)
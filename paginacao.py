@@ -0,0 +1,34 @@
+"""
+📑 Paginação compartilhada pelos apps Streamlit
+Um único seletor de página para listas longas de resultados: só o trecho da página atual é
+materializado na tela.
+"""
+
+from typing import Tuple
+
+import streamlit as st
+
+
+def render_paginacao(total_itens: int, chave: str, itens_por_pagina: int = 10, rotulo: str = "Página",
+                     descricao_itens: str = "") -> Tuple[int, int]:
+    """Renderiza o seletor de página e devolve o intervalo [inicio, fim) dos itens da página atual"""
+    total_paginas = max(1, -(-total_itens // itens_por_pagina))
+    if total_paginas == 1:
+        return 0, total_itens
+
+    # Página guardada de um resultado anterior maior que o atual (ajustada antes de criar o widget;
+    # sem value=, o valor inicial vem só do Session State e o Streamlit não emite aviso)
+    if st.session_state.get(chave, 1) > total_paginas:
+        st.session_state[chave] = 1
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        pagina = st.number_input(rotulo, min_value=1, max_value=total_paginas, step=1, key=chave)
+
+    inicio = (pagina - 1) * itens_por_pagina
+    fim = min(inicio + itens_por_pagina, total_itens)
+
+    with col2:
+        st.caption(f"Exibindo {inicio + 1}–{fim} de {total_itens}{descricao_itens} (página {pagina} de {total_paginas})")
+
+    return inicio, fim
@@ -0,0 +1,281 @@
+"""
+🧪 Servidor local que imita a API de chat completions da OpenAI
+Responde POST /v1/chat/completions com uma análise JSON válida da seção pedida, com latência
+configurável, respostas 429 com retry-after, falhas 500, cabeçalhos x-ratelimit-* e respostas
+fora do esquema, para exercitar a análise concorrente do FREAnalyzer sem rede e sem custo.
+
+Uso:
+    python stub_chat_completions.py --porta 8765                    # apenas sobe o servidor
+    python stub_chat_completions.py --executar 14 --concorrencia 4  # sobe e roda uma análise
+    python stub_chat_completions.py --executar 14 --cache /tmp/cache.sqlite3  # mede a reexecução com cache
+    python stub_chat_completions.py --executar 14 --roteamento modelo  # triagem barata + escalonamento
+
+Com o servidor no ar, o app pode ser apontado para ele com
+    FREAnalyzer(api_key, base_url="http://127.0.0.1:8765/v1")
+
+Os testes em tests/test_analise_concorrente.py sobem o stub numa porta livre (criar_servidor)
+e verificam retries, circuito e retomada pelo checkpoint.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PADRAO_SECAO = re.compile(r'Analise a seção "(.*?)"')
+
+
+class StubChatCompletions(BaseHTTPRequestHandler):
+    """Handler do endpoint de chat completions; a configuração fica no servidor"""
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+    def enviar_json(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def enviar_stream(self, pedido, conteudo, uso, duracao):
+        """Resposta em server-sent events, no formato dos chat.completion.chunk"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        base = {
+            "id": f"chatcmpl-stub-{self.server.requisicoes}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": pedido.get("model", "gpt-4"),
+        }
+
+        def evento(corpo):
+            self.wfile.write(f"data: {json.dumps(dict(base, **corpo), ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        pedacos = [conteudo[i:i + 16] for i in range(0, len(conteudo), 16)]
+        for pedaco in pedacos:
+            time.sleep(duracao / len(pedacos))
+            evento({"choices": [{"index": 0, "delta": {"content": pedaco}, "finish_reason": None}]})
+        evento({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if uso is not None:
+            evento({"choices": [], "usage": uso})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.enviar_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+
+        tamanho = int(self.headers.get("Content-Length", 0))
+        pedido = json.loads(self.rfile.read(tamanho) or b"{}")
+        prompt = "".join(m.get("content", "") for m in pedido.get("messages", []))
+
+        servidor = self.server
+        with servidor.trava:
+            servidor.requisicoes += 1
+            servidor.em_voo += 1
+            servidor.pico_em_voo = max(servidor.pico_em_voo, servidor.em_voo)
+            limitar = random.random() < servidor.taxa_429
+            falhar = not limitar and random.random() < servidor.taxa_500
+            invalida = len(pedido.get("messages", [])) == 1 and random.random() < servidor.taxa_invalida
+
+        try:
+            if falhar:
+                with servidor.trava:
+                    servidor.respostas_500 += 1
+                self.enviar_json(500, {"error": {"message": "The server had an error", "type": "server_error"}})
+                return
+
+            if limitar:
+                with servidor.trava:
+                    servidor.respostas_429 += 1
+                self.enviar_json(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    {"retry-after": f"{servidor.retry_after:g}"},
+                )
+                return
+
+            latencia = max(0.0, random.gauss(servidor.latencia, servidor.latencia / 4))
+            # Em stream, ~30% da latência até o primeiro token e o resto distribuído entre os pedaços
+            time.sleep(latencia * 0.3 if pedido.get("stream") else latencia)
+
+            match = PADRAO_SECAO.search(prompt)
+            secao = match.group(1) if match else "Seção"
+            # Modelos de triagem (qualquer um diferente de gpt-4) consideram parte das seções conformes
+            triagem_conforme = pedido.get("model", "gpt-4") != "gpt-4" and random.random() < servidor.taxa_conforme
+            analise = {
+                "secao": secao,
+                "conformidade": "PARCIALMENTE_CONFORME",
+                "criticidade": "ATENCAO",
+                "pontos_atencao": [{
+                    "problema": f"Informações incompletas em {secao}",
+                    "criticidade": random.choice(["CRITICO", "ATENCAO", "SUGESTAO"]),
+                    "artigo_cvm": "Resolução CVM nº 80/22, Anexo C",
+                    "sugestao": "Complementar a seção com os itens obrigatórios",
+                }],
+                "resumo": f"Análise simulada da seção {secao}",
+            }
+            if triagem_conforme:
+                analise.update(conformidade="CONFORME", criticidade="SUGESTAO")
+                analise["pontos_atencao"][0]["criticidade"] = "SUGESTAO"
+            if invalida:
+                # Fora do esquema: criticidade desconhecida e sem resumo (o cliente deve pedir reparo)
+                analise["pontos_atencao"][0]["criticidade"] = "GRAVE"
+                del analise["resumo"]
+                with servidor.trava:
+                    servidor.respostas_invalidas += 1
+
+            conteudo = json.dumps(analise, ensure_ascii=False)
+            uso = {"prompt_tokens": len(prompt) // 4, "completion_tokens": 120, "total_tokens": len(prompt) // 4 + 120}
+            if pedido.get("stream"):
+                incluir_uso = (pedido.get("stream_options") or {}).get("include_usage", False)
+                self.enviar_stream(pedido, conteudo, uso if incluir_uso else None, latencia * 0.7)
+                return
+
+            self.enviar_json(
+                200,
+                {
+                    "id": f"chatcmpl-stub-{servidor.requisicoes}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": pedido.get("model", "gpt-4"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": conteudo},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": uso,
+                },
+                {"x-ratelimit-remaining-requests": "100", "x-ratelimit-reset-requests": "1s"},
+            )
+        finally:
+            with servidor.trava:
+                servidor.em_voo -= 1
+
+
+def criar_servidor(porta=0, latencia=1.0, taxa_429=0.0, retry_after=1.0, verboso=False, taxa_invalida=0.0,
+                   taxa_500=0.0, taxa_conforme=0.6):
+    """Cria o servidor stub (porta 0 = porta livre escolhida pelo sistema)"""
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), StubChatCompletions)
+    servidor.daemon_threads = True
+    servidor.latencia = latencia
+    servidor.taxa_429 = taxa_429
+    servidor.retry_after = retry_after
+    servidor.taxa_invalida = taxa_invalida
+    servidor.taxa_500 = taxa_500
+    servidor.taxa_conforme = taxa_conforme
+    servidor.verboso = verboso
+    servidor.trava = threading.Lock()
+    servidor.requisicoes = 0
+    servidor.respostas_429 = 0
+    servidor.respostas_invalidas = 0
+    servidor.respostas_500 = 0
+    servidor.em_voo = 0
+    servidor.pico_em_voo = 0
+    return servidor
+
+
+def executar_analise(servidor, secoes, concorrencia, cache=None, roteamento="desativado"):
+    """Roda a análise concorrente do FREAnalyzer contra o stub e imprime a ordem de conclusão"""
+    from app_solvi_unified import FREAnalyzer
+
+    base_url = f"http://127.0.0.1:{servidor.server_address[1]}/v1"
+    analyzer = FREAnalyzer("sk-stub", base_url=base_url, max_concorrencia=concorrencia, cache=cache,
+                           roteamento=roteamento)
+    sections = {f"{i}.1 Seção sintética {i}": f"Conteúdo da seção {i}. " * 200 for i in range(1, secoes + 1)}
+    # Algumas seções com sinais que a triagem heurística deve escalar
+    for i in range(3, secoes + 1, 4):
+        sections[f"{i}.1 Seção sintética {i}"] += "A Companhia recebeu multa ambiental ainda em discussão."
+
+    inicio = time.perf_counter()
+    for ordem, (secao, resultado, erro) in enumerate(analyzer.analisar_secoes_concorrente("Normas CVM", sections), 1):
+        estado = f"erro: {erro}" if erro else resultado.get("conformidade")
+        print(f"{ordem:>3}. {time.perf_counter() - inicio:6.2f}s  {secao:<28} {estado}")
+    total = time.perf_counter() - inicio
+
+    print()
+    print(f"Seções: {secoes} • concorrência: {concorrencia} • tempo total: {total:.2f}s")
+    print(f"Sequencial com sleep(0.5) estimado: {secoes * (servidor.latencia + 0.5):.2f}s")
+    print(f"Requisições: {servidor.requisicoes} • respostas 429: {servidor.respostas_429} "
+          f"• 500: {servidor.respostas_500} • fora do esquema: {servidor.respostas_invalidas} "
+          f"• pico em voo: {servidor.pico_em_voo}")
+
+    for nivel, metricas in analyzer.metricas_niveis.items():
+        print(f"Nível {nivel:<10} {metricas['modelo']:<18} seções: {metricas['secoes']:>3} "
+              f"• latência média: {metricas['latencia'] / metricas['secoes']:.2f}s "
+              f"• tokens: {metricas['prompt']}+{metricas['resposta']} • custo: US$ {metricas['custo']:.4f}")
+    if roteamento != "desativado":
+        print(f"Escaladas para {analyzer.MODELO}: {analyzer.escaladas} de {secoes}")
+
+    if cache is not None:
+        requisicoes = servidor.requisicoes
+        analyzer.acertos_cache = 0
+        inicio = time.perf_counter()
+        for _ in analyzer.analisar_secoes_concorrente("Normas CVM", sections):
+            pass
+        print(f"Reexecução com cache: {time.perf_counter() - inicio:.3f}s • acertos: {analyzer.acertos_cache} "
+              f"• novas requisições: {servidor.requisicoes - requisicoes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local da API de chat completions")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=1.0, help="latência média por resposta (s)")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="fração de respostas 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="valor do cabeçalho retry-after (s)")
+    parser.add_argument("--taxa-500", type=float, default=0.0, help="fração de respostas 500 (falha transitória)")
+    parser.add_argument("--taxa-invalida", type=float, default=0.0,
+                        help="fração de primeiras respostas fora do esquema (exercita o reparo)")
+    parser.add_argument("--executar", type=int, default=0, metavar="SECOES",
+                        help="roda uma análise com N seções sintéticas e encerra")
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", metavar="ARQUIVO",
+                        help="usa um cache de respostas SQLite e repete a análise para medir a reexecução")
+    parser.add_argument("--roteamento", choices=["desativado", "heuristica", "modelo"], default="desativado",
+                        help="roteamento em dois níveis do FREAnalyzer")
+    parser.add_argument("--taxa-conforme", type=float, default=0.6,
+                        help="fração de seções que o modelo de triagem considera conformes")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    servidor = criar_servidor(args.porta, args.latencia, args.taxa_429, args.retry_after,
+                              verboso=not args.executar, taxa_invalida=args.taxa_invalida,
+                              taxa_500=args.taxa_500, taxa_conforme=args.taxa_conforme)
+
+    if not args.executar:
+        print(f"Stub em http://127.0.0.1:{servidor.server_address[1]}/v1 (Ctrl+C para encerrar)")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    try:
+        cache = None
+        if args.cache:
+            from app_solvi_unified import CacheRespostasLLM
+            cache = CacheRespostasLLM(args.cache)
+            cache.limpar()
+        executar_analise(servidor, args.executar, args.concorrencia, cache, args.roteamento)
+    finally:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
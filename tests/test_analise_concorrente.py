@@ -0,0 +1,180 @@
+"""Análise concorrente do FREAnalyzer contra o stub local da API de chat completions"""
+
+import asyncio
+import random
+import threading
+import time
+
+import openai
+import pytest
+
+from app_solvi_unified import (AgendadorRateLimit, CheckpointAnalise, CircuitoAbertoError, DisjuntorCircuito,
+                               FREAnalyzer, httpx)
+from stub_chat_completions import criar_servidor
+
+NORMAS = "Art. 1º O emissor deve manter o formulário de referência atualizado."
+SECOES = {f"{i}.1 Seção sintética {i}": f"Conteúdo da seção {i}. " * 20 for i in range(1, 5)}
+
+
+@pytest.fixture
+def stub():
+    """Sobe o stub numa porta livre; o teste ajusta as taxas de falha no próprio servidor"""
+    servidor = criar_servidor(latencia=0.01, retry_after=0.01)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    thread.join()
+
+
+@pytest.fixture(autouse=True)
+def backoff_curto(monkeypatch):
+    monkeypatch.setattr(AgendadorRateLimit, 'ESPERA_PADRAO', 0.01)
+
+
+def criar_analyzer(servidor, max_concorrencia=1) -> FREAnalyzer:
+    base_url = f"http://127.0.0.1:{servidor.server_address[1]}/v1"
+    return FREAnalyzer("sk-stub", base_url=base_url, max_concorrencia=max_concorrencia)
+
+
+def analisar(analyzer, secoes, **kwargs):
+    return {secao: (resultado, erro) for secao, resultado, erro in
+            analyzer.analisar_secoes_concorrente(NORMAS, secoes, **kwargs)}
+
+
+def test_todas_as_secoes_concluem(stub):
+    resultados = analisar(criar_analyzer(stub, max_concorrencia=4), SECOES)
+
+    assert set(resultados) == set(SECOES)
+    assert all(erro is None and resultado['conformidade'] == 'PARCIALMENTE_CONFORME'
+               for resultado, erro in resultados.values())
+    assert stub.requisicoes == len(SECOES)
+    assert stub.pico_em_voo <= 4
+
+
+def test_429_repetido_ate_o_sucesso(stub):
+    random.seed(3)
+    stub.taxa_429 = 0.5
+
+    (resultado, erro), = analisar(criar_analyzer(stub), dict(list(SECOES.items())[:1])).values()
+
+    assert erro is None and resultado['conformidade'] == 'PARCIALMENTE_CONFORME'
+    assert stub.respostas_429 >= 1
+    assert stub.requisicoes == stub.respostas_429 + 1
+
+
+def test_429_persistente_esgota_as_tentativas_sem_abrir_o_circuito(stub):
+    stub.taxa_429 = 1.0
+
+    (resultado, erro), = analisar(criar_analyzer(stub), dict(list(SECOES.items())[:1])).values()
+
+    assert resultado is None
+    assert isinstance(erro, openai.RateLimitError)
+    assert stub.requisicoes == AgendadorRateLimit.MAX_TENTATIVAS
+
+
+def test_falhas_500_seguidas_abrem_o_circuito(stub):
+    stub.taxa_500 = 1.0
+
+    resultados = analisar(criar_analyzer(stub), SECOES)
+    erros = [erro for _, erro in resultados.values()]
+
+    assert all(erro is not None for erro in erros)
+    assert any(isinstance(erro, CircuitoAbertoError) for erro in erros)
+    # Aberto o circuito, nenhuma requisição sai mais
+    assert stub.requisicoes == stub.respostas_500 == DisjuntorCircuito.LIMIAR_FALHAS
+
+
+def test_resposta_fora_do_esquema_e_reparada(stub):
+    stub.taxa_invalida = 1.0
+
+    (resultado, erro), = analisar(criar_analyzer(stub), dict(list(SECOES.items())[:1])).values()
+
+    assert erro is None and resultado['conformidade'] == 'PARCIALMENTE_CONFORME'
+    assert stub.respostas_invalidas == 1
+    assert stub.requisicoes == 2
+
+
+def test_execucao_interrompida_retoma_do_checkpoint(stub, tmp_path):
+    analyzer = criar_analyzer(stub)
+    checkpoint = CheckpointAnalise(analyzer.identificador_execucao(NORMAS, SECOES), tmp_path)
+
+    execucao = analyzer.analisar_secoes_concorrente(NORMAS, SECOES, checkpoint=checkpoint)
+    next(execucao)
+    execucao.close()  # consumidor interrompido: as seções em voo são canceladas
+    concluidas = checkpoint.carregar()
+    requisicoes = stub.requisicoes
+    assert 1 <= len(concluidas) < len(SECOES)
+
+    retomada = criar_analyzer(stub)
+    resultados = analisar(retomada, SECOES, checkpoint=checkpoint)
+
+    assert set(resultados) == set(SECOES)
+    assert retomada.retomadas == len(concluidas)
+    assert all(resultados[secao][0] == resultado for secao, resultado in concluidas.items())
+    assert stub.requisicoes - requisicoes == len(SECOES) - len(concluidas)
+
+
+class RespostaBruta:
+    """Resposta crua mínima (with_raw_response) para exercitar o agendador sem servidor"""
+    headers = {}
+
+    def parse(self):
+        return "stream"
+
+
+def executar_no_agendador(agendador, consumir):
+    chamadas = []
+
+    async def fabrica():
+        chamadas.append(1)
+        return RespostaBruta()
+
+    async def principal():
+        return await agendador.executar(fabrica, consumir)
+
+    return asyncio.run(principal()), len(chamadas)
+
+
+def abrir_circuito_expirado(agendador):
+    """Circuito aberto cujo tempo já passou: a próxima chamada é a sonda"""
+    agendador.disjuntor.falhas_seguidas = agendador.disjuntor.limiar_falhas
+    agendador.disjuntor.aberto_ate = time.monotonic() - 1
+
+
+def test_queda_no_meio_do_stream_e_repetida():
+    falhas = [httpx.ReadError("conexão encerrada")]
+
+    async def consumir(stream):
+        if falhas:
+            raise falhas.pop()
+        return "texto completo"
+
+    resultado, chamadas = executar_no_agendador(AgendadorRateLimit(), consumir)
+
+    assert resultado == "texto completo"
+    assert chamadas == 2
+
+
+def test_sonda_que_falha_no_stream_reabre_o_circuito():
+    agendador = AgendadorRateLimit()
+    abrir_circuito_expirado(agendador)
+
+    async def consumir(stream):
+        raise httpx.ReadError("conexão encerrada")
+
+    with pytest.raises(CircuitoAbertoError):
+        executar_no_agendador(agendador, consumir)
+    assert agendador.disjuntor.aberto_ate > time.monotonic()
+
+
+def test_sonda_interrompida_por_erro_local_libera_nova_sonda():
+    agendador = AgendadorRateLimit()
+    abrir_circuito_expirado(agendador)
+
+    async def consumir(stream):
+        raise ValueError("falha ao processar o stream")
+
+    with pytest.raises(ValueError):
+        executar_no_agendador(agendador, consumir)
+    assert agendador.disjuntor.verificar() is True
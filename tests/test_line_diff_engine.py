@@ -0,0 +1,75 @@
+"""Casos limite dos algoritmos do LineDiffEngine: todo algoritmo deve produzir um diff válido"""
+
+import pytest
+
+from app_solvi_unified import LineDiffEngine
+
+ALGORITMOS = LineDiffEngine.ALGORITMOS + ('auto',)
+LIMITE = LineDiffEngine.MAX_OCORRENCIAS_HISTOGRAMA
+
+CASOS = {
+    'vazios': ([], []),
+    'so_remocao': (["a"], []),
+    'so_insercao': ([], ["a"]),
+    'identicos': (["a", "b", "a", "c"], ["a", "b", "a", "c"]),
+    'tudo_substituido': (["a", "b", "c"], ["x", "y", "z"]),
+    # Linha repetida exatamente no limite do histogram e logo acima dele
+    'limite_histograma': (["x"] * LIMITE + ["y"], ["z", "x", "w"]),
+    'acima_do_limite_histograma': (["x"] * (LIMITE + 1) + ["y"], ["z", "x", "w"]),
+    'repetidas_com_insercao': (["x"] * (LIMITE + 1), ["x"] * (LIMITE + 1) + ["y"]),
+    'celulas_repetidas': (["R$", "-", "1", "R$", "-", "2"] * 20, ["R$", "-", "1", "N/A", "R$", "-", "3"] * 20),
+}
+
+
+def aplicar_opcodes(ref, novo, opcodes):
+    """Reconstrói o documento novo a partir do de referência e dos opcodes"""
+    resultado = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            assert ref[i1:i2] == novo[j1:j2], (tag, i1, i2, j1, j2)
+            resultado.extend(ref[i1:i2])
+        else:
+            resultado.extend(novo[j1:j2])
+    return resultado
+
+
+def verificar_cobertura(ref, novo, opcodes):
+    """Opcodes contíguos cobrindo as duas sequências inteiras, como os do difflib"""
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert tag in ('equal', 'replace', 'delete', 'insert')
+        assert (i1, j1) == (i, j)
+        i, j = i2, j2
+    assert (i, j) == (len(ref), len(novo))
+
+
+@pytest.mark.parametrize('algoritmo', ALGORITMOS)
+@pytest.mark.parametrize('caso', CASOS)
+def test_opcodes_reconstroem_o_documento_novo(algoritmo, caso):
+    ref, novo = CASOS[caso]
+    opcodes = LineDiffEngine(algoritmo).opcodes(ref, novo)
+
+    verificar_cobertura(ref, novo, opcodes)
+    assert aplicar_opcodes(ref, novo, opcodes) == novo
+
+
+@pytest.mark.parametrize('algoritmo', ALGORITMOS)
+def test_entradas_vazias_sem_opcodes_de_alteracao(algoritmo):
+    assert all(tag == 'equal' for tag, *_ in LineDiffEngine(algoritmo).opcodes([], []))
+
+
+@pytest.mark.parametrize('algoritmo', ALGORITMOS)
+def test_documentos_identicos_so_tem_igualdades(algoritmo):
+    ref, novo = CASOS['identicos']
+    assert [tag for tag, *_ in LineDiffEngine(algoritmo).opcodes(ref, novo)] == ['equal']
+
+
+@pytest.mark.parametrize('algoritmo', ALGORITMOS)
+def test_documento_todo_substituido_nao_tem_igualdades(algoritmo):
+    ref, novo = CASOS['tudo_substituido']
+    assert all(tag != 'equal' for tag, *_ in LineDiffEngine(algoritmo).opcodes(ref, novo))
+
+
+def test_algoritmo_desconhecido():
+    with pytest.raises(ValueError):
+        LineDiffEngine('bogus')
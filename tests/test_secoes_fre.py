@@ -0,0 +1,117 @@
+"""Detecção das seções do FRE no texto extraído"""
+
+import fitz
+import pytest
+
+from app_solvi_unified import SecoesFRE, localizar_secoes_fre, localizar_secoes_por_sumario
+
+SUMARIO = """FORMULÁRIO DE REFERÊNCIA - SOLVÍ PARTICIPAÇÕES S.A.
+Índice
+1.9 Informações ambientais sociais e de governança corporativa (ASG) ........ 20
+1.10 Informações de sociedade de economia mista ............................ 25
+1.11 Aquisição ou alienação de ativo relevante ............................. 26
+1.12 Operações societárias/Aumento ou redução de capital
+(inclui aumentos de capital) ................................................ 27
+Versão 1 - Texto introdutório da companhia
+"""
+
+CORPO = """1.9 Informações ambientais sociais e de governança corporativa (ASG)
+A Companhia publica relatório anual de sustentabilidade conforme o padrão GRI.
+1.10 Informações de sociedade de economia mista
+Não aplicável
+1.11 Aquisição ou alienação de ativo relevante
+Não houve
+1.12 Operações societárias/Aumento ou redução de capital
+Em 2023 a Companhia aumentou o capital social mediante subscrição privada.
+"""
+
+
+def test_secoes_sem_sumario():
+    secoes = SecoesFRE(CORPO, localizar_secoes_fre(CORPO))
+    assert list(secoes.itens.values()) == ['1.9', '1.10', '1.11', '1.12']
+    assert secoes['1.10 Informações de sociedade de economia mista'].endswith("Não aplicável")
+
+
+def test_linhas_do_sumario_nao_viram_secoes():
+    texto = SUMARIO + CORPO
+    limites = localizar_secoes_fre(texto)
+    
+    assert [numero for numero, *_ in limites] == ['1.9', '1.10', '1.11', '1.12']
+    assert all(inicio >= len(SUMARIO) for _, _, inicio, _ in limites)
+    
+    secoes = SecoesFRE(texto, limites)
+    conteudos = {numero: secoes[titulo] for titulo, numero in secoes.itens.items()}
+    # Itens reais mais curtos que as suas linhas do índice
+    assert conteudos['1.10'] == "1.10 Informações de sociedade de economia mista\nNão aplicável"
+    assert conteudos['1.11'] == "1.11 Aquisição ou alienação de ativo relevante\nNão houve"
+    assert "...." not in "".join(conteudos.values())
+    assert "Texto introdutório" not in "".join(conteudos.values())
+
+
+def test_pontilhado_no_corpo_nao_descarta_secoes_anteriores():
+    texto = CORPO + "1.13 Acordos de acionistas .......... 31\n"
+    assert [numero for numero, *_ in localizar_secoes_fre(texto)] == ['1.9', '1.10', '1.11', '1.12']
+
+
+REFERENCIA_CRUZADA = """4.1 Descrição dos fatores de risco
+A Companhia está exposta a riscos regulatórios e ambientais.
+4.2 Indicação dos 5 (cinco) principais fatores de risco
+Os principais fatores são regulação, crédito, liquidez, mercado e reputação.
+12.1 Informações sobre o capital social
+O capital social é de R$ 100 milhões, conforme descrito no
+{referencia}
+e nas demonstrações financeiras.
+12.2 Emissores estrangeiros - Direitos e regras
+Não aplicável
+"""
+
+
+@pytest.mark.parametrize('referencia', [
+    "item 4.1 Descrição dos fatores de risco",  # no meio da linha
+    "4.1 Descrição dos fatores de risco",       # no início da linha
+])
+def test_referencia_cruzada_no_corpo_nao_vira_secao(referencia):
+    texto = REFERENCIA_CRUZADA.format(referencia=referencia)
+    secoes = SecoesFRE(texto, localizar_secoes_fre(texto))
+    conteudos = {numero: secoes[titulo] for titulo, numero in secoes.itens.items()}
+
+    assert list(conteudos) == ['4.1', '4.2', '12.1', '12.2']
+    assert list(secoes) == [
+        "4.1 Descrição dos fatores de risco",
+        "4.2 Indicação dos 5 (cinco) principais fatores de risco",
+        "12.1 Informações sobre o capital social",
+        "12.2 Emissores estrangeiros - Direitos e regras",
+    ]
+    assert "riscos regulatórios" in conteudos['4.1']
+    assert conteudos['12.1'].endswith("e nas demonstrações financeiras.")
+    assert conteudos['12.2'].rstrip().endswith("Não aplicável")
+
+
+def pdf_com_marcadores(paginas, marcadores) -> bytes:
+    documento = fitz.open()
+    for texto in paginas:
+        documento.new_page().insert_text((50, 72), texto, fontsize=10)
+    documento.set_toc(marcadores)
+    return documento.tobytes()
+
+
+def test_secao_pelo_sumario_ignora_referencias_cruzadas():
+    pdf = pdf_com_marcadores(
+        [
+            "1.1 Histórico do emissor\n"
+            "A Companhia foi fundada em 1974, ver Descrição das principais atividades\n"
+            "4.1 Descrição dos fatores de risco, que trata dos riscos da operação.\n"
+            "Em 2020 concluiu sua reorganização societária.",
+            "1.2 Descrição das principais atividades do emissor e de suas controladas\n"
+            "Gestão de resíduos e valorização energética.",
+        ],
+        [[1, "1.1 Histórico do emissor", 1], [1, "1.2 Descrição das principais atividades", 2]],
+    )
+    secoes = localizar_secoes_por_sumario(pdf)
+    conteudos = {numero: secoes[titulo] for titulo, numero in secoes.itens.items()}
+
+    assert list(conteudos) == ['1.1', '1.2']
+    assert conteudos['1.1'].startswith("1.1 Histórico do emissor")
+    assert conteudos['1.1'].endswith("Em 2020 concluiu sua reorganização societária.")
+    assert "Gestão de resíduos" not in conteudos['1.1']
+    assert conteudos['1.2'].endswith("Gestão de resíduos e valorização energética.")
@@ -0,0 +1,131 @@
+"""
+📦 Vendorização dos assets estáticos do app unificado
+Gera static/css/solvi.min.css a partir de static/css/solvi.css e baixa uma única vez as
+fontes (Inter, Poppins, JetBrains Mono) e as imagens do header, footer e seção de
+inspiração para static/. Tudo é servido de static/ com server.enableStaticServing: o
+navegador baixa as folhas de estilo uma vez e as reaproveita do cache HTTP. O app nunca
+busca assets remotos; sem a vendorização, valem as fontes do sistema declaradas no CSS e
+blocos locais no lugar das imagens. Em servidores sem acesso à internet, rode este script
+numa máquina com acesso e copie static/ para lá.
+
+Uso:
+    python vendor_assets.py            # minifica o CSS e baixa fontes e imagens
+    python vendor_assets.py --offline  # apenas minifica o CSS
+"""
+
+import argparse
+import re
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+STATIC_DIR = Path(__file__).parent / "static"
+CSS_FONTE = STATIC_DIR / "css" / "solvi.css"
+CSS_MINIFICADO = STATIC_DIR / "css" / "solvi.min.css"
+CSS_FONTES = STATIC_DIR / "css" / "fonts.css"
+
+GOOGLE_FONTS_URL = (
+    "https://fonts.googleapis.com/css2?"
+    "family=Inter:wght@300;400;500;600;700;800;900"
+    "&family=Poppins:wght@300;400;500;600;700;800;900"
+    "&family=JetBrains+Mono:wght@400;500;600"
+    "&display=swap"
+)
+
+# User-Agent de navegador moderno: o Google Fonts só entrega woff2 para ele
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+IMAGENS: Dict[str, str] = {
+    "solvi-logo.png": "https://static.wixstatic.com/media/b5b170_1e07cf7f7f82492a9808f9ae7f038596~mv2.png/v1/crop/x_0,y_0,w_2742,h_1106/fill/w_92,h_37,al_c,q_85,usm_0.66_1.00_0.01,enc_auto/Logotipo%20Solv%C3%AD_edited_edited.png",
+    "tecnologia-sustentavel.jpg": "https://images.unsplash.com/photo-1558618666-fcd25c85cd64?ixlib=rb-4.0.3&auto=format&fit=crop&w=600&q=80",
+    "protecao-ambiental.jpg": "https://images.unsplash.com/photo-1441974231531-c6227db76b6e?ixlib=rb-4.0.3&auto=format&fit=crop&w=600&q=80",
+    "gestao-residuos.jpg": "https://images.unsplash.com/photo-1542601906990-b4d3fb778b09?ixlib=rb-4.0.3&auto=format&fit=crop&w=600&q=80",
+    "inovacao-verde.png": "https://static.wixstatic.com/media/b5b170_b587909825174509a2a6a71af0106cc3~mv2.png/v1/fill/w_245,h_357,al_c,q_85,enc_auto/Group%2041.png",
+    "header-background.jpg": "https://images.unsplash.com/photo-1441974231531-c6227db76b6e?ixlib=rb-4.0.3&auto=format&fit=crop&w=2000&q=80",
+    "footer-background.jpg": "https://images.unsplash.com/photo-1542601906990-b4d3fb778b09?ixlib=rb-4.0.3&auto=format&fit=crop&w=2000&q=80",
+}
+
+
+def baixar(url: str) -> bytes:
+    """Baixa uma URL com o User-Agent de navegador"""
+    requisicao = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(requisicao, timeout=30) as resposta:
+        return resposta.read()
+
+
+def minificar_css(css: str) -> str:
+    """Minificação conservadora: remove comentários e espaços redundantes"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def gerar_css_minificado() -> int:
+    """Gera solvi.min.css e retorna o tamanho em bytes"""
+    minificado = minificar_css(CSS_FONTE.read_text(encoding="utf-8"))
+    CSS_MINIFICADO.write_text(minificado, encoding="utf-8")
+    return len(minificado.encode("utf-8"))
+
+
+def vendorizar_fontes() -> List[str]:
+    """Baixa os woff2 das fontes e reescreve o CSS do Google Fonts com caminhos locais"""
+    destino = STATIC_DIR / "fonts"
+    destino.mkdir(parents=True, exist_ok=True)
+    css = baixar(GOOGLE_FONTS_URL).decode("utf-8")
+
+    arquivos = []
+    for url in sorted(set(re.findall(r"url\((https://[^)]+\.woff2)\)", css))):
+        nome = url.rsplit("/", 1)[-1]
+        (destino / nome).write_bytes(baixar(url))
+        css = css.replace(url, f"../fonts/{nome}")
+        arquivos.append(nome)
+
+    CSS_FONTES.write_text(minificar_css(css), encoding="utf-8")
+    return arquivos
+
+
+def vendorizar_imagens() -> List[str]:
+    """Baixa as imagens do header, footer e seção de inspiração"""
+    destino = STATIC_DIR / "img"
+    destino.mkdir(parents=True, exist_ok=True)
+    arquivos = []
+    for nome, url in IMAGENS.items():
+        (destino / nome).write_bytes(baixar(url))
+        arquivos.append(nome)
+    return arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vendoriza os assets estáticos do app unificado")
+    parser.add_argument("--offline", action="store_true",
+                        help="apenas gera o CSS minificado, sem baixar fontes e imagens")
+    args = parser.parse_args()
+
+    tamanho_original = len(CSS_FONTE.read_bytes())
+    tamanho_minificado = gerar_css_minificado()
+
+    print(f"{'CSS por sessão':<44}{'bytes':>10}")
+    print("-" * 54)
+    print(f"{'antes: solvi.css inline a cada rerun':<44}{tamanho_original:>10}")
+    print(f"{'depois: 1º download (servidor estático)':<44}{tamanho_minificado:>10}")
+    print(f"{'depois: sessões seguintes (cache HTTP)':<44}{0:>10}")
+
+    if args.offline:
+        return
+
+    fontes = vendorizar_fontes()
+    imagens = vendorizar_imagens()
+    print()
+    print(f"Fontes locais: {len(fontes)} arquivos woff2")
+    print(f"Imagens locais: {len(imagens)}")
+    print(f"Requisições externas removidas por carregamento: {len(fontes) + len(imagens) + 1}")
+
+
+if __name__ == "__main__":
+    main()